@@ -2,11 +2,20 @@
 # Acquisition of the real and imaginary parts from a file and creating an array of complex numbers
 #
 
+import os
 import numpy as np
 
+def readtxt(address, delim):
+    # Reads a text file with columns of numbers. np.loadtxt is several times faster than np.genfromtxt;
+    # np.genfromtxt is only used for files with empty fields or other irregularities.
+    try:
+        return np.loadtxt(address, delimiter=None if delim.isspace() else delim, ndmin=2)
+    except ValueError:
+        return np.genfromtxt(address, delimiter=delim)
+
 def acq(filename, folder, delim):
-    address = folder + '\\' + filename  #  full address of the file
-    data = np.genfromtxt(address, delimiter=delim)  # reading the csv file
+    address = os.path.join(folder, filename)  #  full address of the file
+    data = readtxt(address, delim)  # reading the csv file
     Freq = data[:, 0]  # first column - frequency
     N = len(Freq)  # number of frequency points
     Real = data[:, 1]  # second column - real part
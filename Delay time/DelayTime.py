@@ -0,0 +1,68 @@
+#
+# Headless pipeline of the delay time algorithm
+# Pure functions take arrays and return arrays; run_delay() reads S.CSV and writes the same output files as main.py
+# without any prompts or plots, so the algorithm can be called in-process from automation scripts.
+#
+
+import os
+from dataclasses import dataclass
+import numpy as np
+from Acquisition import acq
+from Jumps import find_jumps
+from PhaseUnwrapping import unwrap_angle
+from LinearRange import linear_range
+
+@dataclass
+class DelayConfig:
+    folder: str  # folder where S.CSV is located; the output files are saved there
+    deliminput: str = ','  # delimiter used in S.CSV
+    phase_factor: int = None  # 1 if the phase jumps at pi/2, 2 if at pi; None - detected from the phase jumps
+    fstart: float = None  # start of the frequency range with the linear phase, Hz (None - first point)
+    fstop: float = None  # stop of the frequency range with the linear phase, Hz (None - last point)
+    filename: str = 'S.CSV'
+    auto_range: str = None  # longest or best - the linear range is selected within fstart...fstop (see LinearRange.py)
+
+@dataclass
+class DelayEstimate:
+    Stimulus: np.ndarray  # frequency points within the selected range, Hz
+    initial_phase: np.ndarray  # phase with jumps within the selected range
+    unwrapped_phase: np.ndarray  # unwrapped phase within the selected range
+    slopesign: float  # sign of the slope of the unwrapped phase
+    dt: float  # delay time, s
+    number_jumps: int = 0
+    phase_factor: int = None  # phase factor used for unwrapping
+
+def select_range(Stimulus, fstart=None, fstop=None):
+    # Boolean mask of the frequency points within fmin <= fstart <= f <= fstop <= fmax
+    fstart = Stimulus[0] if fstart is None else fstart
+    fstop = Stimulus[-1] if fstop is None else fstop
+    if not Stimulus[0] <= fstart <= fstop <= Stimulus[-1]:
+        raise ValueError('Wrong sequence of frequencies. It must be: fmin <= fstart <= fstop <= fmax')
+    return (fstart <= Stimulus) & (Stimulus <= fstop)
+
+def estimate_delay(Stimulus, S, phase_factor=None, fstart=None, fstop=None):
+    # Stimulus - frequency array, Hz
+    # S - measured S11 or S21 (complex array)
+    # phase_factor - 1 if the phase jumps at pi/2, 2 if at pi; None - detected from the phase jumps
+    # fstart, fstop - frequency range with the most linear behavior of the phase, Hz (None - whole sweep)
+    inrange = select_range(Stimulus, fstart, fstop)
+    Stimulus = Stimulus[inrange]
+    Ph = np.angle(S[inrange])
+    right_jump, number_jumps, detected_factor = find_jumps(Ph)
+    if phase_factor is None:
+        phase_factor = detected_factor if detected_factor is not None else 2
+    slopesign, dt, unwrapped_phase, _ = unwrap_angle(Stimulus, Ph, phase_factor, right_jump, verbose=False)
+    return DelayEstimate(Stimulus, Ph, unwrapped_phase, slopesign, dt, number_jumps, phase_factor)
+
+def run_delay(config):
+    # Reads config.filename, writes Phase_initial.CSV and Phase_unwrapped.csv, returns a DelayEstimate
+    Stimulus0, MS0 = acq(config.filename, config.folder, config.deliminput)
+    np.savetxt(os.path.join(config.folder, 'Phase_initial.CSV'), np.column_stack((Stimulus0, np.angle(MS0))),
+               delimiter=',')
+    estimate = estimate_delay(Stimulus0, MS0, config.phase_factor, config.fstart, config.fstop)
+    if config.auto_range is not None:
+        selected = linear_range(estimate.Stimulus, estimate.unwrapped_phase, config.auto_range)
+        estimate = estimate_delay(Stimulus0, MS0, config.phase_factor, selected.fstart, selected.fstop)
+    np.savetxt(os.path.join(config.folder, 'Phase_unwrapped.csv'),
+               np.column_stack((estimate.Stimulus, estimate.unwrapped_phase)), delimiter=',')
+    return estimate
@@ -0,0 +1,118 @@
+#
+# Group delay as a function of frequency and delay times of many frequency windows
+# The least-squares slope of the unwrapped phase over any window follows from the differences of cumulative sums,
+# so after one O(N) pass every window costs O(1); the window bounds are found with np.searchsorted.
+# The same sums give the residuals of the fit of any window (see LinearRange.py).
+# The differences of sums over the whole sweep cancel catastrophically for narrow windows of a long sweep (the
+# centered second moment of a few points is far below the rounding error of the total), so the points are split into
+# blocks of about sqrt(N) points: the sums restart in every block around the mean frequency and phase of the block,
+# and the totals of the blocks are summed separately. A window adds the rest of its first block, the whole blocks
+# and the head of its last block, shifted to the center of its first block.
+# The delay time of a window is the group delay -slope / (2 * pi): positive for a phase that decreases with frequency.
+#
+
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass
+class PrefixSums:
+    block: int  # points per block
+    local: np.ndarray  # (..., 6, blocks, block + 1) cumulative sums inside every block around its center
+    ucenter: np.ndarray  # (blocks,) mean u of every block
+    pcenter: np.ndarray  # (..., blocks) mean phase of every block
+    totals: np.ndarray  # (..., 6, blocks + 1) cumulative sums of the totals of the blocks around u = 0, phase = 0
+
+def shifted(moments, d, e):
+    # Sums of 1, u + d, p + e, (u + d)^2, (u + d) (p + e), (p + e)^2 from the sums of 1, u, p, u^2, u p, p^2
+    n, su, sp, suu, sup, spp = moments
+    return [n, su + n * d, sp + n * e, suu + 2.0 * d * su + n * d * d, sup + e * su + d * sp + n * d * e,
+            spp + 2.0 * e * sp + n * e * e]
+
+def prefix_sums(Stimulus, phase):
+    # Block-wise cumulative sums of 1, u, phase, u * u, u * phase, phase * phase (u - frequency centered and
+    # scaled to [-0.5, 0.5]); returns a PrefixSums and the scale of u, Hz
+    Stimulus = np.asarray(Stimulus, dtype=float)
+    center = 0.5 * (Stimulus[0] + Stimulus[-1])
+    scale = (Stimulus[-1] - Stimulus[0]) or 1.0
+    u = (Stimulus - center) / scale
+    phase = np.asarray(phase, dtype=float)
+    phase = phase - np.mean(phase, axis=-1, keepdims=True)
+    N = len(u)
+    block = max(16, int(np.ceil(np.sqrt(N))))
+    blocks = -(-N // block)
+    # the last block is padded with points of weight zero
+    weight = np.zeros(blocks * block)
+    weight[:N] = 1.0
+    weight = weight.reshape(blocks, block)
+    u = np.concatenate([u, np.zeros(blocks * block - N)]).reshape(blocks, block)
+    phase = np.concatenate([phase, np.zeros(phase.shape[:-1] + (blocks * block - N,))], axis=-1)
+    phase = phase.reshape(phase.shape[:-1] + (blocks, block))
+    count = weight.sum(axis=-1)
+    ucenter = (weight * u).sum(axis=-1) / count
+    pcenter = (weight * phase).sum(axis=-1) / count
+    u = weight * (u - ucenter[:, None])
+    phase = weight * (phase - pcenter[..., None])
+    columns = np.broadcast_arrays(weight, u, phase, u * u, u * phase, phase * phase)
+    local = np.zeros(columns[2].shape[:-2] + (6, blocks, block + 1))
+    for i, column in enumerate(columns):
+        np.cumsum(column, axis=-1, out=local[..., i, :, 1:])
+    block_totals = shifted([local[..., i, :, block] for i in range(6)], ucenter, pcenter)
+    totals = np.zeros(local.shape[:-2] + (blocks + 1,))
+    for i, column in enumerate(block_totals):
+        np.cumsum(column, axis=-1, out=totals[..., i, 1:])
+    return PrefixSums(block, local, ucenter, pcenter, totals), scale
+
+def window_moments(sums, start, stop):
+    # Sums of 1, u, phase, u * u, u * phase, phase * phase over the points start...stop - 1 (arrays of indexes)
+    # around the center of the block of start
+    B, blocks = sums.block, len(sums.ucenter)
+    start, stop = np.broadcast_arrays(np.asarray(start), np.asarray(stop))
+    first = np.clip(start // B, 0, blocks - 1)
+    last = np.clip((stop - 1) // B, first, blocks - 1)
+    head = np.clip(start - first * B, 0, B)
+    tail = np.clip(stop - last * B, 0, B)
+    inside = first == last
+    # rest of the first block (up to the stop of a window inside one block) and head of the last block
+    local = sums.local.reshape(sums.local.shape[:-2] + (-1,))
+    rest = (np.take(local, first * (B + 1) + np.where(inside, tail, B), axis=-1)
+            - np.take(local, first * (B + 1) + head, axis=-1))
+    end = np.take(local, last * (B + 1) + np.where(inside, 0, tail), axis=-1)
+    whole = (np.take(sums.totals, last, axis=-1)
+             - np.take(sums.totals, np.minimum(first + 1, last), axis=-1))
+    ufirst, pfirst = sums.ucenter[first], sums.pcenter[..., first]
+    end = shifted(np.moveaxis(end, -1 - start.ndim, 0), sums.ucenter[last] - ufirst, sums.pcenter[..., last] - pfirst)
+    whole = shifted(np.moveaxis(whole, -1 - start.ndim, 0), -ufirst, -pfirst)
+    return [r + a + w for r, a, w in zip(np.moveaxis(rest, -1 - start.ndim, 0), end, whole)]
+
+def window_slopes(sums, scale, start, stop):
+    # Least-squares slope (rad/Hz) over the points start...stop - 1 (arrays of indexes; nan if less than 2 points)
+    n, su, sp, suu, sup, _ = window_moments(sums, start, stop)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sup - su * sp) / (n * suu - su * su)
+    return np.where(np.asarray(stop) - np.asarray(start) >= 2, slope, np.nan) / scale
+
+def window_sse(sums, start, stop):
+    # Sum of the squared residuals of the least-squares line over the points start...stop - 1 (inf if less than 3)
+    n, su, sp, suu, sup, spp = window_moments(sums, start, stop)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        suu = suu - su * su / n
+        sup = sup - su * sp / n
+        spp = spp - sp * sp / n
+        sse = np.maximum(spp - sup * sup / suu, 0.0)
+    return np.where(np.asarray(stop) - np.asarray(start) >= 3, sse, np.inf)
+
+def window_delays(Stimulus, phase, fstart, fstop):
+    # Stimulus - frequency array, Hz (increasing)
+    # phase - unwrapped phase, radians (1D, or 2D with one sweep per row)
+    # fstart, fstop - arrays of the window bounds, Hz: every window includes fstart <= f <= fstop
+    # Returns the delay time of every window, s
+    sums, scale = prefix_sums(Stimulus, phase)
+    start = np.searchsorted(Stimulus, fstart, side='left')
+    stop = np.searchsorted(Stimulus, fstop, side='right')
+    return -window_slopes(sums, scale, start, stop) / (2.0 * np.pi)
+
+def group_delay(Stimulus, phase, span):
+    # Group delay as a function of frequency: sliding-window slope over f - span / 2 <= f' <= f + span / 2 (Hz)
+    # Returns the group delay at every frequency point, s
+    Stimulus = np.asarray(Stimulus, dtype=float)
+    return window_delays(Stimulus, phase, Stimulus - 0.5 * span, Stimulus + 0.5 * span)
@@ -0,0 +1,37 @@
+#
+# Detection of the phase jumps
+#
+
+import numpy as np
+
+def jump_mask(angle):
+    # angle - phase array with jumps, radians; a 2D array (one sweep per row) is processed row by row in one call
+    # A phase jump consists only of two points - "left" and "right", which have opposite signs. No other points between.
+    # Returns a boolean array of the same shape as angle: True at the jump "stop points" (right points)
+    angle = np.asarray(angle)
+    anglenum = angle.shape[-1]  # number of the phase values that must coincide with the number of frequencies
+    jump = np.zeros(angle.shape, dtype=bool)
+    if anglenum < 3:  # a stop point needs a neighbour on both sides
+        return jump
+    sign = np.sign(angle[..., :anglenum - 2] * angle[..., 1:anglenum - 1])
+    jump[..., 1:anglenum - 1] = (sign < 0) & (np.abs(angle[..., 2:]) <= np.abs(angle[..., 1:anglenum - 1]))
+    return jump
+
+def find_jumps(angle):
+    # angle - phase array with jumps (1D), radians
+    # Returns the indexes of the jump "stop points", the number of jumps and the phase factor:
+    # 1 if the phase jumps at pi/2 (~1.5), 2 if the phase jumps at pi (~3), None if there are no jumps
+    angle = np.asarray(angle)
+    right_jump = np.flatnonzero(jump_mask(angle))
+    jumpnum = len(right_jump)  # number of the jump points
+    if jumpnum == 0:
+        return right_jump, 0, None
+    height = np.median(np.abs(angle[right_jump - 1]))  # typical phase value at which the jumps start
+    phase_factor = 2 if height > 0.75 * np.pi else 1
+    return right_jump, jumpnum, phase_factor
+
+def jumps(Re, Im):
+    # Re - Re[S21(f)] array
+    # Im - Im[S21(f)] array
+    angle = np.arctan2(Im, Re)  # original phase array with jumps
+    return find_jumps(angle)[1]  # number of the jump points
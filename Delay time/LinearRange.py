@@ -0,0 +1,89 @@
+#
+# Automatic selection of the frequency range with the most linear phase
+# The unwrapped phase is split into straight segments by segmented regression: dynamic programming over a grid of
+# candidate breakpoints (the residuals of any segment cost O(1) with the cumulative sums of GroupDelay.py), followed
+# by an exact search of every breakpoint between its grid neighbours. The number of segments is chosen with the
+# Bayesian information criterion. Cost: O(N) + O(segments * grid^2) + O(segments * N / grid).
+#
+
+from dataclasses import dataclass
+import numpy as np
+from GroupDelay import prefix_sums, window_slopes, window_sse
+
+@dataclass
+class LinearRange:
+    fstart: float  # start of the selected range, Hz
+    fstop: float  # stop of the selected range, Hz
+    start: int  # index of the first point of the range
+    stop: int  # index after the last point of the range
+    dt: float  # delay time over the range, -slope / (2 * pi), s
+    rms: float  # root mean square of the residuals of the linear fit, radians
+    r2: float  # coefficient of determination of the linear fit
+    breakpoints: np.ndarray  # indexes of the boundaries of all segments (0, ..., N)
+
+def segment(sums, N, segments, grid):
+    # Best split of the N points into 1...segments straight segments; returns the boundaries for every number
+    # of segments and their total squared residuals
+    nodes = np.unique(np.linspace(0, N, min(grid, N) + 1).round().astype(int))
+    cost = window_sse(sums, nodes[:, None], nodes[None, :])  # segment between any two nodes
+    cost[np.tril_indices(len(nodes))] = np.inf
+
+    best = cost[0].copy()  # best[j] - smallest residuals of the points before nodes[j] with k segments
+    previous = []
+    splits = [np.array([0, N])]
+    totals = [best[-1]]
+    for k in range(2, segments + 1):
+        candidates = best[:, None] + cost
+        previous.append(np.argmin(candidates, axis=0))
+        best = candidates[previous[-1], np.arange(len(nodes))]
+        j = len(nodes) - 1
+        boundaries = [j]
+        for back in reversed(previous):
+            j = back[j]
+            boundaries.append(j)
+        boundaries.append(0)
+        splits.append(refine(sums, nodes[boundaries[::-1]]))
+        totals.append(window_sse(sums, splits[-1][:-1], splits[-1][1:]).sum())
+    return splits, np.array(totals)
+
+def refine(sums, boundaries):
+    # Exact position of every inner boundary between its neighbours (the other boundaries fixed)
+    boundaries = boundaries.copy()
+    for i in range(1, len(boundaries) - 1):
+        candidates = np.arange(boundaries[i - 1] + 1, boundaries[i + 1])
+        if len(candidates):
+            cost = window_sse(sums, boundaries[i - 1], candidates) + window_sse(sums, candidates, boundaries[i + 1])
+            boundaries[i] = candidates[np.argmin(cost)]
+    return boundaries
+
+def linear_range(Stimulus, phase, criterion='longest', segments=6, grid=256):
+    # Stimulus - frequency array, Hz (increasing)
+    # phase - unwrapped phase, radians
+    # criterion - longest: the segment with the most points; best: the segment with the smallest rms residual
+    # segments - maximum number of straight segments
+    # grid - number of the candidate breakpoints of the dynamic programming
+    # Returns a LinearRange
+    if criterion not in ('longest', 'best'):
+        raise ValueError('Unknown criterion %r: use longest or best' % criterion)
+    Stimulus = np.asarray(Stimulus, dtype=float)
+    N = len(Stimulus)
+    if N < 3:
+        raise ValueError('At least 3 frequency points are needed to select the linear range')
+    sums, scale = prefix_sums(Stimulus, phase)
+    splits, totals = segment(sums, N, segments, grid)
+
+    # Bayesian information criterion: every segment adds a slope, an intercept and a breakpoint
+    k = np.arange(1, len(totals) + 1)
+    bic = N * np.log(np.maximum(totals, 1.0e-300) / N) + 3 * k * np.log(N)
+    boundaries = splits[int(np.argmin(bic))]
+
+    start, stop = boundaries[:-1], boundaries[1:]
+    sse = window_sse(sums, start, stop)
+    rms = np.sqrt(sse / (stop - start))
+    i = int(np.argmax(stop - start)) if criterion == 'longest' else int(np.argmin(rms))
+
+    segment_phase = np.asarray(phase, dtype=float)[start[i]:stop[i]]
+    total = np.sum((segment_phase - segment_phase.mean()) ** 2)
+    slope = window_slopes(sums, scale, start[i], stop[i])
+    return LinearRange(Stimulus[start[i]], Stimulus[stop[i] - 1], int(start[i]), int(stop[i]),
+                       -slope / (2.0 * np.pi), rms[i], 1.0 - sse[i] / total if total > 0 else 1.0, boundaries)
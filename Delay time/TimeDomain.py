@@ -0,0 +1,78 @@
+#
+# Delay time estimated in the time domain, without phase unwrapping
+# S11 or S21 measured over the band is windowed and transformed to the time domain with a zero-padded inverse FFT;
+# the main reflection/transmission peak is then zoomed in with the chirp-z transform and refined with a parabola.
+# The cost is O(N log N) and the result does not depend on the classification of the phase jumps.
+# The delay is unambiguous within 0 <= dt < 1 / (frequency step) and is resolved to about 1 / (bandwidth).
+#
+
+from dataclasses import dataclass
+import numpy as np
+from DelayTime import select_range
+
+@dataclass
+class TimeDomainEstimate:
+    dt: np.ndarray  # delay time, s (one value per sweep)
+    confidence: np.ndarray  # 1 - (largest side peak) / (main peak): close to 1 for a single clear peak
+    resolution: float  # width of the main peak, 1 / (bandwidth), s
+    time: np.ndarray  # time points of the coarse response, s
+    response: np.ndarray  # |response| on the time points (one row per sweep)
+
+def uniform_sweep(Stimulus, S):
+    # The FFT needs equally spaced frequency points: other sweeps are interpolated on the same number of points
+    step = (Stimulus[-1] - Stimulus[0]) / (len(Stimulus) - 1)
+    if np.allclose(np.diff(Stimulus), step, rtol=1.0e-6, atol=0.0):
+        return Stimulus, S
+    uniform = np.linspace(Stimulus[0], Stimulus[-1], len(Stimulus))
+    interp = np.vectorize(np.interp, signature='(n),(m),(m)->(n)')
+    return uniform, interp(uniform, Stimulus, S.real) + 1j * interp(uniform, Stimulus, S.imag)
+
+def parabola_peak(left, center, right):
+    # Offset (in steps) of the vertex of the parabola through three points around a maximum
+    denominator = left - 2.0 * center + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(denominator < 0, 0.5 * (left - right) / denominator, 0.0)
+    return np.clip(offset, -0.5, 0.5)
+
+def time_domain_delay(Stimulus, S, fstart=None, fstop=None, oversample=8, zoom=32):
+    # Stimulus - frequency array, Hz
+    # S - measured S11 or S21 (complex array); a 2D array (one sweep per row) estimates many fixtures in one call
+    # fstart, fstop - frequency range used, Hz (None - whole sweep)
+    # oversample - zero padding of the inverse FFT (time points per resolution step)
+    # zoom - chirp-z points per time step of the coarse response around the main peak
+    from scipy.signal import czt  # imported here: only this estimator needs scipy.signal
+
+    inrange = select_range(Stimulus, fstart, fstop)
+    Stimulus, S = uniform_sweep(Stimulus[inrange], np.asarray(S)[..., inrange])
+    N = len(Stimulus)
+    if N < 4:
+        raise ValueError('At least 4 frequency points are needed for the time-domain delay')
+    df = (Stimulus[-1] - Stimulus[0]) / (N - 1)
+    x = S * np.hanning(N + 2)[1:-1]  # the window suppresses the side lobes of the band edges
+
+    # Coarse response: S = A * exp(-j * 2 * pi * f * dt) peaks at t = dt
+    M = 1 << int(np.ceil(np.log2(oversample * N)))
+    response = np.abs(np.fft.ifft(x, M, axis=-1))
+    time = np.arange(M) / (M * df)
+    step = time[1]
+    peak = np.argmax(response, axis=-1)
+
+    # Zoom around every peak: z_k^-n = exp(j * 2 * pi * n * df * t_k) with t_k = t0 + k * step / zoom
+    t0 = (peak - 1) * step
+    fine = 2 * zoom + 1
+    rows = x.reshape(-1, N)
+    zoomed = np.empty((len(rows), fine))
+    for i, (row, start) in enumerate(zip(rows, np.ravel(t0))):
+        zoomed[i] = np.abs(czt(row, fine, np.exp(2j * np.pi * df * step / zoom), np.exp(-2j * np.pi * df * start)))
+    k = np.clip(np.argmax(zoomed, axis=-1), 1, fine - 2)
+    j = np.arange(len(rows))
+    offset = parabola_peak(zoomed[j, k - 1], zoomed[j, k], zoomed[j, k + 1])
+    dt = (np.ravel(t0) + (k + offset) * step / zoom).reshape(peak.shape)
+
+    # Confidence: the main peak against the largest response outside its main lobe (+-2 / bandwidth for Hann)
+    lobe = int(np.ceil(2.0 * M / N))
+    distance = np.abs((np.arange(M) - peak[..., None] + M // 2) % M - M // 2)
+    side = np.max(np.where(distance > lobe, response, 0.0), axis=-1)
+    main = np.take_along_axis(response, peak[..., None], axis=-1)[..., 0]
+    confidence = 1.0 - side / main
+    return TimeDomainEstimate(dt, confidence, 1.0 / (Stimulus[-1] - Stimulus[0]), time, response)
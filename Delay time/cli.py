@@ -0,0 +1,89 @@
+#
+# Command-line interface of the delay time algorithm without prompts (see DelayTime.py)
+# Example: python cli.py --folder data --phase-factor 2 --fstart 1e9 --fstop 3e9
+# or, without phase unwrapping: python cli.py --folder data --method time
+#
+
+import time
+START = time.perf_counter()  # before the other imports: --startup-time reports the time of the imports as well
+import argparse
+import numpy as np
+from Acquisition import acq
+from DelayTime import DelayConfig, run_delay
+from GroupDelay import window_delays
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Delay time along a fixture/sample from the unwrapped phase of S11 '
+                                                 'or S21 saved in S.CSV (frequency (Hz), Re[S], Im[S]).')
+    parser.add_argument('--folder', required=True, help='folder where S.CSV is located')
+    parser.add_argument('--delimiter', default=',', help='delimiter used in S.CSV (default: ,)')
+    parser.add_argument('--filename', default='S.CSV', help='input file name (default: S.CSV)')
+    parser.add_argument('--phase-factor', type=int, choices=(1, 2), default=None,
+                        help='1 if the phase jumps at pi/2, 2 if at pi (default: detected from the jumps)')
+    parser.add_argument('--fstart', type=float, default=None, help='start frequency in Hz (default: first point)')
+    parser.add_argument('--fstop', type=float, default=None, help='stop frequency in Hz (default: last point)')
+    parser.add_argument('--method', choices=('phase', 'time'), default='phase',
+                        help='phase - slope of the unwrapped phase, time - peak of the time-domain response '
+                             '(see TimeDomain.py; no output files) (default: phase)')
+    parser.add_argument('--auto-range', choices=('longest', 'best'), default=None,
+                        help='select the linear range of the phase automatically: the longest straight segment or '
+                             'the one with the smallest residuals (see LinearRange.py)')
+    parser.add_argument('--subbands', type=int, default=None,
+                        help='also print the delay time of this number of equal sub-bands of the range '
+                             '(see GroupDelay.py)')
+    parser.add_argument('--plot', action='store_true', help='show the initial and unwrapped phase')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='print the startup time (imports and parsing of the arguments) before running')
+    return parser.parse_args(argv)
+
+def report_startup(args):
+    if args.startup_time:
+        print('Startup time: %.1f ms' % ((time.perf_counter() - START) * 1.0e3))
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_startup(args)
+    if args.method == 'time':
+        return main_time(args)
+    config = DelayConfig(args.folder, args.delimiter, args.phase_factor, args.fstart, args.fstop, args.filename,
+                         args.auto_range)
+    estimate = run_delay(config)
+    if args.auto_range is not None:
+        print('Linear range: ', estimate.Stimulus[0], '-', estimate.Stimulus[-1], 'Hz')
+    print('Number of phase jumps = ', estimate.number_jumps, '; phase factor', estimate.phase_factor)
+    print('Delay time = ', estimate.dt / 1.0e-12, 'ps')
+    if args.subbands:
+        edges = np.linspace(estimate.Stimulus[0], estimate.Stimulus[-1], args.subbands + 1)
+        delays = window_delays(estimate.Stimulus, estimate.unwrapped_phase, edges[:-1], edges[1:])
+        for fstart, fstop, delay in zip(edges[:-1], edges[1:], delays):
+            print('%.6g - %.6g Hz: delay time = ' % (fstart, fstop), delay / 1.0e-12, 'ps')
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        plt.plot(estimate.Stimulus, estimate.initial_phase, 'k')
+        plt.plot(estimate.Stimulus, estimate.unwrapped_phase, 'g')
+        plt.title('Initial phase - black, unwrapped phase - green')
+        plt.xlabel('Frequency, Hz')
+        plt.ylabel('Phase, radians')
+        plt.show()
+    return estimate
+
+def main_time(args):
+    from TimeDomain import time_domain_delay
+    Stimulus, S = acq(args.filename, args.folder, args.delimiter)
+    estimate = time_domain_delay(Stimulus, S, args.fstart, args.fstop)
+    print('Delay time = ', estimate.dt / 1.0e-12, 'ps; confidence', estimate.confidence,
+          '; resolution', estimate.resolution / 1.0e-12, 'ps')
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        plt.plot(estimate.time, estimate.response, 'k')
+        plt.axvline(estimate.dt, color='r')
+        plt.title('Time-domain response, delay time - red')
+        plt.xlabel('Time, s')
+        plt.ylabel('|Response|')
+        plt.show()
+    return estimate
+
+if __name__ == '__main__':
+    main()
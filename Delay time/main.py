@@ -11,8 +11,8 @@
 
 import numpy as np
 from Acquisition import acq
-from PhaseUnwrapping import unwrap
-import matplotlib.pyplot as plt
+from PhaseUnwrapping import unwrap_angle
+from Jumps import find_jumps
 
 print('')
 print('*******************************************< Program operation >**********************************************')
@@ -50,6 +50,7 @@ N0 = len(Stimulus0)
 Re0 = MS0.real
 Im0 = MS0.imag
 Ph0 = np.angle(MS0)
+right_jump0, jumpnum0, detected_factor = find_jumps(Ph0)  # phase jumps over the whole sweep
 
 phaseoutput = np.column_stack((Stimulus0, Ph0))  # 2D array
 np.savetxt(folder + '\\' + 'Phase_initial.CSV', phaseoutput, delimiter=',')
@@ -62,14 +63,19 @@ Later, choose the phase factor 1 if the phase jumps at pi/2, and the phase facto
 Push Enter when finish reading.""")
 print('')
 
+import matplotlib.pyplot as plt  # imported here: the prompts do not wait for matplotlib
+
 font1 = {'family': 'serif', 'color': 'black', 'weight': 'bold', 'size': 15}
 font2 = {'family': 'serif', 'color': 'black', 'weight': 'normal', 'size': 10}
 plt.plot(Stimulus0, Ph0, 'k')
+plt.plot(Stimulus0[right_jump0], Ph0[right_jump0], 'r.')  # jump "stop points"
 plt.title('Phase dispersion', fontdict=font1)
 plt.xlabel('Frequency, Hz', fontdict=font2)
 plt.ylabel('Phase, radians', fontdict=font2)
 plt.show()
 
+if detected_factor is not None:
+    print('Number of phase jumps = ', jumpnum0, '; the jumps look like phase factor', detected_factor)
 phase_factor = int(input('Please enter the phase factor (1 or 2), as explained above: '))
 
 flag = 0
@@ -104,16 +110,18 @@ Re = np.array(Re)
 Im = np.array(Im)
 MS = np.array(MS)
 Ph = np.angle(MS)
+right_jump = find_jumps(Ph)[0]  # phase jumps within the selected range
 
 font1 = {'family': 'serif', 'color': 'black', 'weight': 'bold', 'size': 15}
 font2 = {'family': 'serif', 'color': 'black', 'weight': 'normal', 'size': 10}
 plt.plot(Stimulus, Ph, 'k')
+plt.plot(Stimulus[right_jump], Ph[right_jump], 'r.')  # jump "stop points"
 plt.title('Phase dispersion', fontdict=font1)
 plt.xlabel('Frequency, Hz', fontdict=font2)
 plt.ylabel('Phase, radians', fontdict=font2)
 plt.show()
 
-slopesign, dt, unwrapped_phase, initial_phase = unwrap(Stimulus, Re, Im, phase_factor)  # phase unwrapping
+slopesign, dt, unwrapped_phase, initial_phase = unwrap_angle(Stimulus, Ph, phase_factor, right_jump)  # unwrapping
 unwrappedphaseoutput = np.column_stack((Stimulus, unwrapped_phase))  # 2D array
 np.savetxt(folder + '\\' + 'Phase_unwrapped.csv', unwrappedphaseoutput, delimiter=',')
 
@@ -0,0 +1,57 @@
+#
+# Scan of many candidate delay times in one broadcast calculation and automatic choice of the delay
+# The corrected S and Z are calculated as (delays x frequencies) arrays; the scan is split into chunks of delays
+# so the memory stays bounded for long sweeps.
+#
+# Criteria of the best delay:
+#   flat_imag  - the flattest Im[Z] (smallest variance over the frequency sweep)
+#   flat_phase - the flattest residual phase of the corrected S (smallest variance of the unwrapped phase):
+#                the delay along the sample is fully compensated
+#
+
+import numpy as np
+from Impedance import correct_delay, impedance
+
+CRITERIA = ('flat_imag', 'flat_phase')
+CHUNK_ELEMENTS = 1 << 21  # delays x frequencies per chunk (about 32 MB per complex array)
+
+def scan(Freq, S, delays, parameter):
+    # Freq - frequency array, Hz
+    # S - measured S11 or S21 (complex array)
+    # delays - candidate delay times, s (1D array)
+    # parameter - 11 or 21
+    # Returns the corrected S and Z as (len(delays), len(Freq)) arrays
+    SS = correct_delay(Freq[None, :], S[None, :], np.asarray(delays, dtype=float)[:, None])
+    return SS, impedance(SS, parameter)
+
+def cost(SS, Z, criterion):
+    # Cost of every row (delay) of the scan: the smaller, the better
+    if criterion == 'flat_imag':
+        return np.var(Z.imag, axis=-1)
+    elif criterion == 'flat_phase':
+        return np.var(np.unwrap(np.angle(SS), axis=-1), axis=-1)
+    raise ValueError('Unknown criterion %r: use one of %s' % (criterion, ', '.join(CRITERIA)))
+
+def delay_costs(Freq, S, delays, parameter, criterion='flat_imag', chunk=None):
+    # Cost of every candidate delay, calculated in chunks of delays
+    delays = np.asarray(delays, dtype=float)
+    if chunk is None:
+        chunk = max(1, CHUNK_ELEMENTS // len(Freq))
+    costs = np.empty(len(delays))
+    for i in range(0, len(delays), chunk):
+        SS, Z = scan(Freq, S, delays[i:i + chunk], parameter)
+        costs[i:i + chunk] = cost(SS, Z, criterion)
+    return costs
+
+def optimize_delay(Freq, S, delays, parameter, criterion='flat_imag', refine=3, chunk=None):
+    # delays - grid of the candidate delay times, s (e.g. np.linspace(0, 200e-12, 201))
+    # refine - number of the zoom steps: the grid is repeated between the neighbours of the best delay
+    # Returns the best delay (s) and its cost
+    delays = np.asarray(delays, dtype=float)
+    for step in range(refine + 1):
+        costs = delay_costs(Freq, S, delays, parameter, criterion, chunk)
+        best = int(np.nanargmin(costs))
+        if step == refine or len(delays) < 3:
+            break
+        delays = np.linspace(delays[max(best - 1, 0)], delays[min(best + 1, len(delays) - 1)], len(delays))
+    return delays[best], costs[best]
@@ -0,0 +1,44 @@
+#
+# Headless pipeline of the impedance dispersion algorithm
+# Pure functions take arrays and return arrays; run_impedance() reads S.csv and writes the same output files as
+# main.py without any prompts or plots, so the algorithm can be called in-process from automation scripts.
+#
+
+import os
+from dataclasses import dataclass
+import numpy as np
+from Acquisition import acq
+
+@dataclass
+class ImpedanceConfig:
+    folder: str  # folder where S.csv is located; the output files are saved there
+    delay: float  # delay time along the sample, s
+    parameter: int = 11  # the impedance is calculated from S11 (11) or S21 (21)
+    deliminput: str = ','  # delimiter used in S.csv
+    filename: str = 'S.csv'
+
+def correct_delay(Freq, S, delta):
+    # Freq - frequency array, Hz
+    # S - measured S11 or S21 (complex array)
+    # delta - delay time along the sample, s
+    return S * np.exp(1j * 2.0 * np.pi * Freq * delta)  # corrected S-parameter
+
+def impedance(SS, parameter):
+    # SS - corrected S11 or S21
+    # parameter - 11 or 21
+    if parameter == 11:
+        return 50.0 * (1.0 + SS) / (1.0 - SS)
+    elif parameter == 21:
+        return 100.0 * (1.0 - SS) / SS
+    raise ValueError('The impedance is calculated from S11 or S21: parameter must be 11 or 21')
+
+def run_impedance(config):
+    # Reads config.filename, writes S_corrected.CSV and Z_corrected.CSV, returns Freq, corrected S and Z
+    Freq, S = acq(config.filename, config.folder, config.deliminput)
+    SS = correct_delay(Freq, S, config.delay)
+    Z = impedance(SS, config.parameter)
+    S_corrected = np.column_stack((Freq, SS.real, SS.imag, np.angle(SS)))
+    Z_corrected = np.column_stack((Freq, Z.real, Z.imag, np.abs(Z)))
+    np.savetxt(os.path.join(config.folder, 'S_corrected.CSV'), S_corrected, delimiter=',')
+    np.savetxt(os.path.join(config.folder, 'Z_corrected.CSV'), Z_corrected, delimiter=',')
+    return Freq, SS, Z
@@ -0,0 +1,67 @@
+#
+# Command-line interface of the impedance dispersion algorithm without prompts (see Impedance.py)
+# Example: python cli.py --folder data --parameter 21 --delay 120
+# or, choosing the delay automatically: python cli.py --folder data --scan 0 200 201 --criterion flat_phase
+#
+
+import time
+START = time.perf_counter()  # before the other imports: --startup-time reports the time of the imports as well
+import argparse
+import numpy as np
+from Acquisition import acq
+from Impedance import ImpedanceConfig, run_impedance
+from DelayScan import CRITERIA, optimize_delay
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Impedance dispersion from S11 or S21 saved in S.csv '
+                                                 '(freq (Hz), Re, Im) corrected by the delay time along the sample.')
+    parser.add_argument('--folder', required=True, help='folder where S.csv is located')
+    parser.add_argument('--delimiter', default=',', help='delimiter used in S.csv (default: ,)')
+    parser.add_argument('--filename', default='S.csv', help='input file name (default: S.csv)')
+    parser.add_argument('--parameter', type=int, choices=(11, 21), default=11,
+                        help='calculate the impedance from S11 or S21 (default: 11)')
+    parser.add_argument('--delay', type=float, default=None, help='delay time along the sample in ps')
+    parser.add_argument('--scan', type=float, nargs=3, metavar=('START', 'STOP', 'COUNT'), default=None,
+                        help='choose the delay automatically from COUNT candidates between START and STOP ps')
+    parser.add_argument('--criterion', choices=CRITERIA, default='flat_imag',
+                        help='criterion of the best delay for --scan: flattest Im[Z] or flattest residual phase '
+                             'of the corrected S (default: flat_imag)')
+    parser.add_argument('--plot', action='store_true', help='show the impedance dispersion')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='print the startup time (imports and parsing of the arguments) before running')
+    args = parser.parse_args(argv)
+    if (args.delay is None) == (args.scan is None):
+        parser.error('use either --delay or --scan')
+    return args
+
+def report_startup(args):
+    if args.startup_time:
+        print('Startup time: %.1f ms' % ((time.perf_counter() - START) * 1.0e3))
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_startup(args)
+    if args.scan is not None:
+        Freq, S = acq(args.filename, args.folder, args.delimiter)
+        start, stop, count = args.scan
+        delay, _ = optimize_delay(Freq, S, np.linspace(start, stop, int(count)) * 1.0e-12, args.parameter,
+                                  args.criterion)
+        args.delay = delay / 1.0e-12
+        print('Best delay time (%s) = ' % args.criterion, args.delay, 'ps')
+    config = ImpedanceConfig(args.folder, args.delay * 1.0e-12, args.parameter, args.delimiter, args.filename)
+    Freq, SS, Z = run_impedance(config)
+    print('S_corrected.CSV and Z_corrected.CSV have been saved in', args.folder)
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        plt.plot(Freq, Z.real, 'g')
+        plt.plot(Freq, Z.imag, 'r')
+        plt.title('Impedance dispersion: Re - green, Im - red')
+        plt.xlabel('Frequency, Hz')
+        plt.ylabel('Z, Ohms')
+        plt.grid()
+        plt.show()
+    return Freq, SS, Z
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,8 @@
 #
 
 import numpy as np
-import matplotlib.pyplot as plt
+from Acquisition import acq
+from Impedance import correct_delay, impedance
 
 print('')
 print('Your S-parameter (S11 or S21) must be saved as S.csv with three columns: freq (Hz), Re, Im')
@@ -19,45 +20,26 @@ folder = input("Enter/paste the path of your folder where S.csv is located: ")
 deliminput = input('Please choose the delimiter used in the input files ( , ; tab space): ')
 parameter = int(input("Will you calculate the impedance from S11 or S21? Enter 11 or 21 respectively: "))
 
-address = folder + '\\' + 'S.csv'  #  full address of the file
-data = np.genfromtxt(address, delimiter=deliminput)  # reading the csv file
-Freq = data[:, 0]  # first column - frequency
-N = len(Freq)  # number of frequency points
-Real = data[:, 1]  # second column - real part
-Imag = data[:, 2]  # third column - imaginary part
-Freq.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-Real.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-Imag.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-S = np.empty([N, ], dtype=np.complex128, order='F')  # Column of complex numbers
-S.real = Real
-S.imag = Imag
-
-Freq = np.array(Freq)
+Freq, S = acq('S.csv', folder, deliminput)
 
 while True:
     delta = float(input('Enter the delay time along the sample in ps: '))
     print('')
     delta = delta * 1.0e-12
-    SS = []
-    for i in range(N):
-        SS.append(S[i] * np.exp(complex(0.0, 1.0) * 2.0 * np.pi * Freq[i] * delta))  # corrected S-parameter
-
-    SS = np.array(SS)
-    if parameter == 11:
-        Z = 50.0 * (complex(1.0, 0.0) + SS) / (complex(1.0, 0.0) - SS)
-    elif parameter == 21:
-        Z = 100.0 * (complex(1.0, 0.0) - SS) / SS
+    SS = correct_delay(Freq, S, delta)  # corrected S-parameter for all frequency points at once
+    if parameter == 11 or parameter == 21:
+        Z = impedance(SS, parameter)
     else:
         print('Did you use S11 or S21? Please run the program again.')
         exit()
 
-    Z = np.array(Z)
-
     S_corrected = np.column_stack((Freq, SS.real, SS.imag, np.angle(SS)))
     Z_corrected = np.column_stack((Freq, Z.real, Z.imag, np.abs(Z)))
     np.savetxt(folder + '\\' + 'S_corrected.CSV', S_corrected, delimiter=',')
     np.savetxt(folder + '\\' + 'Z_corrected.CSV', Z_corrected, delimiter=',')
 
+    import matplotlib.pyplot as plt  # imported here: the prompts do not wait for matplotlib
+
     font1 = {'family': 'serif', 'color': 'black', 'weight': 'bold', 'size': 15}
     font2 = {'family': 'serif', 'color': 'black', 'weight': 'normal', 'size': 10}
     plt.plot(Freq, Z.real, 'g')
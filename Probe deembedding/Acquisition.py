@@ -2,11 +2,45 @@
 # Acquisition of the real and imaginary parts from a file and creating an array of complex numbers
 #
 
+import os
 import numpy as np
+from Touchstone import is_touchstone, read_touchstone
+from Cache import cached
+from Instrumentation import instrumented
+from Precision import complex_dtype
 
-def acq(filename, folder, delim):
-    address = folder + '\\' + filename  #  full address of the file
-    data = np.genfromtxt(address, delimiter=delim)  # reading the csv file
+def resolve(folder, filename):
+    # Address of filename in folder; the name is matched case-insensitively (MS11.CSV, MS11.csv...) as on Windows
+    address = os.path.join(folder, filename)
+    if os.path.exists(address) or not os.path.isdir(folder):
+        return address
+    for entry in os.scandir(folder):
+        if entry.name.lower() == filename.lower():
+            return entry.path
+    return address
+
+def readtxt(address, delim):
+    # Reads a text file with columns of numbers through the cache of parsed files (see Cache.py)
+    return cached(address, ('txt', delim), lambda: (parsetxt(address, delim),))[0]
+
+def parsetxt(address, delim):
+    # np.loadtxt is several times faster than np.genfromtxt;
+    # np.genfromtxt is only used for files with empty fields or other irregularities.
+    try:
+        return np.loadtxt(address, delimiter=None if delim.isspace() else delim, ndmin=2)
+    except ValueError:
+        return np.genfromtxt(address, delimiter=delim)
+
+@instrumented('acq', lambda args, result: len(result[0]))
+def acq(filename, folder, delim, port=1, options=None):
+    # port - for Touchstone files (.s1p, .s2p, ...) the reflection S(port, port) is taken
+    # options - option line used if the Touchstone file has none, e.g. '# Hz S RI R 50'
+    # The complex values are returned in the precision selected in Precision.py
+    address = resolve(folder, filename)  #  full address of the file
+    if is_touchstone(filename):
+        Freq, S, _ = cached(address, ('touchstone', options), lambda: read_touchstone(address, options))
+        return Freq, S[:, port - 1, port - 1].astype(complex_dtype())
+    data = readtxt(address, delim)  # reading the csv file
     Freq = data[:, 0]  # first column - frequency
     N = len(Freq)  # number of frequency points
     Real = data[:, 1]  # second column - real part
@@ -14,7 +48,7 @@ def acq(filename, folder, delim):
     Freq.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
     Real.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
     Imag.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-    S = np.empty([N, ], dtype=np.complex128, order='F')  # Column of complex numbers
+    S = np.empty([N, ], dtype=complex_dtype(), order='F')  # Column of complex numbers
     S.real = Real
     S.imag = Imag
     return Freq, S
@@ -0,0 +1,200 @@
+#
+# Compressed columnar archive of the results of a run
+# All output tables of a run (probe phases, probe S2P models, S11A/S21A and ZA) are written into one zip file with
+# the parameters and the results of the run (phase jumps, phase factors, delay times) as metadata. Every column of a
+# table is split into chunks of CHUNK rows, each saved as a compressed .npy member, so a reader loads only the
+# columns and the frequency range it needs: the first and last frequency of every chunk are kept in the metadata.
+# The archive is also a valid .npz file (np.load lists the members as table/column/chunk).
+# The text files of the run can be written at the same time (Output) or exported from the archive later.
+#
+# Examples:
+#   python cli.py --folder data --probes 2 --archive results.npz --no-text
+#   python Archive.py data/results.npz --export data
+#   with Archive('results.npz') as archive:
+#       ZA = archive.column('ZA_from_S21A', 'Re', fstart=1.0e9, fstop=2.0e9)
+#
+
+import io
+import os
+import json
+import zipfile
+import argparse
+import numpy as np
+from Touchstone import write_s2p
+from Instrumentation import savetxt
+
+VERSION = 1  # format of the archive
+CHUNK = 65536  # rows per chunk of a column
+LEVEL = 1  # zlib compression level: the measured data compress little better at higher levels, but much slower
+META = 'meta.npy'
+
+def npy_bytes(array):
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+class ArchiveWriter:
+    def __init__(self, address, chunk=CHUNK, level=LEVEL):
+        self.zip = zipfile.ZipFile(address, 'w', zipfile.ZIP_DEFLATED, compresslevel=level)
+        self.chunk = chunk
+        self.meta = {'version': VERSION, 'tables': {}, 'run': {}}  # run - parameters and results of the run
+
+    def add_table(self, name, data, columns, kind='csv', fmt=None, filename=None, delimiter=','):
+        # data - (N, C) array whose first column is the frequency
+        # columns - names of the C columns
+        # kind, fmt, filename, delimiter - text export of the table: csv (np.savetxt with the formats fmt) or s2p
+        # (write_s2p)
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != len(columns):
+            raise ValueError('The table %s must have one column for each of the names %s' % (name, columns))
+        if name in self.meta['tables']:
+            raise ValueError('The archive already has a table %s' % name)
+        chunks = []
+        for k, start in enumerate(range(0, len(data), self.chunk)):
+            part = data[start:start + self.chunk]
+            chunks.append([start, start + len(part), float(part[0, 0]), float(part[-1, 0])])
+            for i, column in enumerate(columns):
+                self.zip.writestr('%s/%s/%d.npy' % (name, column, k), npy_bytes(part[:, i]))
+        self.meta['tables'][name] = {'columns': list(columns), 'rows': len(data), 'dtype': data.dtype.str,
+                                     'chunks': chunks, 'sorted': bool(np.all(np.diff(data[:, 0]) >= 0)),
+                                     'kind': kind, 'fmt': fmt, 'filename': filename or name + '.CSV',
+                                     'delimiter': delimiter}
+
+    def discard(self):
+        # Closes and removes an incomplete archive
+        self.zip.close()
+        os.remove(self.zip.filename)
+
+    def close(self):
+        self.zip.writestr(META, npy_bytes(np.array(json.dumps(self.meta))))
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Archive:
+    # Lazy reader: the members are decompressed only when a column is requested
+    def __init__(self, address):
+        self.zip = zipfile.ZipFile(address)
+        try:
+            self.meta = json.loads(str(self.read(META)))
+        except KeyError:
+            self.zip.close()
+            raise ValueError('%s is not a result archive' % address)
+        self.run = self.meta['run']
+
+    def read(self, member):
+        with self.zip.open(member) as file:
+            return np.lib.format.read_array(file, allow_pickle=False)
+
+    @property
+    def tables(self):
+        return list(self.meta['tables'])
+
+    def info(self, table):
+        if table not in self.meta['tables']:
+            raise ValueError('The archive has no table %s: %s' % (table, ', '.join(self.tables)))
+        return self.meta['tables'][table]
+
+    def columns(self, table):
+        return self.info(table)['columns']
+
+    def selected_chunks(self, info, fstart, fstop):
+        # Chunks that may contain frequencies in fstart...fstop (all chunks of an unsorted table)
+        fstart = -np.inf if fstart is None else fstart
+        fstop = np.inf if fstop is None else fstop
+        return [k for k, (_, _, first, last) in enumerate(info['chunks'])
+                if not info['sorted'] or (last >= fstart and first <= fstop)]
+
+    def read_column(self, table, name, chunks):
+        info = self.info(table)
+        if name not in info['columns']:
+            raise ValueError('The table %s has no column %s: %s' % (table, name, ', '.join(info['columns'])))
+        parts = [self.read('%s/%s/%d.npy' % (table, name, k)) for k in chunks]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=info['dtype'])
+
+    def column(self, table, name, fstart=None, fstop=None):
+        # Column name of table within the frequency range fstart...fstop, Hz (None - first/last point)
+        return self.table(table, fstart, fstop, [name])[:, 0]
+
+    def table(self, table, fstart=None, fstop=None, columns=None):
+        # (n, C) array of the columns (None - all) of table within the frequency range fstart...fstop, Hz
+        info = self.info(table)
+        columns = info['columns'] if columns is None else columns
+        chunks = self.selected_chunks(info, fstart, fstop)
+        data = np.column_stack([self.read_column(table, name, chunks) for name in columns])
+        if fstart is None and fstop is None:
+            return data
+        Freq = self.read_column(table, info['columns'][0], chunks)
+        inrange = np.ones(len(Freq), dtype=bool)
+        if fstart is not None:
+            inrange &= Freq >= fstart
+        if fstop is not None:
+            inrange &= Freq <= fstop
+        return data[inrange]
+
+    def export(self, folder, tables=None, delimiter=None):
+        # Writes the text files of the tables (None - all) into folder with the delimiter (None - the delimiter of
+        # the run); returns their addresses
+        addresses = []
+        for table in self.tables if tables is None else tables:
+            info = self.info(table)
+            address = os.path.join(folder, info['filename'])
+            data = self.table(table)
+            separator = info['delimiter'] if delimiter is None else delimiter
+            if info['kind'] == 's2p':
+                write_s2p(address, data, separator, number_format=info['fmt'][-1] if info['fmt'] else '%.18e')
+            else:
+                savetxt(address, data, delimiter=separator, fmt=info['fmt'] or '%.18e')
+            addresses.append(address)
+        return addresses
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Output:
+    # Destination of the output tables of a run: text files in folder (text=True) and/or an ArchiveWriter
+    def __init__(self, folder, delimiter=',', text=True, archive=None):
+        self.folder = folder
+        self.delimiter = delimiter
+        self.text = text
+        self.archive = archive
+
+    def write(self, filename, data, columns, fmt, kind='csv'):
+        # filename - name of the text file (the table in the archive is named without the extension)
+        if self.text:
+            address = os.path.join(self.folder, filename)
+            if kind == 's2p':
+                write_s2p(address, data, self.delimiter, number_format=fmt[-1])
+            else:
+                savetxt(address, data, delimiter=self.delimiter, fmt=fmt)
+        if self.archive is not None:
+            self.archive.add_table(os.path.splitext(filename)[0], data, columns, kind, fmt, filename, self.delimiter)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lists the tables of a result archive or exports them as text files.')
+    parser.add_argument('archive')
+    parser.add_argument('--export', default=None, help='folder where the text files are written')
+    parser.add_argument('--tables', nargs='+', default=None, help='tables to export (default: all)')
+    parser.add_argument('--delimiter', default=None,
+                        help='delimiter of the exported text files: , ; tab space (default: the delimiter of the run)')
+    args = parser.parse_args()
+    with Archive(args.archive) as archive:
+        if args.export is None:
+            print(json.dumps(archive.run, indent=1))
+            for table in archive.tables:
+                info = archive.info(table)
+                print('%-32s %9d rows  %s' % (table, info['rows'], ' '.join(info['columns'])))
+        else:
+            for address in archive.export(args.export, args.tables, {'tab': '\t', 'space': ' '}.get(args.delimiter,
+                                                                                                     args.delimiter)):
+                print(address)
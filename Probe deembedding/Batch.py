@@ -0,0 +1,73 @@
+#
+# Batch deembedding of many devices under test against the same probe model(s)
+# Every device under test has its own folder with MS11.CSV (one probe) or MS11, MS22, MS21, MS12.CSV (two probes);
+# S11A/S21A and ZA files are written into the same folder. The folders are processed by a pool of processes;
+# the probe models are sent to every process once when it starts and are used read-only.
+#
+
+import os
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import Precision
+from Acquisition import resolve
+from Calibration import deembed_files, run_deembedding
+
+worker_probes = None  # probe models of the current worker process
+
+def read_only(probe):
+    # Copy of the probe model with read-only views of its arrays: no device under test may change the shared model,
+    # while the arrays of the caller stay writeable
+    views = {}
+    for name, value in vars(probe).items():
+        if isinstance(value, np.ndarray):
+            views[name] = value.view()
+            views[name].flags.writeable = False
+    return dataclasses.replace(probe, **views)
+
+def init_worker(probes, precision='double'):
+    global worker_probes
+    Precision.mode = precision  # the worker process only deembeds in the precision of the batch
+    worker_probes = [read_only(probe) for probe in probes]
+
+def deembed_folder(folder, deliminput, delimoutput):
+    # Returns the folder, number of frequency points and the error message (None if successful)
+    try:
+        Stimulus, _, _ = deembed_files(worker_probes, folder, deliminput, delimoutput)
+        return folder, len(Stimulus), None
+    except (OSError, ValueError, IndexError) as error:
+        return folder, 0, str(error)
+
+def dut_folders(source):
+    # source - folder whose subfolders contain the measurements of the devices under test, or a manifest file
+    #          with one folder per line (relative to the manifest; lines starting with # are comments)
+    if os.path.isdir(source):
+        folders = [entry.path for entry in os.scandir(source)
+                   if entry.is_dir() and os.path.exists(resolve(entry.path, 'MS11.CSV'))]
+        return sorted(folders)
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as file:
+        lines = [line.strip() for line in file]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+def deembed_batch(probes, folders, deliminput=',', delimoutput=',', workers=None, precision='double'):
+    # probes - list of ProbeModel (one or two probes)
+    # folders - folders of the devices under test
+    # workers - number of processes (None - number of CPUs; 1 - no pool)
+    # precision - double or single (see Precision.py)
+    # Returns a list of (folder, number of frequency points, error message or None)
+    if workers == 1 or len(folders) <= 1:
+        with Precision.precision(precision):
+            init_worker(probes, precision)
+            return [deembed_folder(folder, deliminput, delimoutput) for folder in folders]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(probes, precision)) as pool:
+        chunksize = max(1, len(folders) // (4 * (workers or os.cpu_count() or 1)))
+        return list(pool.map(deembed_folder, folders, [deliminput] * len(folders), [delimoutput] * len(folders),
+                             chunksize=chunksize))
+
+def run_batch(config, source, workers=None):
+    # Calibrates the probes from config.folder (or loads them from config.probe_store) and deembeds all devices
+    # under test listed by source (see dut_folders)
+    probes = run_deembedding(dataclasses.replace(config, VNA=1)).probes
+    return deembed_batch(probes, dut_folders(source), config.deliminput, config.delimoutput, workers,
+                         config.precision)
@@ -0,0 +1,122 @@
+#
+# Content-addressed cache of the parsed measurement files
+# The parsed arrays are saved as .npy files named by the hash of the file content and the parsing parameters,
+# so re-running a calibration against unchanged files skips the text parsing. Other precomputed arrays (the
+# standards resampled on the frequency points by CubSpline.cubspl_many) are saved in the same way under the hash of
+# their inputs. The .npy files are loaded memory-mapped, so the arrays of a cache hit are read-only. The oldest files
+# are removed when the cache exceeds its size limit.
+# The cache is off unless it is enabled (cli.py --cache or PROBE_CACHE=1): it writes into the home folder.
+#
+# Environment variables:
+#   PROBE_CACHE_DIR - cache folder (default: ~/.cache/probe_deembedding)
+#   PROBE_CACHE_LIMIT - size limit in MB (default: 1024)
+#   PROBE_CACHE - set to 1 to enable the cache
+#
+
+import os
+import hashlib
+import numpy as np
+
+VERSION = b'1'  # change when the parsed format changes so that old entries are not used
+
+cache_dir = os.environ.get('PROBE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'probe_deembedding'))
+cache_limit = float(os.environ.get('PROBE_CACHE_LIMIT', 1024)) * 1024 * 1024  # bytes
+enabled = os.environ.get('PROBE_CACHE', '0') == '1'
+
+def file_key(address, *params):
+    # Hash of the file content and the parsing parameters (delimiter, port, options...)
+    h = hashlib.blake2b(VERSION, digest_size=20)
+    with open(address, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            h.update(block)
+    for p in params:
+        h.update(b'\0' + repr(p).encode())
+    return h.hexdigest()
+
+def array_key(*arrays):
+    # Hash of the content of arrays (e.g. the frequency grids of an interpolation)
+    h = hashlib.blake2b(VERSION, digest_size=20)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(repr((array.dtype.str, array.shape)).encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+def cached(address, params, parse):
+    # address - full address of the file
+    # params - tuple of the parsing parameters that change the result
+    # parse - function without arguments that parses the file and returns a tuple of arrays
+    if not enabled:
+        return parse()
+    return cached_key(file_key(address, *params), parse)
+
+def cached_key(key, parse):
+    # key - hash of everything the result depends on (file_key, array_key)
+    # parse - function without arguments that calculates the tuple of arrays if the cache has no entry
+    if not enabled:
+        return parse()
+    names = entry_names(key)
+    if names:
+        try:
+            arrays = tuple(np.load(name, mmap_mode='r') for name in names)
+            for name in names:
+                os.utime(name)  # recently used entries are evicted last
+            return arrays
+        except (OSError, ValueError):  # damaged entry: parse again
+            pass
+
+    arrays = parse()
+    store(key, arrays)
+    return arrays
+
+def entry_names(key):
+    # Existing .npy files of an entry: key_0.npy, key_1.npy, ... (the count is saved in key.n)
+    count_name = os.path.join(cache_dir, key + '.n')
+    try:
+        with open(count_name) as file:
+            count = int(file.read())
+    except (OSError, ValueError):
+        return None
+    names = [os.path.join(cache_dir, '%s_%d.npy' % (key, i)) for i in range(count)]
+    return names if all(os.path.exists(name) for name in names) else None
+
+def store(key, arrays):
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, array in enumerate(arrays):
+            name = os.path.join(cache_dir, '%s_%d.npy' % (key, i))
+            with open(name + '.tmp', 'wb') as file:
+                np.save(file, np.asarray(array))
+            os.replace(name + '.tmp', name)  # other processes never see a partly written file
+        with open(os.path.join(cache_dir, key + '.n.tmp'), 'w') as file:
+            file.write(str(len(arrays)))
+        os.replace(os.path.join(cache_dir, key + '.n.tmp'), os.path.join(cache_dir, key + '.n'))
+        evict()
+    except OSError:  # the cache is optional: a read-only or full disk must not stop the calculations
+        pass
+
+def evict(limit=None):
+    # Removes the least recently used entries until the cache size is below the limit (bytes)
+    limit = cache_limit if limit is None else limit
+    if not os.path.isdir(cache_dir):
+        return
+    entries = {}
+    for entry in os.scandir(cache_dir):
+        key = entry.name.split('_')[0].split('.')[0]
+        stat = entry.stat()
+        size, used = entries.get(key, (0, 0.0))
+        entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+    total = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= limit:
+            break
+        for entry in os.scandir(cache_dir):
+            if entry.name.startswith(key):
+                try:
+                    os.remove(entry.path)
+                except OSError:  # e.g. a file still memory-mapped on Windows
+                    pass
+        total -= size
+
+def clear():
+    evict(0)
@@ -0,0 +1,297 @@
+#
+# Headless pipeline of the probe deembedding algorithm
+# Pure functions take arrays and return arrays; run_deembedding() reads and writes the files described in main.py
+# without any prompts, so the algorithm can be called in-process from automation scripts.
+#
+
+import os
+from dataclasses import dataclass, asdict
+import numpy as np
+from Acquisition import acq, readtxt, resolve
+from Touchstone import s2p_array, read_touchstone, write_touchstone
+from CubSpline import cubspl_many
+from ErrorModel import three_term_error, correct_1port
+from Jumps import find_jumps
+from PhaseUnwrapping import unwrap_angle
+from Cascade import deembed_2port, magnitudes
+from NPort import fixture_from_probes, deembed, s_to_z
+from ProbeStore import input_hashes, save_probe, load_probe
+from Instrumentation import instrumented
+from Precision import precision, text_format, text_formats
+from Archive import ArchiveWriter, Output
+
+@dataclass
+class DeembeddingConfig:
+    folder: str  # folder where all input and output files are located
+    probe_flag: int = 1  # 1 - one probe (1-port measurements), 2 - two probes (2-port measurements), P - P probes
+                         # around the P-port device under test of dut_file
+    deliminput: str = ','  # delimiter used in the input files
+    delimoutput: str = ','  # delimiter used in the output files (S2P files always use tab or space)
+    ideal: int = 1  # 1 - ideal SOL terminations, 0 - S11S/S11O/S11L (S22S/S22O/S22L) files are provided
+    VNA: int = 0  # 1 - modern VNA with automatic S2P deembedding (only the probe models are created)
+    phase_factor: tuple = (None, None)  # phase factor of the probes 1, 2...; None - detected from the phase jumps
+    sol_files: tuple = None  # Touchstone files measured with SHORT, OPEN, LOAD on both probes (instead of MS11S.CSV...)
+    sol_options: str = '# Hz S RI R 50'  # option line of the sol_files if they have none (VNA exports)
+    probe_store: str = None  # folder of the saved probe models; None - the probes are calibrated on every run
+    dut_file: str = None  # Touchstone file (.snp) of a device under test measured through probe_flag probes
+    precision: str = 'double'  # double (complex128) or single (complex64), see Precision.py
+    archive: str = None  # result archive (Archive.py) of all output tables, relative to folder; None - no archive
+    text: bool = True  # write the output tables as text files (the Touchstone file of dut_file is always written)
+
+@dataclass
+class ProbeModel:
+    Stimulus: np.ndarray  # frequency points, Hz
+    x: np.ndarray  # S11 of the probe
+    y: np.ndarray  # S22 of the probe
+    z: np.ndarray  # z = S21**2 - S11 * S22
+    S21: np.ndarray  # S21 = S12 of the probe recovered from the unwrapped phase of z + x * y
+    phase: np.ndarray  # initial phase of z + x * y
+    unwrapped_phase: np.ndarray  # unwrapped phase of z + x * y (equal to phase if there are no jumps)
+    number_jumps: int = 0
+    phase_factor: int = None  # phase factor used for unwrapping (None if there are no jumps)
+    dt: float = None  # delay time along the probe, s (None if there are no jumps)
+
+    def s2p(self):
+        # 9 columns: frequency, Re[S11], Im[S11], Re[S21], Im[S21], Re[S12], Im[S12], Re[S22], Im[S22].
+        # For a probe, S21 = S12.
+        return np.column_stack((self.Stimulus, self.x.real, self.x.imag, self.S21.real, self.S21.imag,
+                                self.S21.real, self.S21.imag, self.y.real, self.y.imag))
+
+    def network(self):
+        # (N, 2, 2) S-matrices of the probe: port 1 - VNA, port 2 - device under test
+        return s2p_array(self.Stimulus, self.x, self.S21, self.S21, self.y)
+
+@dataclass
+class DeembeddingResult:
+    probes: list  # ProbeModel of the probe 1 (and the probe 2)
+    Stimulus: np.ndarray = None  # frequency points of the device under test (None if VNA = 1)
+    SA: np.ndarray = None  # S11A (one probe) or S21A (two probes) of the device under test
+    ZA: np.ndarray = None  # actual impedance of the device under test
+    # With config.dut_file, SA and ZA are the (N, P, P) S-matrices and impedance matrices of the device under test
+
+def ideal_standards(N):
+    # Ideal SHORT, OPEN and LOAD reflections over N frequency points
+    return np.full(N, complex(-1.0, 0.0)), np.full(N, complex(1.0, 0.0)), np.full(N, complex(0.0, 0.0))
+
+@instrumented('unwrap', lambda args, result: len(args[0]))
+def probe_transmission(Stimulus, transvar, phase, phase_factor, right_jump, verbose=False):
+    # S21 = S12 of the probe calculated as transvar^0.5 with the unwrapped phase of transvar
+    # Returns S21, unwrapped phase (before choosing the sign of the slope) and delay time (None if there are no jumps)
+    if len(right_jump) == 0:
+        slopesign = np.sign(phase[int(len(Stimulus) / 2.0)])
+        unwrapped_phase = phase
+        dt = None
+    else:
+        slopesign, dt, unwrapped_phase, _ = unwrap_angle(Stimulus, phase, phase_factor, right_jump, verbose)
+
+    # Choosing the proper sign of the slope: it must be negative
+    S21phase = unwrapped_phase if slopesign < 0 else -unwrapped_phase
+
+    S21 = (np.sqrt(np.abs(transvar)) * np.exp(0.5j * S21phase)).astype(transvar.dtype, copy=False)
+    return S21, unwrapped_phase, dt
+
+def calibrate_probe(Stimulus, MSS, MSO, MSL, SS=None, SO=None, SL=None, phase_factor=None):
+    # Stimulus - frequency points, Hz
+    # MSS, MSO, MSL - reflections measured from the probe terminated with SHORT, OPEN and LOAD
+    # SS, SO, SL - reflections of the SHORT, OPEN and LOAD on the same frequency points (None - ideal terminations)
+    # phase_factor - 1 if the phase jumps at pi/2, 2 if at pi; None - detected from the phase jumps
+    if SS is None:
+        SS, SO, SL = ideal_standards(len(Stimulus))
+    x, y, z = three_term_error(SS, SO, SL, MSS, MSO, MSL)
+    transvar = z + x * y  # definition of transvar (transmission variable)
+    phase = np.arctan2(transvar.imag, transvar.real)
+    right_jump, number_jumps, detected_factor = find_jumps(phase)
+    if phase_factor is None:
+        phase_factor = detected_factor
+    S21, unwrapped_phase, dt = probe_transmission(Stimulus, transvar, phase, phase_factor, right_jump)
+    return ProbeModel(Stimulus, x, y, z, S21, phase, unwrapped_phase, number_jumps,
+                      phase_factor if number_jumps else None, dt)
+
+def deembed_1port(MS11, probe):
+    # MS11 - reflection measured from the device under test through the probe (same frequency points)
+    # probe - ProbeModel of the probe 1
+    # Returns the actual reflection S11A and impedance ZA of the device under test
+    S11A = correct_1port(MS11, probe.x, probe.y, probe.z)
+    ZA = 50.0 * (1.0 + S11A) / (1.0 - S11A)
+    return S11A, ZA
+
+def deembed_2port_probes(MS11, MS21, MS12, MS22, probe1, probe2):
+    # MS11, MS21, MS12, MS22 - S-parameters measured through probe 1 + device under test + probe 2
+    # probe1, probe2 - ProbeModel of the probes
+    # Returns the actual transmission S21A and series impedance ZA of the device under test
+    return deembed_2port(MS11, MS21, MS12, MS22, probe1.s2p(), probe2.s2p())
+
+def deembed_nport(M, probes):
+    # M - (N, P, P) S-matrices measured through P probes (the probe n on the VNA port n)
+    # probes - ProbeModel of every probe
+    # Returns the (N, P, P) S-matrices of the device under test
+    if M.shape[1] != len(probes):
+        raise ValueError('%d-port measurements need %d probes, not %d' % (M.shape[1], M.shape[1], len(probes)))
+    return deembed(M, fixture_from_probes([probe.network() for probe in probes]))
+
+def load_standards(names, folder, delim, Stimulus):
+    # Reflections of the non-ideal self-made standards recalculated over the actual frequency sweep points
+    return cubspl_many([readtxt(resolve(folder, name), delim) for name in names], Stimulus)
+
+def probe_phase_factor(config, n):
+    # Phase factor of the probe n given in config (None - detected from the phase jumps)
+    return config.phase_factor[n - 1] if n <= len(config.phase_factor) else None
+
+def sol_file_names(config, n):
+    # Input files of the probe n: SOL measurements and, for non-ideal terminations, the standards
+    p = str(n) * 2  # 11 or 22
+    if config.sol_files is None:
+        names = ['MS%s%s.CSV' % (p, t) for t in 'SOL']
+    else:  # S(n, n) of the Touchstone files for the probe n, e.g. DogBonePCB_SHORT.s2p
+        names = list(config.sol_files)
+    if config.ideal == 0:
+        names += ['S%s%s.CSV' % (p, t) for t in 'SOL']
+    return names
+
+def read_sol(config, n):
+    # Stimulus, SOL measurements MSS, MSO, MSL of the probe n and the standards SS, SO, SL (None if ideal)
+    folder = config.folder
+    delim = config.deliminput
+    names = sol_file_names(config, n)
+    Stimulus, MSS = acq(names[0], folder, delim, n, config.sol_options)
+    _, MSO = acq(names[1], folder, delim, n, config.sol_options)
+    _, MSL = acq(names[2], folder, delim, n, config.sol_options)
+    if config.ideal == 0:
+        SS, SO, SL = load_standards(names[3:], folder, delim, Stimulus)
+    else:
+        SS, SO, SL = None, None, None
+    return Stimulus, MSS, MSO, MSL, SS, SO, SL
+
+def calibrate_from_files(config, n):
+    # ProbeModel of the probe n calculated from the files in config.folder
+    return calibrate_probe(*read_sol(config, n), probe_phase_factor(config, n))
+
+def probe_from_store(config, n):
+    # Returns the ProbeModel of the probe n from config.probe_store (calculated and saved if the store has no
+    # valid model) and True if it was loaded from the store
+    names = sol_file_names(config, n)
+    params = {'ideal': config.ideal, 'phase_factor': probe_phase_factor(config, n),
+              'sol_options': config.sol_options, 'deliminput': config.deliminput, 'port': n,
+              'precision': config.precision}
+    inputs = input_hashes([resolve(config.folder, name) for name in names], params)
+    address = os.path.join(config.probe_store, 'Probe_%d_model.npz' % n)
+    fields = load_probe(address, inputs)
+    if fields is not None:
+        return ProbeModel(**fields), True
+    probe = calibrate_from_files(config, n)
+    os.makedirs(config.probe_store, exist_ok=True)
+    save_probe(address, probe, inputs)
+    return probe, False
+
+def read_dut(folder, deliminput, probes):
+    # Stimulus and the device under test measured in folder through the probes: MS11 (one probe) or
+    # (MS11, MS21, MS12, MS22) (two probes); every file is checked against the frequency points of the probes
+    # before anything is deembedded
+    MS = []
+    for name in ('MS11.CSV',) if len(probes) == 1 else ('MS11.CSV', 'MS21.CSV', 'MS12.CSV', 'MS22.CSV'):
+        Stimulus, S = acq(name, folder, deliminput)
+        if len(Stimulus) != len(probes[0].Stimulus) or not np.allclose(Stimulus, probes[0].Stimulus):
+            raise ValueError('The device under test in %s was measured on other frequency points than the probes (%s)'
+                             % (folder, name))
+        MS.append(S)
+    return Stimulus, MS[0] if len(probes) == 1 else tuple(MS)
+
+def deembed_files(probes, folder, deliminput, delimoutput, output=None):
+    # Deembeds the device under test measured in folder (MS11.CSV for one probe; MS11, MS22, MS21, MS12.CSV
+    # for two probes), writes S11A/S21A and ZA files there (or to the Output output) and returns Stimulus, SA and ZA
+    output = output or Output(folder, delimoutput)
+    Stimulus, MS = read_dut(folder, deliminput, probes)
+    if len(probes) == 1:
+        SA, ZA = deembed_1port(MS, probes[0])
+        names = ('S11A.CSV', 'ZA_from_S11A.CSV')
+    else:
+        SA, ZA = deembed_2port_probes(*MS, probes[0], probes[1])
+        names = ('S21A.CSV', 'ZA_from_S21A.CSV')
+
+    LinMagSA, LogMagSA, LinMagZA, LogMagStimulus, LogMagZA = magnitudes(Stimulus, SA, ZA)
+    output.write(names[0], np.column_stack((Stimulus, SA.real, SA.imag, LinMagSA, LogMagSA)),
+                 ('Stimulus', 'Re', 'Im', 'LinMag', 'LogMag'), text_formats(5))
+    output.write(names[1], np.column_stack((Stimulus, ZA.real, ZA.imag, LinMagZA, LogMagStimulus, LogMagZA)),
+                 ('Stimulus', 'Re', 'Im', 'LinMag', 'LogMagStimulus', 'LogMag'), text_formats(6))
+    return Stimulus, SA, ZA
+
+def deembed_touchstone(probes, folder, filename, options='# Hz S RI R 50', delimoutput='\t'):
+    # Deembeds the P-port device under test measured in the Touchstone file (folder/filename) through P probes,
+    # writes its S-parameters as <name>_deembedded.snp and returns Stimulus, S-matrices and impedance matrices
+    Stimulus, M, z0 = read_touchstone(resolve(folder, filename), options)
+    if len(Stimulus) != len(probes[0].Stimulus) or not np.allclose(Stimulus, probes[0].Stimulus):
+        raise ValueError('%s was measured on other frequency points than the probes' % filename)
+    S = deembed_nport(M, probes)
+    P = S.shape[1]
+    address = os.path.join(folder, '%s_deembedded.s%dp' % (os.path.splitext(filename)[0], P))
+    write_touchstone(address, Stimulus, S, z0, delimiter=delimoutput if delimoutput.isspace() else '\t',
+                     number_format=text_format())
+    return Stimulus, S, s_to_z(S, z0)
+
+def save_probe_files(config, n, probe, output=None):
+    # Writes Probe_n_phase_initial.CSV, Probe_n_phase_unwrapped.CSV (if the phase jumps) and Probe_n.S2P
+    # into config.folder (or to the Output output)
+    output = output or Output(config.folder, config.delimoutput)
+    output.write('Probe_%d_phase_initial.CSV' % n, np.column_stack((probe.Stimulus, probe.phase)),
+                 ('Stimulus', 'phase'), text_formats(2))
+    if probe.number_jumps:
+        output.write('Probe_%d_phase_unwrapped.CSV' % n, np.column_stack((probe.Stimulus, probe.unwrapped_phase)),
+                     ('Stimulus', 'unwrapped_phase'), text_formats(2))
+    output.write('Probe_%d.S2P' % n, probe.s2p(), ('Stimulus', 'Re_S11', 'Im_S11', 'Re_S21', 'Im_S21', 'Re_S12',
+                                                   'Im_S12', 'Re_S22', 'Im_S22'), text_formats(9), 's2p')
+
+def run_metadata(config, probes):
+    # Parameters and results of a run saved in the result archive
+    return {'config': asdict(config),
+            'probes': [{'number_jumps': int(probe.number_jumps),
+                        'phase_factor': None if probe.phase_factor is None else int(probe.phase_factor),
+                        'dt': None if probe.dt is None else float(probe.dt)} for probe in probes]}
+
+def run_deembedding(config):
+    # Reads the measurement files from config.folder, writes the same output files as Deembedding.py
+    # and returns a DeembeddingResult
+    with precision(config.precision):
+        return run_pipeline(config)
+
+def run_pipeline(config):
+    # run_deembedding in the current precision; the result archive is written only if the run succeeds
+    if config.archive is None:
+        return run_outputs(config, Output(config.folder, config.delimoutput, config.text), [])
+    writer = ArchiveWriter(os.path.join(config.folder, config.archive))
+    probes = []
+    try:
+        result = run_outputs(config, Output(config.folder, config.delimoutput, config.text, writer), probes)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.meta['run'] = run_metadata(config, probes)
+    writer.close()
+    return result
+
+def run_outputs(config, output, probes):
+    # Calibrates the probes (appended to probes) and deembeds the device under test; the tables go to output
+    folder = config.folder
+    for n in range(1, config.probe_flag + 1):
+        if config.probe_store is None:
+            probe, stored = calibrate_from_files(config, n), False
+        else:
+            probe, stored = probe_from_store(config, n)
+        probes.append(probe)
+        if not stored:
+            save_probe_files(config, n, probe, output)
+        elif output.archive is not None:  # the text files of a stored model were written when it was calculated
+            save_probe_files(config, n, probe, Output(folder, config.delimoutput, False, output.archive))
+
+    result = DeembeddingResult(probes)
+    if config.dut_file is not None:
+        result.Stimulus, result.SA, result.ZA = deembed_touchstone(probes, folder, config.dut_file,
+                                                                   config.sol_options, config.delimoutput)
+        return result
+    if config.VNA == 1:
+        return result
+    if len(probes) > 2:
+        raise ValueError('More than two probes need the Touchstone file of the device under test (dut_file)')
+
+    result.Stimulus, result.SA, result.ZA = deembed_files(probes, folder, config.deliminput, config.delimoutput,
+                                                          output)
+    return result
@@ -0,0 +1,42 @@
+#
+# Numerical 2-port deembedding of the device under test between two probes
+# The probes form the block-diagonal fixture of the N-port engine (NPort.py)
+# All matrices are stacked along the first axis: (N, 2, 2) for N frequency points
+#
+
+import numpy as np
+from NPort import fixture_from_probes, deembed
+from Instrumentation import instrumented
+
+def s2p_columns(S2P):
+    # S2P - 9 columns: frequency, Re[S11], Im[S11], Re[S21], Im[S21], Re[S12], Im[S12], Re[S22], Im[S22]
+    S11 = S2P[:, 1] + 1j * S2P[:, 2]
+    S21 = S2P[:, 3] + 1j * S2P[:, 4]
+    S12 = S2P[:, 5] + 1j * S2P[:, 6]
+    S22 = S2P[:, 7] + 1j * S2P[:, 8]
+    return S11, S21, S12, S22
+
+def s2p_matrices(S11, S21, S12, S22):
+    # (N, 2, 2) S-matrices of the four 2-port S-parameters on N frequency points
+    S = np.stack([S11, S12, S21, S22], axis=-1)
+    return S.astype(np.result_type(S, np.complex64), copy=False).reshape(-1, 2, 2)
+
+def s2p_network(S2P):
+    # (N, 2, 2) S-matrices of a 9-column S2P model
+    return s2p_matrices(*s2p_columns(S2P))
+
+@instrumented('deembed', lambda args, result: len(result[0]))
+def deembed_2port(MS11, MS21, MS12, MS22, Probe1_S2P, Probe2_S2P):
+    # MS11, MS21, MS12, MS22 - S-parameters measured through probe 1 + device under test + probe 2
+    # Probe1_S2P, Probe2_S2P - 9-column S2P models of the probes on the same frequency points
+    M = s2p_matrices(MS11, MS21, MS12, MS22)
+    F = fixture_from_probes([s2p_network(Probe1_S2P), s2p_network(Probe2_S2P)], M.dtype)  # precision of MS
+    S21A = deembed(M, F)[:, 1, 0]
+    ZA = 100.0 * (1.0 - S21A) / S21A  # series impedance between two 50 Ohm ports
+    return S21A, ZA
+
+def magnitudes(Stimulus, SA, ZA):
+    # Magnitude columns of the output files: |SA|, log10(|SA|), |ZA|, log10(freq), log10(|ZA|)
+    LinMagSA = np.abs(SA)
+    LinMagZA = np.abs(ZA)
+    return LinMagSA, np.log10(LinMagSA), LinMagZA, np.log10(np.abs(Stimulus)), np.log10(LinMagZA)
@@ -1,22 +1,46 @@
 #
 # Cubic spline of the initial data (array CalS) and recalculating it on a new scale (Stimulus)
+# One complex spline is fitted for all data sets on the same frequencies (e.g. SHORT, OPEN and LOAD of a kit).
+# The fitted splines are kept in memory, and the resampled values are kept in the cache of Cache.py keyed by the
+# initial data and the new frequencies, so calibrating many probes against the same kit definition files does not
+# repeat the spline setup. If the frequencies already match, the data are returned without interpolation.
 #
 
 import numpy as np
-from scipy.interpolate import CubicSpline
+import Cache
+from Instrumentation import instrumented
+from Precision import complex_dtype
+
+MAX_SPLINES = 16  # fitted splines kept in memory
+splines = {}  # CubicSpline keyed by the hash of the initial data
+
+def fitted(freq, values):
+    # Complex spline of the initial data, reused while the data do not change
+    key = Cache.array_key(freq, values)
+    if key not in splines:
+        from scipy.interpolate import CubicSpline
+        if len(splines) >= MAX_SPLINES:
+            splines.pop(next(iter(splines)))  # the oldest spline
+        splines[key] = CubicSpline(freq, values, axis=0)
+    return splines[key]
+
+@instrumented('cubspl', lambda args, result: len(args[1]))
+def cubspl_many(CalS_list, Stimulus):
+    # CalS_list - arrays of 3 columns: frequency, Re, Im
+    # Returns the list of the complex values over the actual frequency sweep points (Stimulus) in the precision
+    # selected in Precision.py (the spline itself is always fitted in double precision)
+    freq = np.ascontiguousarray(CalS_list[0][:, 0], dtype=float)
+    if not all(len(CalS) == len(freq) and np.array_equal(CalS[:, 0], freq) for CalS in CalS_list[1:]):
+        return [cubspl(CalS, Stimulus) for CalS in CalS_list]
+    values = np.column_stack([CalS[:, 1] + 1j * CalS[:, 2] for CalS in CalS_list])
+    if len(freq) == len(Stimulus) and np.array_equal(freq, Stimulus):
+        S = values
+    elif Cache.enabled:
+        Stimulus = np.ascontiguousarray(Stimulus, dtype=float)
+        S = Cache.cached_key(Cache.array_key(freq, values, Stimulus), lambda: (fitted(freq, values)(Stimulus),))[0]
+    else:
+        S = fitted(freq, values)(Stimulus)
+    return [S[:, i].astype(complex_dtype()) for i in range(len(CalS_list))]
 
 def cubspl(CalS, Stimulus):
-    N = len(Stimulus)
-    freq = CalS[:, 0]  # Frequencies at which the self-made terminations were measured
-    Re = CalS[:, 1]  # Real part
-    Im = CalS[:, 2]  # Imaginary part
-    ReCub = CubicSpline(freq, Re)  # Cubic spline interpolation
-    ImCub = CubicSpline(freq, Im)  # Cubic spline interpolation
-    ReNew = ReCub(Stimulus)  # New values over the actual frequency sweep (Stimulus)
-    ImNew = ImCub(Stimulus)  # New values over the actual frequency sweep (Stimulus)
-    ReNew.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-    ImNew.reshape([N, ], order='F')  # Column-major (Fortran-style) order in memory
-    S = np.empty([N, ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S.real = ReNew
-    S.imag = ImNew
-    return S
\ No newline at end of file
+    return cubspl_many([CalS], Stimulus)[0]
@@ -4,12 +4,14 @@
 #
 
 import numpy as np
-import math
-from Acquisition import acq
-from scipy import linalg
-from PhaseUnwrapping import unwrap
-from CubSpline import cubspl
-from Jumps import jumps
+from Acquisition import acq, readtxt
+from Touchstone import write_s2p
+from ErrorModel import three_term_error, correct_1port
+from CubSpline import cubspl_many
+from Jumps import find_jumps
+from Cascade import deembed_2port, magnitudes
+from Calibration import probe_transmission
+from Instrumentation import savetxt
 
 # Initial configuration
 flag = 0
@@ -28,7 +30,7 @@ deliminput = input('Please choose the delimiter used in the input files ( , ; ta
 print('')
 
 delimoutput = input('''
-VNA (e.g. Rohde&Schwarz) may prefer the tab delimiter in S2P file. Please check when uploading the file on VNA. 
+S2P files are written in the Touchstone format with the tab delimiter (or space if chosen below).
 Please choose the delimiter used in the output files (, ; tab space ): ''')
 print('')
 
@@ -69,92 +71,50 @@ if ideal == 0:  # non-ideal terminations
 # To do so, we use cubic spline interpolation. Stimulus - actual frequency points
     # Non-ideal terminations for the probe 1
     address = folder + '\\' + 'S11S.CSV'
-    CalS11S = np.genfromtxt(address, delimiter=deliminput)
-    S11S = cubspl(CalS11S, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
+    CalS11S = readtxt(address, deliminput)
 
     address = folder + '\\' + 'S11O.CSV'
-    CalS11O = np.genfromtxt(address, delimiter=deliminput)
-    S11O = cubspl(CalS11O, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
+    CalS11O = readtxt(address, deliminput)
 
     address = folder + '\\' + 'S11L.CSV'
-    CalS11L = np.genfromtxt(address, delimiter=deliminput)
-    S11L = cubspl(CalS11L, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
+    CalS11L = readtxt(address, deliminput)
+    # Complex values recalculated over the actual frequency sweep points (one spline fit for the three standards)
+    S11S, S11O, S11L = cubspl_many([CalS11S, CalS11O, CalS11L], Stimulus)
 
     if probe_flag == 2:  # non-ideal terminations for the probe 2
         address = folder + '\\' + 'S22S.CSV'
-        CalS22S = np.genfromtxt(address, delimiter=deliminput)
-        S22S = cubspl(CalS22S, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
-
+        CalS22S = readtxt(address, deliminput)
+    
         address = folder + '\\' + 'S22O.CSV'
-        CalS22O = np.genfromtxt(address, delimiter=deliminput)
-        S22O = cubspl(CalS22O, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
-
+        CalS22O = readtxt(address, deliminput)
+    
         address = folder + '\\' + 'S22L.CSV'
-        CalS22L = np.genfromtxt(address, delimiter=deliminput)
-        S22L = cubspl(CalS22L, Stimulus)  # Complex values recalculated over the actual frequency sweep points.
-
+        CalS22L = readtxt(address, deliminput)
+        S22S, S22O, S22L = cubspl_many([CalS22S, CalS22O, CalS22L], Stimulus)
+    
 else:  # ideal terminations (option ideal = 1)
-    S11S = []
-    S11O = []
-    S11L = []
-    for i in range(len(Stimulus)):
-        S11S.append(complex(-1.0, 0.0))
-        S11O.append(complex(1.0, 0.0))
-        S11L.append(complex(0.0, 0.0))
+    S11S = np.full(len(Stimulus), complex(-1.0, 0.0))
+    S11O = np.full(len(Stimulus), complex(1.0, 0.0))
+    S11L = np.full(len(Stimulus), complex(0.0, 0.0))
 
     if probe_flag == 2:
-        S22S = []
-        S22O = []
-        S22L = []
-        for i in range(len(Stimulus)):
-            S22S.append(complex(-1.0, 0.0))
-            S22O.append(complex(1.0, 0.0))
-            S22L.append(complex(0.0, 0.0))
-
-# Function for solving the 3-term error model
-# AS - pre-saved reflection coefficient of the SHORT termination
-# AO - pre-saved reflection coefficient of the OPEN termination
-# AL - pre-saved reflection coefficient of the LOAD termination
-# AMS - measured reflection coefficient of the probe when it is terminated with SHORT
-# AMO - measured reflection coefficient of the probe when it is terminated with OPEN
-# AML - measured reflection coefficient of the probe when it is terminated with LOAD
-def three_term_error(AS, AO, AL, AMS, AMO, AML):
-    A = [[1.0, AS * AMS, AS],  # matrix of the 3-term model
-         [1.0, AO * AMO, AO],
-         [1.0, AL * AML, AL]]
-    b = [AMS, AMO, AML]
-    vector = linalg.solve(A, b)  # Parameters of the network: S11, S22, z = S21**2 - S11 * S22 (S21 = S12)
-    return vector
-
-# Arrays S11(f) = x and S22(f) = y
+        S22S = np.full(len(Stimulus), complex(-1.0, 0.0))
+        S22O = np.full(len(Stimulus), complex(1.0, 0.0))
+        S22L = np.full(len(Stimulus), complex(0.0, 0.0))
+
+# Arrays S11(f) = x and S22(f) = y solved for all frequency points at once (see ErrorModel.py)
 # S21 = S12 = +/-(z + x * y)**0.5; the sign has to be chosen from the condition of the negative phase slope
-x = []
-y = []
-z = []
-for i in range(len(Stimulus)):  # Loop over the actual frequency points
-    AS = S11S[i]  # SHORT dispersion
-    AO = S11O[i]  # OPEN dispersion
-    AL = S11L[i]  # LOAD dispersion
-    AMS = MS11S[i]  # Probe terminated with SHORT
-    AMO = MS11O[i]  # Probe terminated with OPEN
-    AML = MS11L[i]  # Probe terminated with LOAD
-    xyz = three_term_error(AS, AO, AL, AMS, AMO, AML)  # Solution (vector) of the 3-term error model
-    x.append(xyz[0])  # Dispersion of x
-    y.append(xyz[1])  # Dispersion of y
-    z.append(xyz[2])  # Dispersion of z
-
-x = np.array(x)
-y = np.array(y)
-z = np.array(z)
+x, y, z = three_term_error(S11S, S11O, S11L, MS11S, MS11O, MS11L)
 
 # S21 and S12 will be calculated as transvar^0.5 after unwrapping the phase of the complex transvar
 transvar = z + x * y  # definition of transvar (transmission variable)
 realtransvar = transvar.real  # real part
 imagtransvar = transvar.imag  # imaginary part
 phase = np.arctan2(imagtransvar, realtransvar)  # atan2 function at https://en.wikipedia.org/wiki/Atan2
+right_jump, number_jumps, detected_factor = find_jumps(phase)  # jumps are detected once and reused below
 
 phaseoutput = np.column_stack((Stimulus, phase))  # 2D array
-np.savetxt(folder + '\\' + 'Probe_1_phase_initial.CSV', phaseoutput, delimiter=delimoutput)
+savetxt(folder + '\\' + 'Probe_1_phase_initial.CSV', phaseoutput, delimiter=delimoutput)
 print('The probe 1 initial phase has been saved in Probe_1_phase_initial.csv')
 print('')
 
@@ -163,34 +123,23 @@ Later, choose the phase factor 1 if the phase jumps at pi/2, and the phase facto
 Push Enter when finish reading.""")
 print('')
 
+if detected_factor is not None:
+    print('Number of phase jumps = ', number_jumps, '; the jumps look like phase factor', detected_factor)
 phase_factor = int(input("Please enter the phase factor (1 or 2) as explained above: "))
 print('')
 
-number_jumps = jumps(realtransvar, imagtransvar)
-if number_jumps == 0:
-    slopesign = np.sign(phase[int(len(Stimulus) / 2.0)])
-else:
-    slopesign, dt, unwrapped_phase, initial_phase = unwrap(Stimulus, realtransvar, imagtransvar, phase_factor)
+# S21 and S12 calculated from the complex transvar = z + x * y with the unwrapped phase (see Calibration.py)
+S21, unwrapped_phase, dt = probe_transmission(Stimulus, transvar, phase, phase_factor, right_jump, verbose=True)
+if number_jumps != 0:
     unwrappedphaseoutput = np.column_stack((Stimulus, unwrapped_phase))  # 2D array
-    np.savetxt(folder + '\\' + 'Probe_1_phase_unwrapped.CSV', unwrappedphaseoutput, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'Probe_1_phase_unwrapped.CSV', unwrappedphaseoutput, delimiter=delimoutput)
     print('The probe 1 unwrapped phase has been saved in Probe_1_phase_unwrapped.csv')
     print('Delay time along the probe 1 = ', dt / 1.0e-12, 'ps')
     print('')
 
-# Choosing the proper sign of the slope: it must be negative
-if slopesign >= 0:
-    unwrapped_phase = -unwrapped_phase
-
-# Calculating S21 and S12 from the complex transvar = z + x * y with the unwrapped phase
 # Trans - transmission
-realTrans = []
-imagTrans = []
-for i in range(len(Stimulus)):
-    realTrans.append(((np.absolute(transvar[i]))**0.5) * np.cos(unwrapped_phase[i] / 2.0))
-    imagTrans.append(((np.absolute(transvar[i]))**0.5) * np.sin(unwrapped_phase[i] / 2.0))
-
-realTrans = np.array(realTrans)
-imagTrans = np.array(imagTrans)
+realTrans = S21.real
+imagTrans = S21.imag
 
 # S2P matrix of the probe 1
 #   Header: # Hz S RI R 50.0'
@@ -199,84 +148,39 @@ imagTrans = np.array(imagTrans)
 Probe1_S2P = np.column_stack((Stimulus, x.real, x.imag, realTrans, imagTrans, realTrans, imagTrans, y.real, y.imag))
 
 # Saving S2P file on PC
-np.savetxt(folder + '\\' + 'Probe_1.S2P', Probe1_S2P, delimiter=delimoutput, header='Hz S RI R 50.00')
+write_s2p(folder + '\\' + 'Probe_1.S2P', Probe1_S2P, delimoutput)  # Touchstone file, see Touchstone.py
 print('The probe 1 S2P file has been saved in Probe_1.s2p')
 print('')
 
 if probe_flag == 1 and VNA == 0:
     #  Forming outputs in the case of a simplified or old VNA (option 0) for a one port measurement
-    S11A = []
-    ZA = []
-    LinMagS11A = []
-    LogMagS11A = []
-    LinMagZA = []
-    LogMagZA = []
-    LogMagStimulus = []
     Stimulus, MS11 = acq('MS11.CSV', folder, deliminput)
-    Stimulus = np.array(Stimulus)  # array format
-    MS11 = np.array(MS11)  # array format
-    for i in range(len(Stimulus)):
-
-        LogMagStimulusvalue = math.log10(abs(Stimulus[i]))
-
-        S11Avalue = MS11[i] - x[i]
-        S11Avalue = S11Avalue / (z[i] + x[i] * y[i] + y[i] * (MS11[i] - x[i]))
-        LinMagS11Avalue = abs(S11Avalue)
-        LogMagS11Avalue = math.log10(LinMagS11Avalue)
-
-        ZAvalue = 50.0 * (complex(1.0, 0.0) + S11Avalue) / (complex(1.0, 0.0) - S11Avalue)
-        LinMagZAvalue = abs(ZAvalue)
-        LogMagZAvalue = math.log10(LinMagZAvalue)
-
-        S11A.append(S11Avalue)
-        ZA.append(ZAvalue)
-        LinMagS11A.append(LinMagS11Avalue)
-        LogMagS11A.append(LogMagS11Avalue)
-        LinMagZA.append(LinMagZAvalue)
-        LogMagZA.append(LogMagZAvalue)
-        LogMagStimulus.append(LogMagStimulusvalue)
-
-    S11A = np.array(S11A)  # array format for calculating the real and imaginary parts
-    ZA = np.array(ZA)  # array format for calculating the real and imaginary parts
+    S11A = correct_1port(MS11, x, y, z)  # all frequency points at once (see ErrorModel.py)
+    ZA = 50.0 * (1.0 + S11A) / (1.0 - S11A)
+    LinMagS11A, LogMagS11A, LinMagZA, LogMagStimulus, LogMagZA = magnitudes(Stimulus, S11A, ZA)
 
     OutputS11A = np.column_stack((Stimulus, S11A.real, S11A.imag, LinMagS11A, LogMagS11A))
-    np.savetxt(folder + '\\' + 'S11A.CSV', OutputS11A, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'S11A.CSV', OutputS11A, delimiter=delimoutput)
     print('The actual S11A of the device under test has been saved in S11A.csv')
     print('')
 
     OutputZA = np.column_stack((Stimulus, ZA.real, ZA.imag, LinMagZA, LogMagStimulus, LogMagZA))
-    np.savetxt(folder + '\\' + 'ZA_from_S11A.CSV', OutputZA, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'ZA_from_S11A.CSV', OutputZA, delimiter=delimoutput)
     print('The actual ZA of the device under test calculated from S11A has been saved in ZA_from_S11A.csv')
     print('')
 
 if probe_flag == 2:
-    x = []
-    y = []
-    z = []
-    for i in range(len(Stimulus)):  # Loop over the actual frequency points
-        AS = S22S[i]  # SHORT dispersion
-        AO = S22O[i]  # OPEN dispersion
-        AL = S22L[i]  # LOAD dispersion
-        AMS = MS22S[i]  # Probe terminated with SHORT
-        AMO = MS22O[i]  # Probe terminated with OPEN
-        AML = MS22L[i]  # Probe terminated with LOAD
-        xyz = three_term_error(AS, AO, AL, AMS, AMO, AML)  # Solution (vector) of the 3-term error model
-        x.append(xyz[0])  # Dispersion of x
-        y.append(xyz[1])  # Dispersion of y
-        z.append(xyz[2])  # Dispersion of z
-
-    x = np.array(x)
-    y = np.array(y)
-    z = np.array(z)
+    x, y, z = three_term_error(S22S, S22O, S22L, MS22S, MS22O, MS22L)  # 3-term error model of the probe 2
 
     # S21 and S12 will be calculated as transvar^0.5 after unwrapping the phase of the complex transvar
     transvar = z + x * y  # definition of transvar
     realtransvar = transvar.real
     imagtransvar = transvar.imag
     phase = np.arctan2(imagtransvar, realtransvar)  # atan2 function at https://en.wikipedia.org/wiki/Atan2
+    right_jump, number_jumps, detected_factor = find_jumps(phase)  # jumps are detected once and reused below
 
     phaseoutput = np.column_stack((Stimulus, phase))  # 2D array
-    np.savetxt(folder + '\\' + 'Probe_2_phase_initial.CSV', phaseoutput, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'Probe_2_phase_initial.CSV', phaseoutput, delimiter=delimoutput)
     print('The probe 2 initial phase has been saved in Probe_2_phase_initial.csv')
     print('')
 
@@ -285,34 +189,23 @@ if probe_flag == 2:
     Push Enter when finish reading.""")
     print('')
 
+    if detected_factor is not None:
+        print('Number of phase jumps = ', number_jumps, '; the jumps look like phase factor', detected_factor)
     phase_factor = int(input("Please enter the phase factor (1 or 2) as explained above: "))
     print('')
 
-    number_jumps = jumps(realtransvar, imagtransvar)
-    if number_jumps == 0:
-        slopesign = np.sign(phase[int(len(Stimulus) / 2.0)])
-    else:
-        slopesign, dt, unwrapped_phase, initial_phase = unwrap(Stimulus, realtransvar, imagtransvar, phase_factor)
+    # S21 and S12 calculated from the complex transvar = z + x * y with the unwrapped phase (see Calibration.py)
+    S21, unwrapped_phase, dt = probe_transmission(Stimulus, transvar, phase, phase_factor, right_jump, verbose=True)
+    if number_jumps != 0:
         unwrappedphaseoutput = np.column_stack((Stimulus, unwrapped_phase))  # 2D array
-        np.savetxt(folder + '\\' + 'Probe_2_phase_unwrapped.CSV', unwrappedphaseoutput, delimiter=delimoutput)
+        savetxt(folder + '\\' + 'Probe_2_phase_unwrapped.CSV', unwrappedphaseoutput, delimiter=delimoutput)
         print('The probe 2 unwrapped phase has been saved in Probe_2_phase_unwrapped.csv')
         print('Delay time along the probe 2 = ', dt / 1.0e-12, 'ps')
         print('')
 
-    # Choosing the proper sign of the slope: it must be negative
-    if slopesign >= 0:
-        unwrapped_phase = -unwrapped_phase
-
-    # Calculating S21 and S12 from the complex transvar = z + x * y with the unwrapped phase
     # Trans - transmission
-    realTrans = []
-    imagTrans = []
-    for i in range(len(Stimulus)):
-        realTrans.append(((np.absolute(transvar[i])) ** 0.5) * np.cos(unwrapped_phase[i] / 2.0))
-        imagTrans.append(((np.absolute(transvar[i])) ** 0.5) * np.sin(unwrapped_phase[i] / 2.0))
-
-    realTrans = np.array(realTrans)
-    imagTrans = np.array(imagTrans)
+    realTrans = S21.real
+    imagTrans = S21.imag
 
     # S2P matrix of the probe 2
     #   Header: # Hz S RI R 50.0'
@@ -321,7 +214,7 @@ if probe_flag == 2:
     Probe2_S2P = np.column_stack((Stimulus, x.real, x.imag, realTrans, imagTrans, realTrans, imagTrans, y.real, y.imag))
 
     # Saving S2P file on PC
-    np.savetxt(folder + '\\' + 'Probe_2.S2P', Probe2_S2P, delimiter=delimoutput, header='Hz S RI R 50.00')
+    write_s2p(folder + '\\' + 'Probe_2.S2P', Probe2_S2P, delimoutput)  # Touchstone file, see Touchstone.py
     print('The probe 2 S2P file has been saved in Probe_2.s2p')
     print('')
 
@@ -337,122 +230,16 @@ if probe_flag == 2 and VNA == 0:
     MS12 = np.array(MS12)
     Stimulus = np.array(Stimulus)
 
-    # S-parameter model of the first probe
-    a = Probe1_S2P[:,1]
-    b = Probe1_S2P[:,2]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S11_1 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S11_1.real = a
-    S11_1.imag = b
-    S11_1 = np.array(S11_1)
-
-    a = Probe1_S2P[:,3]
-    b = Probe1_S2P[:,4]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S21_1 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S21_1.real = a
-    S21_1.imag = b
-    S21_1 = np.array(S21_1)
-
-    a = Probe1_S2P[:,5]
-    b = Probe1_S2P[:,6]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S12_1 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S12_1.real = a
-    S12_1.imag = b
-    S12_1 = np.array(S12_1)
-
-    a = Probe1_S2P[:,7]
-    b = Probe1_S2P[:,8]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S22_1 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S22_1.real = a
-    S22_1.imag = b
-    S22_1 = np.array(S22_1)
-
-    # S-parameter model of the second probe
-    a = Probe2_S2P[:,1]
-    b = Probe2_S2P[:,2]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S11_2 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S11_2.real = a
-    S11_2.imag = b
-    S11_2 = np.array(S11_2)
-
-    a = Probe2_S2P[:,3]
-    b = Probe2_S2P[:,4]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S21_2 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S21_2.real = a
-    S21_2.imag = b
-    S21_2 = np.array(S21_2)
-
-    a = Probe2_S2P[:,5]
-    b = Probe2_S2P[:,6]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S12_2 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S12_2.real = a
-    S12_2.imag = b
-    S12_2 = np.array(S12_2)
-
-    a = Probe2_S2P[:,7]
-    b = Probe2_S2P[:,8]
-    a.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    b.reshape([len(Stimulus), ], order='F')  # Column-major (Fortran-style) order in memory
-    S22_2 = np.empty([len(Stimulus), ], dtype=np.complex128, order='F')  # Column of complex numbers
-    S22_2.real = a
-    S22_2.imag = b
-    S22_2 = np.array(S22_2)
-
-    S21A = []
-    ZA = []
-    LinMagS21A = []
-    LogMagS21A = []
-    LinMagZA = []
-    LogMagZA = []
-    LogMagStimulus = []
-    for i in range(len(Stimulus)):
-        PM = np.array([[MS12[i] * MS21[i] - MS11[i] * MS22[i], MS22[i]],
-                        [-MS11[i], complex(1.0, 0.0)]] / MS12[i])
-        InvP1 = np.array([[complex(1.0, 0.0), -S22_1[i]],
-                        [S11_1[i], S21_1[i] * S12_1[i] - S11_1[i] * S22_1[i]]] / S21_1[i])
-        InvP2 = np.array([[complex(1.0, 0.0), -S11_2[i]],
-                        [S22_2[i], S12_2[i] * S21_2[i] - S11_2[i] * S22_2[i]]] / S12_2[i])
-        PA = InvP2 @ (PM @ InvP1)
-
-        S21Avalue = PA[0][0] - PA[0][1] * PA[1][0] / PA[1][1]
-        ZAvalue = 100.0 * (complex(1.0, 0.0) - S21Avalue) / S21Avalue
-        S21A.append(S21Avalue)
-        ZA.append(ZAvalue)
-
-        LinMagS21Avalue = abs(S21Avalue)
-        LogMagS21Avalue = math.log10(LinMagS21Avalue)
-        LinMagZAvalue = abs(ZAvalue)
-        LogMagZAvalue = math.log10(LinMagZAvalue)
-        LogMagStimulusvalue = math.log10(abs(Stimulus[i]))
-
-        LinMagS21A.append(LinMagS21Avalue)
-        LogMagS21A.append(LogMagS21Avalue)
-        LinMagZA.append(LinMagZAvalue)
-        LogMagZA.append(LogMagZAvalue)
-        LogMagStimulus.append(LogMagStimulusvalue)
-
-    S21A = np.array(S21A)  # array format for calculating the real and imaginary parts
-    ZA = np.array(ZA)  # array format for calculating the real and imaginary parts
+    # Cascade of the T-matrices for all frequency points at once (see Cascade.py)
+    S21A, ZA = deembed_2port(MS11, MS21, MS12, MS22, Probe1_S2P, Probe2_S2P)
+    LinMagS21A, LogMagS21A, LinMagZA, LogMagStimulus, LogMagZA = magnitudes(Stimulus, S21A, ZA)
 
     OutputS21A = np.column_stack((Stimulus, S21A.real, S21A.imag, LinMagS21A, LogMagS21A))
-    np.savetxt(folder + '\\' + 'S21A.CSV', OutputS21A, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'S21A.CSV', OutputS21A, delimiter=delimoutput)
     print('The actual transmission S21A of DUT has been saved in S21A.csv')
     print('')
 
     OutputZA = np.column_stack((Stimulus, ZA.real, ZA.imag, LinMagZA, LogMagStimulus, LogMagZA))
-    np.savetxt(folder + '\\' + 'ZA_from_S21A.CSV', OutputZA, delimiter=delimoutput)
+    savetxt(folder + '\\' + 'ZA_from_S21A.CSV', OutputZA, delimiter=delimoutput)
     print('The actual impedance ZA of DUT calculated from S21A has been saved in ZA_from_S21A.csv')
     print('')
\ No newline at end of file
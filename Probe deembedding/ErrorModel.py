@@ -0,0 +1,54 @@
+#
+# Vectorized solution of the 3-term error model over the whole frequency sweep
+#
+
+import numpy as np
+from Instrumentation import instrumented
+from Precision import complex_dtype
+from NPort import planar_fixture, fixture_terms, deembed_planar
+
+@instrumented('three_term_error', lambda args, result: np.size(result[0]))
+def three_term_error(AS, AO, AL, AMS, AMO, AML):
+    # AS - pre-saved reflection coefficient of the SHORT termination (array or scalar)
+    # AO - pre-saved reflection coefficient of the OPEN termination (array or scalar)
+    # AL - pre-saved reflection coefficient of the LOAD termination (array or scalar)
+    # AMS - measured reflection coefficient of the probe when it is terminated with SHORT (array)
+    # AMO - measured reflection coefficient of the probe when it is terminated with OPEN (array)
+    # AML - measured reflection coefficient of the probe when it is terminated with LOAD (array)
+    #
+    # For every frequency point the 3-term model is the linear system
+    #   x + A * AM * y + A * z = AM,  A = AS, AO, AL
+    # Subtracting the rows pairwise eliminates x and leaves a 2x2 system for y and z,
+    # which is solved with Cramer's rule for all frequency points at once, in the precision selected in Precision.py.
+    AS, AO, AL, AMS, AMO, AML = np.broadcast_arrays(*[np.asarray(v, dtype=complex_dtype())
+                                                      for v in (AS, AO, AL, AMS, AMO, AML)])
+    a1 = AS * AMS - AO * AMO
+    b1 = AS - AO
+    c1 = AMS - AMO
+    a2 = AO * AMO - AL * AML
+    b2 = AO - AL
+    c2 = AMO - AML
+    det = a1 * b2 - a2 * b1  # determinant of the reduced 2x2 system
+    y = (c1 * b2 - c2 * b1) / det  # S22 of the probe
+    z = (a1 * c2 - a2 * c1) / det  # z = S21**2 - S11 * S22 (S21 = S12)
+    x = AMS - AS * AMS * y - AS * z  # S11 of the probe, back substitution into the SHORT row
+    return x, y, z
+
+@instrumented('deembed', lambda args, result: np.size(result))
+def correct_1port(MS11, x, y, z):
+    # MS11 - reflection measured from the device under test through the probe (array)
+    # x, y, z - error terms of the probe from three_term_error
+    # Returns the actual reflection S11A of the device under test
+    return (MS11 - x) / (z + x * y + y * (MS11 - x))
+
+def correct_2port(MS11, MS21, MS12, MS22, x1, y1, S21_1, x2, y2, S21_2):
+    # MS11, MS21, MS12, MS22 - S-parameters measured through probe 1 + device under test + probe 2
+    # x1, y1, S21_1 (x2, y2, S21_2) - S11, S22 and S21 = S12 of the probe 1 (2)
+    # Returns the actual transmission S21A of the device under test (NPort.deembed with the block-diagonal fixture).
+    # The arrays may have extra leading axes (e.g. Monte Carlo samples).
+    arrays = np.broadcast_arrays(MS11, MS21, MS12, MS22, x1, y1, S21_1, x2, y2, S21_2)
+    MS11, MS21, MS12, MS22, x1, y1, S21_1, x2, y2, S21_2 = arrays
+    dtype = np.result_type(*arrays, np.complex64)
+    M = np.array([[MS11, MS12], [MS21, MS22]], dtype=dtype)
+    F = planar_fixture([(x1, S21_1, S21_1, y1), (x2, S21_2, S21_2, y2)], dtype)
+    return deembed_planar(M, fixture_terms(F))[1, 0]
@@ -0,0 +1,153 @@
+#
+# Opt-in per-stage instrumentation of the deembedding pipeline
+# The stages (acq, cubspl, three_term_error, unwrap, deembed, write) record the wall time, the CPU time, the peak
+# memory allocated inside the stage (tracemalloc) and the number of frequency points processed.
+# Tracing the memory slows down the stages that allocate many Python objects (np.savetxt formats every number):
+# profile(memory=False) measures the times alone.
+# Nothing is recorded unless a profile is active: a disabled stage only checks that the list of profiles is empty.
+#
+# Usage:
+#   with profile() as report:
+#       run_deembedding(config)
+#   report.save('profile.json')
+# or profile(callback=print) to receive every StageRecord as soon as the stage ends.
+# Setting the environment variable PROBE_PROFILE=report.json profiles the whole run of any script
+# (e.g. Deembedding.py) and saves the report at exit; PROBE_PROFILE_MEMORY=0 turns off the memory tracing.
+#
+
+import os
+import time
+import json
+import atexit
+import functools
+import tracemalloc
+from dataclasses import dataclass, asdict
+import numpy as np
+
+profiles = []  # active profiles
+frames = []  # stages being measured (nested stages are allowed)
+
+@dataclass
+class StageRecord:
+    stage: str
+    wall: float  # wall time, s
+    cpu: float  # CPU time of the process, s
+    peak_memory: int  # peak of the memory allocated inside the stage, bytes
+    points: int  # frequency points processed
+    depth: int  # nesting level (0 - outermost stage)
+
+class Profile:
+    def __init__(self, callback=None, memory=True):
+        self.callback = callback  # function called with every StageRecord
+        self.memory = memory  # trace the memory allocations
+        self.records = []
+        self.started_tracing = False
+
+    def add(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self):
+        # Totals per stage: calls, wall and CPU time, points, largest peak memory
+        stages = {}
+        for r in self.records:
+            s = stages.setdefault(r.stage, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'points': 0, 'peak_memory': 0})
+            s['calls'] += 1
+            s['wall'] += r.wall
+            s['cpu'] += r.cpu
+            s['points'] += r.points
+            s['peak_memory'] = max(s['peak_memory'], r.peak_memory)
+        return stages
+
+    def report(self):
+        return {'stages': self.summary(), 'records': [asdict(r) for r in self.records]}
+
+    def save(self, address):
+        with open(address, 'w') as file:
+            json.dump(self.report(), file, indent=1)
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        profiles.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        profiles.remove(self)
+        if self.started_tracing and not profiles:
+            tracemalloc.stop()
+        return False
+
+def profile(callback=None, memory=True):
+    return Profile(callback, memory)
+
+class Frame:
+    # One stage being measured
+    def __init__(self, name, points):
+        self.name = name
+        self.points = points
+
+    def __enter__(self):
+        current, peak = tracemalloc.get_traced_memory()  # zeros if the memory is not traced
+        if frames:  # the peak of the outer stage must survive the reset below
+            frames[-1].peak = max(frames[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self.start_memory = self.peak = current
+        frames.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        frames.pop()
+        if frames:
+            frames[-1].peak = max(frames[-1].peak, self.peak)
+        record = StageRecord(self.name, wall, cpu, self.peak - self.start_memory, int(self.points), len(frames))
+        for p in profiles:
+            p.add(record)
+        return False
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+def stage(name, points=0):
+    # Context manager measuring a block of code as the stage name
+    if not profiles:
+        return NULL_STAGE
+    return Frame(name, points)
+
+def instrumented(name, points=None):
+    # Decorator measuring every call of a function as the stage name
+    # points - function of (args, result) returning the number of frequency points processed
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiles:
+                return function(*args, **kwargs)
+            with Frame(name, 0) as frame:
+                result = function(*args, **kwargs)
+                if points is not None:
+                    frame.points = points(args, result)
+            return result
+        return wrapper
+    return decorator
+
+@instrumented('write', lambda args, result: len(args[1]))
+def savetxt(fname, X, **kwargs):
+    # np.savetxt measured as the write stage
+    np.savetxt(fname, X, **kwargs)
+
+if os.environ.get('PROBE_PROFILE'):
+    environment_profile = profile(memory=os.environ.get('PROBE_PROFILE_MEMORY', '1') != '0').__enter__()
+    atexit.register(environment_profile.save, os.environ['PROBE_PROFILE'])
@@ -0,0 +1,123 @@
+#
+# Batched N-port deembedding of a device under test measured through fixtures (probes) on every port
+# The networks are stacks of S-matrices (N, P, P) for N frequency points. The fixture of a P-port device is a
+# 2P-port network: its ports 1..P face the VNA and the ports P+1..2P face the device. With the P x P blocks
+# F11, F12, F21, F22 of the fixture, the measured network is
+#   M = F11 + F12 G (I - F22 G)^-1 F21
+# and the S-matrices G of the device are recovered for all frequency points at once:
+#   X = F12^-1 (M - F11) F21^-1,  G = (I + X F22)^-1 X
+# One probe per port gives a block-diagonal fixture (fixture_from_probes); a fixture with crosstalk between the
+# wires of a multi-wire sample is a full 2P-port network. The 1-port and 2-port cases are the special cases P = 1, 2.
+# The matrices are processed in the planar layout (P, P, N): the products of small matrices are then a few
+# vectorized operations over the frequency points, several times faster than np.matmul on (N, P, P) stacks.
+# The inverses of 1 x 1, 2 x 2 and diagonal matrices are written out; other matrices use np.linalg.inv.
+# The planar functions accept more trailing axes than the frequency points, e.g. (P, P, M, N) for M Monte Carlo
+# samples (Uncertainty.py). The blocks of a fixture used for many measurements are prepared once (fixture_terms,
+# deembed_planar; see RealTime.py).
+#
+
+import numpy as np
+
+def planar(S):
+    # (N, P, P) stack -> (P, P, N) complex array (complex64 stacks stay in single precision)
+    S = np.asarray(S)
+    return np.ascontiguousarray(np.moveaxis(S.astype(np.result_type(S, np.complex64), copy=False), 0, -1))
+
+def stacked(A):
+    # (P, P, N) array -> (N, P, P) stack (a view: planar() of the stack does not copy it again)
+    return np.moveaxis(A, -1, 0)
+
+def product(A, B):
+    # Matrix products of two (P, Q, N) and (Q, R, N) arrays for all frequency points
+    return (A[:, :, None] * B[None]).sum(axis=1)
+
+def inverse(A):
+    # Inverse matrices of a (P, P, N) array for all frequency points
+    P = A.shape[0]
+    if P == 1:
+        return 1.0 / A
+    if P == 2:
+        det = A[0, 0] * A[1, 1] - A[0, 1] * A[1, 0]
+        return np.array([[A[1, 1], -A[0, 1]], [-A[1, 0], A[0, 0]]]) / det
+    diagonal = np.arange(P)
+    off = A.copy()
+    off[diagonal, diagonal] = 0.0
+    if not off.any():  # transmission blocks of a block-diagonal fixture
+        off[diagonal, diagonal] = 1.0 / A[diagonal, diagonal]
+        return off
+    return np.moveaxis(np.linalg.inv(np.moveaxis(A, (0, 1), (-2, -1))), (-2, -1), (0, 1))
+
+def add_identity(A):
+    # A + I for a (P, P, N) array (in place)
+    for i in range(A.shape[0]):
+        A[i, i] += 1.0
+    return A
+
+def planar_fixture(probes, dtype=None):
+    # probes - (S11, S21, S12, S22) of the probe of every port (arrays of the same shape, e.g. (N,) or (M, N))
+    # dtype - complex type of the fixture (None - the type of the probes)
+    # Returns the (2P, 2P, ...) block-diagonal fixture in the planar layout
+    P = len(probes)
+    dtype = dtype or np.result_type(*[S for probe in probes for S in probe], np.complex64)
+    shape = np.broadcast_shapes(*[np.shape(S) for probe in probes for S in probe])
+    F = np.zeros((2 * P, 2 * P) + shape, dtype=dtype)
+    for k, (S11, S21, S12, S22) in enumerate(probes):
+        F[k, k] = S11
+        F[k, P + k] = S12
+        F[P + k, k] = S21
+        F[P + k, P + k] = S22
+    return F
+
+def fixture_from_probes(probes, dtype=None):
+    # probes - (N, 2, 2) S-matrices of the probe of every port (port 1 - VNA, port 2 - device under test)
+    # dtype - complex type of the fixture (None - the type of the probes)
+    # Returns the (N, 2P, 2P) block-diagonal fixture
+    return stacked(planar_fixture([(S[:, 0, 0], S[:, 1, 0], S[:, 0, 1], S[:, 1, 1]) for S in probes], dtype))
+
+def fixture_blocks(F, P):
+    # Blocks F11, F12, F21, F22 of a (2P, 2P, N) fixture
+    return F[:P, :P], F[:P, P:], F[P:, :P], F[P:, P:]
+
+def check_shapes(M, F):
+    if M.ndim != 3 or M.shape[1] != M.shape[2]:
+        raise ValueError('The measured network must be an (N, P, P) stack of S-matrices')
+    P = M.shape[1]
+    if F.shape != (len(M), 2 * P, 2 * P):
+        raise ValueError('The fixture of a %d-port device must be an (N, %d, %d) stack on the same frequency points, '
+                         'not %s' % (P, 2 * P, 2 * P, F.shape))
+    return P
+
+def embed(G, F):
+    # G - (N, P, P) S-matrices of the device; F - (N, 2P, 2P) fixture
+    # Returns the (N, P, P) network measured through the fixture
+    G, F = np.asarray(G), np.asarray(F)
+    P = check_shapes(G, F)
+    Gp = planar(G)
+    F11, F12, F21, F22 = fixture_blocks(planar(F), P)
+    A = add_identity(-product(F22, Gp))  # I - F22 G
+    return stacked(F11 + product(product(F12, Gp), product(inverse(A), F21)))
+
+def fixture_terms(F):
+    # Blocks F11, F12^-1, F21^-1, F22 of a (2P, 2P, ...) planar fixture used by deembed_planar
+    F11, F12, F21, F22 = fixture_blocks(F, F.shape[0] // 2)
+    return F11, inverse(F12), inverse(F21), F22
+
+def deembed_planar(M, terms):
+    # M - (P, P, ...) planar network measured through the fixture; terms - fixture_terms of the fixture
+    # Returns the (P, P, ...) planar S-matrices of the device under test
+    F11, F12inv, F21inv, F22 = terms
+    X = product(product(F12inv, M - F11), F21inv)
+    A = add_identity(product(X, F22))  # I + X F22
+    return product(inverse(A), X)
+
+def deembed(M, F):
+    # M - (N, P, P) network measured through the fixture; F - (N, 2P, 2P) fixture
+    # Returns the (N, P, P) S-matrices of the device under test
+    M, F = np.asarray(M), np.asarray(F)
+    check_shapes(M, F)
+    return stacked(deembed_planar(planar(M), fixture_terms(planar(F))))
+
+def s_to_z(S, z0=50.0):
+    # (N, P, P) S-matrices -> impedance matrices Z = z0 (I + S) (I - S)^-1
+    Sp = planar(S)
+    return stacked(z0 * product(add_identity(Sp.copy()), inverse(add_identity(-Sp))))
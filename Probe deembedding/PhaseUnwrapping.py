@@ -3,40 +3,46 @@
 #
 
 import numpy as np
-from scipy import stats
+from Jumps import jump_mask
 
 def unwrap(f, Re, Im, phase_factor):
     # f - frequency array, Hz
-    # Re - Re[S21(f)] array
-    # Im - Im[S21(f)] array
+    # Re - Re[S21(f)] array; a 2D array (one sweep per row) unwraps many traces in one call
+    # Im - Im[S21(f)] array of the same shape as Re
     angle = np.arctan2(Im, Re)  # original phase array with jumps
-    unwangle = angle  # initial values for the unwrapped phase array
-    anglenum = len(angle)  # number of the phase values that must coincide with the number of frequencies
+    return unwrap_angle(f, angle, phase_factor)
 
-    # A phase jump consists only of two points - "left" and "right", which have opposite signs. No other points between.
-    left_jump = []  # array of the indexes for the jump "start points"
-    right_jump = []  # array of the indexes for the jump "stop points"
-
-    # Searching for the phase jumps.
-    for i in range(anglenum - 2):
-        sign = np.sign(angle[i] * angle[i + 1])
-        if sign < 0 and np.abs(angle[i + 2]) <= np.abs(angle[i + 1]):  # criteria for selecting a jump
-            left_jump.append(i)
-            right_jump.append(i + 1)
-
-    jumpnum = len(right_jump)  # number of the jump points
-    print('')
-    print('Number of phase jumps = ', jumpnum)
-    print('')
-
-    for i in range(jumpnum):
-        for j in range(anglenum):
-            if right_jump[i] <= j:
-                unwangle[j] = unwangle[j] - phase_factor * np.pi
-
-     #  Calculating the slope of the unwrapped phase
-    ratio = stats.linregress(f, unwangle)[0]
+def unwrap_angle(f, angle, phase_factor, right_jump=None, verbose=True):
+    # f - frequency array, Hz
+    # angle - original phase array with jumps, radians (1D or 2D with one sweep per row)
+    # phase_factor - 1 if the phase jumps at pi/2, 2 if the phase jumps at pi
+    # right_jump - indexes of the jump "stop points" already found with Jumps.find_jumps (1D only, optional)
+    # verbose - print the number of jumps (1D only)
+    angle = np.asarray(angle)
+    if angle.shape[-1] < 2:
+        raise ValueError('The phase must have at least 2 frequency points to find the delay time, not %d'
+                         % angle.shape[-1])
+    if right_jump is None:
+        jump = jump_mask(angle)
+    else:
+        jump = np.zeros(angle.shape, dtype=bool)
+        jump[right_jump] = True
+
+    jumpnum = np.count_nonzero(jump, axis=-1)  # number of the jump points
+    if verbose and angle.ndim == 1:
+        print('')
+        print('Number of phase jumps = ', jumpnum)
+        print('')
+
+    # Every point after a jump "stop point" is shifted down by phase_factor * pi per jump: the cumulative count of
+    # the jumps gives the total shift of each point in one pass
+    unwangle = angle - phase_factor * np.pi * np.cumsum(jump, axis=-1)
+
+    #  Calculating the slope of the unwrapped phase (least squares along the frequency axis)
+    f = np.asarray(f)
+    fc = f - np.mean(f, axis=-1, keepdims=True)
+    ratio = np.sum(fc * unwangle, axis=-1) / np.sum(fc * fc, axis=-1)
     slopesign = np.sign(ratio)  # sign of the slope of the unwrapped phase
     dt = np.abs(ratio) / (2.0 * np.pi)  # delay time (s) calculated from the slope of the unwrapped phase
 
-    return slopesign, dt, unwangle, angle
\ No newline at end of file
+    return slopesign, dt, unwangle, angle
@@ -0,0 +1,42 @@
+#
+# Precision of the complex arrays of the deembedding pipeline
+#   double - complex128 (default)
+#   single - complex64: half the memory and bandwidth, about 7 significant digits
+# The measured data, the error terms of the 3-term model, the cascade and the conversion to impedance follow the
+# selected precision. The frequencies, the spline fits of the standards and the slope of the unwrapped phase (delay
+# time) are always calculated in double precision. Text outputs are written with as many digits as the precision
+# holds. The error of the single precision on the bundled datasets is measured by benchmarks/accuracy.py.
+#
+# Usage:
+#   with precision('single'):
+#       run_deembedding(config)
+# or DeembeddingConfig(..., precision='single').
+#
+
+import contextlib
+import numpy as np
+
+PRECISIONS = {'double': (np.complex128, '%.18e'), 'single': (np.complex64, '%.9e')}  # dtype, text output format
+mode = 'double'  # current precision
+
+def complex_dtype():
+    return PRECISIONS[mode][0]
+
+def text_format():
+    return PRECISIONS[mode][1]
+
+def text_formats(columns):
+    # Formats of the columns of a text output; the first column (frequency) keeps all digits
+    return ['%.18e'] + [text_format()] * (columns - 1)
+
+@contextlib.contextmanager
+def precision(name):
+    # Selects the precision (double or single) inside a with block
+    global mode
+    if name not in PRECISIONS:
+        raise ValueError('Unknown precision %s: use %s' % (name, ' or '.join(PRECISIONS)))
+    previous, mode = mode, name
+    try:
+        yield
+    finally:
+        mode = previous
@@ -0,0 +1,44 @@
+#
+# Persistent store of the calibrated probe models: calibrate once, deembed many
+# A probe model (error terms x, y, z, recovered S21, phases and the unwrapping decisions) is saved in a .npz file
+# together with the hashes of the input files and parameters it was calculated from. A later run loads the model
+# only if the hashes still match, so the SOL solve and the phase unwrapping are skipped until the probe is
+# recalibrated (new SOL files) or the parameters change.
+#
+
+import json
+import dataclasses
+import numpy as np
+from Cache import file_key
+
+def input_hashes(addresses, params):
+    # addresses - full addresses of the input files (SOL measurements and standards)
+    # params - dict of the parameters that change the model (ideal, phase_factor, ...)
+    inputs = {address: file_key(address) for address in addresses}
+    inputs['params'] = json.dumps(params, sort_keys=True)
+    return inputs
+
+def save_probe(address, probe, inputs):
+    # address - full address of the .npz file
+    # probe - ProbeModel (dataclass) of the probe
+    # inputs - dict from input_hashes
+    fields = dataclasses.asdict(probe)
+    arrays = {name: value for name, value in fields.items() if isinstance(value, np.ndarray)}
+    meta = {name: value for name, value in fields.items() if not isinstance(value, np.ndarray)}
+    meta = {name: (value.item() if isinstance(value, np.generic) else value) for name, value in meta.items()}
+    with open(address, 'wb') as file:
+        np.savez(file, meta=json.dumps({'fields': meta, 'inputs': inputs}), **arrays)
+
+def load_probe(address, inputs=None):
+    # Returns the dict of the ProbeModel fields, or None if the file does not exist or was calculated
+    # from other inputs (inputs=None loads the model without checking)
+    try:
+        with np.load(address) as data:
+            meta = json.loads(str(data['meta']))
+            if inputs is not None and meta['inputs'] != inputs:
+                return None
+            fields = {name: data[name] for name in data.files if name != 'meta'}
+    except (OSError, KeyError, ValueError):
+        return None
+    fields.update(meta['fields'])
+    return fields
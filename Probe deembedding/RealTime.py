@@ -0,0 +1,231 @@
+#
+# Continuous deembedding of repeated sweeps of the device under test with the probes kept in memory
+# The probes are calibrated once; their error terms are folded into the inverted blocks of the fixture (HotProbes) so
+# that a sweep costs only a handful of vector operations. The sweeps come from a watched folder (new files
+# written by the VNA) or from a queue.Queue filled by another thread (e.g. VNAClient.py); the actual S-parameter
+# and impedance of every sweep are published to a ring buffer and, optionally, written as files.
+#   One probe: a sweep is a 3-column text file (frequency, Re[S11], Im[S11]) or a Touchstone file (S11 is used).
+#   Two probes: a sweep is a .s2p Touchstone file.
+# The latency of every sweep (correction, conversion to impedance, publishing to the ring buffer) is recorded and
+# compared with the budget; reading and writing the files are timed separately.
+# The sweeps are deembedded in the precision selected in Precision.py when the deembedder is created (cli.py
+# --precision).
+#
+# Example: python cli.py --folder data --probes 2 --sol-files A_SHORT.s2p A_OPEN.s2p A_LOAD.s2p --watch incoming
+#
+
+import os
+import time
+import queue
+import threading
+import numpy as np
+from Acquisition import parsetxt
+from Touchstone import is_touchstone, read_touchstone
+from Cascade import magnitudes
+from NPort import planar_fixture, fixture_terms, deembed_planar
+from Instrumentation import savetxt
+from Precision import complex_dtype, text_formats
+
+BUDGET = 0.010  # s, latency allowed for one sweep
+CAPACITY = 64  # sweeps kept in the ring buffer
+POLL = 0.05  # s, period of the scans of a watched folder
+SETTLE = 0.2  # s, a file is read only when it has not been modified for this time (the VNA finished writing it)
+EXTENSIONS = ('.csv', '.txt', '.s1p', '.s2p')
+
+class HotProbes:
+    # Error terms of the probes prepared for the correction of many sweeps on the same frequency points: the blocks of
+    # the fixture of NPort.py are inverted once and every sweep is deembedded with NPort.deembed_planar
+    def __init__(self, probes):
+        self.Stimulus = probes[0].Stimulus
+        self.ports = len(probes)
+        N = len(self.Stimulus)
+        if self.ports == 1:
+            # S11A = d / (w + y d), d = MS11 - x, w = z + x y: the fixture with S11 = x, S21 = w, S12 = 1, S22 = y
+            p = probes[0]
+            fixture = [(p.x, p.z + p.x * p.y, np.ones(N), p.y)]
+        else:
+            fixture = [(p.x, p.S21, p.S21, p.y) for p in probes]
+        self.dtype = complex_dtype()  # precision selected in Precision.py when the probes are prepared
+        self.terms = fixture_terms(planar_fixture(fixture, self.dtype))
+        self.M = np.empty((self.ports, self.ports, N), dtype=self.dtype)  # planar measured network
+
+    def correct(self, S, SA, ZA):
+        # S - MS11 (one probe) or (MS11, MS21, MS12, MS22) (two probes) on self.Stimulus
+        # SA, ZA - output arrays of the actual S11A/S21A and impedance of the device under test
+        if self.ports == 1:
+            self.M[0, 0] = S
+            SA[:] = deembed_planar(self.M, self.terms)[0, 0]
+            # ZA = 50 (1 + SA) / (1 - SA)
+            np.subtract(1.0, SA, out=ZA)
+            np.divide(SA + 1.0, ZA, out=ZA)
+            ZA *= 50.0
+            return
+        MS11, MS21, MS12, MS22 = S
+        self.M[0, 0], self.M[0, 1], self.M[1, 0], self.M[1, 1] = MS11, MS12, MS21, MS22
+        SA[:] = deembed_planar(self.M, self.terms)[1, 0]
+        # ZA = 100 (1 - SA) / SA
+        np.subtract(1.0, SA, out=ZA)
+        ZA /= SA
+        ZA *= 100.0
+
+class RingBuffer:
+    # The last sweeps deembedded; safe to read from other threads while the sweeps are added (the slot being written
+    # is not readable, so capacity - 1 sweeps can be read)
+    def __init__(self, capacity, N, dtype=None):
+        # dtype - complex type of the sweeps (None - the precision selected in Precision.py)
+        self.capacity = capacity
+        self.SA = np.zeros((capacity, N), dtype=dtype or complex_dtype())
+        self.ZA = np.zeros((capacity, N), dtype=dtype or complex_dtype())
+        self.times = np.zeros(capacity)  # time.time() when the sweep was published
+        self.latency = np.zeros(capacity)  # s
+        self.names = [None] * capacity
+        self.count = 0  # sweeps added since the start
+        self.lock = threading.Lock()
+
+    def slot(self):
+        # Index of the slot written by the next sweep
+        return self.count % self.capacity
+
+    def publish(self, name, latency):
+        with self.lock:
+            i = self.slot()
+            self.names[i] = name
+            self.times[i] = time.time()
+            self.latency[i] = latency
+            self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity - 1)
+
+    def latest(self, k=1):
+        # Copies of the last k sweeps, oldest first: names, SA (k, N), ZA (k, N), latencies
+        with self.lock:
+            k = min(k, len(self))
+            index = [(self.count - k + i) % self.capacity for i in range(k)]
+            return [self.names[i] for i in index], self.SA[index], self.ZA[index], self.latency[index]
+
+def read_sweep(address, ports, delim=',', options='# Hz S RI R 50'):
+    # Freq and the measured S-parameters of one sweep file (see the header); not cached: every file is read once
+    if is_touchstone(address):
+        Freq, S, _ = read_touchstone(address, options)
+        if ports == 1:
+            return Freq, S[:, 0, 0]
+        if S.shape[1] < 2:
+            raise ValueError('%s has one port; two probes need a .s2p file' % address)
+        return Freq, (S[:, 0, 0], S[:, 1, 0], S[:, 0, 1], S[:, 1, 1])
+    if ports != 1:
+        raise ValueError('%s is not a Touchstone file; two probes need a .s2p file' % address)
+    data = parsetxt(address, delim)
+    return data[:, 0], data[:, 1] + 1j * data[:, 2]
+
+def watch(folder, stop=None, poll=POLL, settle=SETTLE):
+    # Generator of the addresses of the new sweep files of folder, in the order of their modification times.
+    # Files present at the start are ignored. Ends when the threading.Event stop is set.
+    seen = {entry.path for entry in os.scandir(folder) if entry.is_file()}
+    while stop is None or not stop.is_set():
+        now = time.time()
+        new = []
+        for entry in os.scandir(folder):
+            if entry.path in seen or not entry.is_file() or not entry.name.lower().endswith(EXTENSIONS):
+                continue
+            mtime = entry.stat().st_mtime
+            if now - mtime >= settle:
+                new.append((mtime, entry.path))
+        for _, address in sorted(new):
+            seen.add(address)
+            yield address
+        if not new:
+            time.sleep(poll)
+
+def from_queue(sweeps, stop=None, timeout=POLL):
+    # Generator of the items of a queue.Queue until None is taken (or the threading.Event stop is set).
+    # An item is (name, Freq, S) with S as in HotProbes.correct, or the address of a sweep file.
+    while stop is None or not stop.is_set():
+        try:
+            item = sweeps.get(timeout=timeout)
+        except queue.Empty:
+            continue
+        if item is None:
+            return
+        yield item
+
+class RealTimeDeembedder:
+    def __init__(self, probes, capacity=CAPACITY, budget=BUDGET, output=None, delim=',', options='# Hz S RI R 50'):
+        # probes - ProbeModel of the probe 1 (and the probe 2)
+        # output - folder where S11A/S21A and ZA files of every sweep are written (None - ring buffer only)
+        self.probes = HotProbes(probes)
+        self.ring = RingBuffer(capacity, len(self.probes.Stimulus), self.probes.dtype)
+        self.formats = text_formats(5), text_formats(6)  # of the S-parameter and impedance output files
+        self.budget = budget
+        self.output = output
+        self.delim = delim  # delimiter of the input and output text files
+        self.options = options  # option line of the sweep Touchstone files without one (VNA exports)
+        self.overruns = 0  # sweeps processed slower than the budget
+        self.errors = []  # (name, error message) of the sweeps that could not be deembedded
+        self.read_time = 0.0  # s, total time of reading the sweep files
+        self.write_time = 0.0  # s, total time of writing the output files
+
+    def check(self, name, Freq):
+        Stimulus = self.probes.Stimulus
+        if len(Freq) != len(Stimulus) or not np.allclose(Freq, Stimulus):
+            raise ValueError('%s was measured on other frequency points than the probes' % name)
+
+    def process(self, name, Freq, S):
+        # Deembeds one sweep into the next slot of the ring buffer; returns the latency, s
+        start = time.perf_counter()
+        self.check(name, Freq)
+        i = self.ring.slot()
+        self.probes.correct(S, self.ring.SA[i], self.ring.ZA[i])
+        latency = time.perf_counter() - start
+        self.ring.publish(name, latency)
+        if latency > self.budget:
+            self.overruns += 1
+        if self.output is not None:
+            self.write(name, i)
+        return latency
+
+    def process_file(self, address):
+        start = time.perf_counter()
+        Freq, S = read_sweep(address, self.probes.ports, self.delim, self.options)
+        self.read_time += time.perf_counter() - start
+        return self.process(os.path.basename(address), Freq, S)
+
+    def write(self, name, i):
+        # Output files of the sweep in the ring buffer slot i, named after the sweep (same columns as Calibration.py)
+        start = time.perf_counter()
+        Stimulus, SA, ZA = self.probes.Stimulus, self.ring.SA[i], self.ring.ZA[i]
+        stem = os.path.splitext(name)[0]
+        names = ('S11A', 'ZA_from_S11A') if self.probes.ports == 1 else ('S21A', 'ZA_from_S21A')
+        LinMagSA, LogMagSA, LinMagZA, LogMagStimulus, LogMagZA = magnitudes(Stimulus, SA, ZA)
+        savetxt(os.path.join(self.output, '%s_%s.CSV' % (stem, names[0])),
+                np.column_stack((Stimulus, SA.real, SA.imag, LinMagSA, LogMagSA)), fmt=self.formats[0],
+                delimiter=self.delim)
+        savetxt(os.path.join(self.output, '%s_%s.CSV' % (stem, names[1])),
+                np.column_stack((Stimulus, ZA.real, ZA.imag, LinMagZA, LogMagStimulus, LogMagZA)),
+                fmt=self.formats[1], delimiter=self.delim)
+        self.write_time += time.perf_counter() - start
+
+    def run(self, sweeps, callback=None):
+        # sweeps - iterable of sweep file addresses or (name, Freq, S) items, e.g. watch(folder) or from_queue(q)
+        # callback - function called with (name, latency) after every sweep
+        # Runs until sweeps ends; a sweep that cannot be read or deembedded is recorded in self.errors
+        for item in sweeps:
+            try:
+                if isinstance(item, str):
+                    name, latency = os.path.basename(item), self.process_file(item)
+                else:
+                    name, latency = item[0], self.process(*item)
+            except (OSError, ValueError, IndexError) as error:
+                self.errors.append((item if isinstance(item, str) else item[0], str(error)))
+                continue
+            if callback is not None:
+                callback(name, latency)
+        return self
+
+    def statistics(self):
+        # Median and maximum latency (s) of the sweeps in the ring buffer, number of sweeps and overruns
+        latency = self.ring.latest(len(self.ring))[3]
+        return {'sweeps': self.ring.count, 'overruns': self.overruns, 'errors': len(self.errors),
+                'latency_median': float(np.median(latency)) if len(latency) else None,
+                'latency_max': float(latency.max()) if len(latency) else None,
+                'read_time': self.read_time, 'write_time': self.write_time}
@@ -0,0 +1,294 @@
+#
+# Bounded-memory streaming mode of the probe deembedding algorithm for very long sweeps
+# The text files are read, resampled, solved and written block by block (BLOCK frequency points at a time), so the
+# memory does not grow with the number of points. The calibration makes two passes over each probe:
+#   1. the SOL solve runs block by block; the error terms, the initial phase and the cumulative number of phase jumps
+#      of every point are appended to a binary file in a temporary folder, and the statistics of the slope of the
+#      unwrapped phase are accumulated;
+#   2. once the phase factor and the sign of the slope are known, the binary file is read back block by block
+#      (memory-mapped) to write the probe files and to deembed the device under test.
+# Only text files (MS11S.CSV...) can be streamed; Touchstone files and the probe store are not used in this mode.
+#
+
+import os
+import itertools
+import tempfile
+from dataclasses import dataclass
+import numpy as np
+from Acquisition import resolve
+from CubSpline import fitted
+from ErrorModel import three_term_error, correct_1port
+from Jumps import jump_mask
+from Cascade import deembed_2port, magnitudes
+from Calibration import ideal_standards, sol_file_names, probe_phase_factor
+
+BLOCK = 65536  # frequency points per block: the memory used is proportional to this number
+SPLINE_MARGIN = 32  # extra knots on both sides of a block: the influence of a knot on a cubic spline decays as 0.27^n
+
+# One record per frequency point in the binary file of a probe
+RECORD = np.dtype([('f', np.float64), ('x', np.complex128), ('y', np.complex128), ('z', np.complex128),
+                   ('angle', np.float64), ('jumps', np.int64)])
+
+def read_blocks(address, delim, block=BLOCK):
+    # Generator of the blocks (2D arrays of at most block rows) of a text file with columns of numbers
+    with open(address, 'r') as file:
+        while True:
+            lines = list(itertools.islice(file, block))
+            if not lines:
+                return
+            try:
+                data = np.loadtxt(lines, delimiter=None if delim.isspace() else delim, ndmin=2)
+            except ValueError:
+                data = np.genfromtxt(lines, delimiter=delim)
+            if data.size:
+                yield data
+
+def acq_blocks(filename, folder, delim, block=BLOCK):
+    # Generator of (Freq, S) blocks of a measurement file (first column - frequency, then real and imaginary parts)
+    for data in read_blocks(resolve(folder, filename), delim, block):
+        yield data[:, 0], data[:, 1] + 1j * data[:, 2]
+
+class SplineWindow:
+    # Cubic spline of a self-made standard (see CubSpline.py) evaluated block by block. Only the knots around the
+    # current block are kept: the spline of the window differs from the spline of the whole file by less than
+    # the rounding errors, because the window exceeds the block by SPLINE_MARGIN knots on both sides.
+    def __init__(self, blocks, margin=SPLINE_MARGIN):
+        self.blocks = blocks  # generator of the blocks of the standard file (read_blocks)
+        self.margin = margin
+        self.data = np.empty((0, 3))
+        self.done = False
+
+    def __call__(self, Stimulus):
+        while not self.done and np.count_nonzero(self.data[:, 0] > Stimulus[-1]) < self.margin:
+            block = next(self.blocks, None)
+            if block is None:
+                self.done = True
+            else:
+                self.data = np.concatenate((self.data, block[:, :3]))
+        start = max(np.searchsorted(self.data[:, 0], Stimulus[0]) - self.margin, 0)
+        self.data = self.data[start:]  # the knots below the block are not needed any more
+        return fitted(self.data[:, 0], self.data[:, 1] + 1j * self.data[:, 2])(Stimulus)
+
+class PhaseStream:
+    # Phase jump detection carried across the block boundaries. A point is a jump "stop point" depending on its
+    # neighbours on both sides (see Jumps.py), so the last point of a block is held back until the next block arrives.
+    # Also accumulates the jump heights and the centered sums of the least-squares slope of the unwrapped phase
+    # angle - phase_factor * pi * jumps, so the slope can be found for any phase factor after a single pass.
+    def __init__(self):
+        self.previous = None  # last released record (left neighbour of the held back records)
+        self.pending = np.empty(0, dtype=RECORD)  # records whose jump flag is not known yet
+        self.jumps = 0  # cumulative number of jumps up to the last released record
+        self.heights = []  # |phase| at which every jump starts
+        self.n = 0
+        self.mean = np.zeros(3)  # means of f, angle and jumps
+        self.comoment = np.zeros(3)  # centered sums of f * f, f * angle and f * jumps
+
+    def push(self, records):
+        # records - new records (fields f, x, y, z, angle); returns the records released with their jumps field
+        return self.release(np.concatenate((self.pending, records)), final=False)
+
+    def finish(self):
+        # Releases the held back records at the end of the sweep (the last point is never a jump stop point)
+        return self.release(self.pending, final=True)
+
+    def release(self, records, final):
+        start = 0 if self.previous is None else 1
+        if self.previous is not None:
+            records = np.concatenate((self.previous, records))
+        stop = len(records) if final else len(records) - 1
+        if stop <= start:
+            self.pending = records[start:]
+            return np.empty(0, dtype=RECORD)
+
+        jump = jump_mask(records['angle'])[start:stop]
+        out = records[start:stop].copy()
+        out['jumps'] = self.jumps + np.cumsum(jump)
+        self.jumps = int(out['jumps'][-1])
+        self.heights.extend(np.abs(records['angle'][start - 1 + np.flatnonzero(jump)]).tolist())
+        self.previous = out[-1:]
+        self.pending = records[stop:]
+        self.accumulate(out)
+        return out
+
+    def accumulate(self, out):
+        # Chan's pairwise update of the means and the centered sums with the statistics of a block
+        v = np.column_stack((out['f'], out['angle'], out['jumps']))
+        n = len(v)
+        mean = v.mean(axis=0)
+        d = v - mean
+        comoment = d[:, 0] @ d
+        delta = mean - self.mean
+        total = self.n + n
+        self.comoment += comoment + delta[0] * delta * self.n * n / total
+        self.mean += delta * n / total
+        self.n = total
+
+    def phase_factor(self):
+        # Phase factor detected from the jump heights as in Jumps.find_jumps (None if there are no jumps)
+        if not self.heights:
+            return None
+        return 2 if np.median(self.heights) > 0.75 * np.pi else 1
+
+    def slope(self, phase_factor):
+        # Least-squares slope of the unwrapped phase, rad/Hz
+        return (self.comoment[1] - phase_factor * np.pi * self.comoment[2]) / self.comoment[0]
+
+@dataclass
+class StreamedProbe:
+    address: str  # binary file of the records of the probe
+    points: int  # number of frequency points
+    number_jumps: int = 0
+    phase_factor: int = None  # phase factor used for unwrapping (None if there are no jumps)
+    slopesign: float = -1.0  # sign of the slope of the unwrapped phase
+    dt: float = None  # delay time along the probe, s (None if there are no jumps)
+
+    def read(self, start, stop):
+        # Records start...stop - 1 read back from the binary file
+        records = np.memmap(self.address, dtype=RECORD, mode='r', shape=(self.points,))
+        return np.array(records[start:stop])
+
+    def blocks(self, block=BLOCK):
+        # Generator of the record blocks of the whole sweep
+        for start in range(0, self.points, block):
+            yield self.read(start, start + block)
+
+    def unwrapped_phase(self, records):
+        if self.number_jumps == 0:
+            return records['angle']
+        return records['angle'] - self.phase_factor * np.pi * records['jumps']
+
+    def s2p(self, records):
+        # 9 columns of Probe_n.S2P for a block of records (see Calibration.ProbeModel.s2p)
+        x, y, z = records['x'], records['y'], records['z']
+        unwrapped_phase = self.unwrapped_phase(records)
+        S21phase = unwrapped_phase if self.slopesign < 0 else -unwrapped_phase
+        S21 = np.sqrt(np.abs(z + x * y)) * np.exp(0.5j * S21phase)
+        return np.column_stack((records['f'], x.real, x.imag, S21.real, S21.imag, S21.real, S21.imag, y.real, y.imag))
+
+def check_blocks(blocks, names, folder):
+    # blocks - (Freq, S) blocks read at the same time from the files names (None if a file has ended)
+    # Raises ValueError unless all blocks have the same frequency points
+    first = next(block for block in blocks if block is not None)
+    for block in blocks:
+        if block is None or len(block[0]) != len(first[0]):
+            raise ValueError('The files %s in %s have different numbers of points' % (', '.join(names), folder))
+        if not np.allclose(block[0], first[0]):
+            raise ValueError('The files %s in %s were measured on different frequency points'
+                             % (', '.join(names), folder))
+
+def sol_blocks(config, n, block=BLOCK):
+    # Generator of the (Stimulus, MSS, MSO, MSL, SS, SO, SL) blocks of the probe n
+    if config.sol_files is not None:
+        raise ValueError('Only text files (MS11S.CSV...) can be used in the streaming mode')
+    folder = config.folder
+    delim = config.deliminput
+    names = sol_file_names(config, n)
+    measured = [acq_blocks(name, folder, delim, block) for name in names[:3]]
+    standards = [SplineWindow(read_blocks(resolve(folder, name), delim, block)) for name in names[3:]]
+    for blocks in itertools.zip_longest(*measured):
+        check_blocks(blocks, names[:3], folder)
+        (Stimulus, MSS), (_, MSO), (_, MSL) = blocks
+        if standards:
+            SS, SO, SL = [standard(Stimulus) for standard in standards]
+        else:
+            SS, SO, SL = ideal_standards(len(Stimulus))
+        yield Stimulus, MSS, MSO, MSL, SS, SO, SL
+
+def calibrate_stream(config, n, workdir, block=BLOCK):
+    # First pass over the SOL files of the probe n: writes Probe_n_phase_initial.CSV and the binary file of the
+    # records to workdir; returns a StreamedProbe
+    phase = PhaseStream()
+    address = os.path.join(workdir, 'Probe_%d.bin' % n)
+    with open(address, 'wb') as binary, open(os.path.join(config.folder, 'Probe_%d_phase_initial.CSV' % n),
+                                             'w') as initial:
+        for Stimulus, MSS, MSO, MSL, SS, SO, SL in sol_blocks(config, n, block):
+            records = np.empty(len(Stimulus), dtype=RECORD)
+            records['f'] = Stimulus
+            records['x'], records['y'], records['z'] = three_term_error(SS, SO, SL, MSS, MSO, MSL)
+            transvar = records['z'] + records['x'] * records['y']
+            records['angle'] = np.arctan2(transvar.imag, transvar.real)
+            np.savetxt(initial, np.column_stack((Stimulus, records['angle'])), delimiter=config.delimoutput)
+            binary.write(phase.push(records).tobytes())
+        binary.write(phase.finish().tobytes())
+
+    probe = StreamedProbe(address, phase.n, phase.jumps)
+    if probe.points == 0:
+        raise ValueError('The SOL files of the probe %d contain no data' % n)
+    if probe.number_jumps == 0:  # as in Calibration.probe_transmission
+        middle = int(probe.points / 2.0)
+        probe.slopesign = np.sign(probe.read(middle, middle + 1)['angle'][0])
+    else:
+        probe.phase_factor = probe_phase_factor(config, n) or phase.phase_factor()
+        ratio = phase.slope(probe.phase_factor)
+        probe.slopesign = np.sign(ratio)
+        probe.dt = np.abs(ratio) / (2.0 * np.pi)
+    return probe
+
+def write_probe_files(probe, n, folder, delimoutput, block=BLOCK):
+    # Second pass: Probe_n_phase_unwrapped.CSV (if there are jumps) and Probe_n.S2P
+    delimiter = delimoutput if delimoutput.isspace() else '\t'  # see Touchstone.write_s2p
+    unwrapped = None
+    if probe.number_jumps:
+        unwrapped = open(os.path.join(folder, 'Probe_%d_phase_unwrapped.CSV' % n), 'w')
+    with open(os.path.join(folder, 'Probe_%d.S2P' % n), 'w') as s2p:
+        s2p.write('# %s S %s R %g\n' % ('Hz', 'RI', 50.0))
+        for records in probe.blocks(block):
+            np.savetxt(s2p, probe.s2p(records), delimiter=delimiter, fmt='%.18e')
+            if unwrapped is not None:
+                np.savetxt(unwrapped, np.column_stack((records['f'], probe.unwrapped_phase(records))),
+                           delimiter=delimoutput)
+    if unwrapped is not None:
+        unwrapped.close()
+
+def deembed_stream(probes, folder, deliminput, delimoutput, block=BLOCK):
+    # Deembeds the device under test block by block and writes S11A/S21A and ZA files (see
+    # Calibration.deembed_files); returns the number of points
+    if len(probes) == 1:
+        names = ('MS11.CSV',)
+        outputs = ('S11A.CSV', 'ZA_from_S11A.CSV')
+    else:
+        names = ('MS11.CSV', 'MS21.CSV', 'MS12.CSV', 'MS22.CSV')
+        outputs = ('S21A.CSV', 'ZA_from_S21A.CSV')
+    if any(probe.points != probes[0].points for probe in probes):
+        raise ValueError('The probes were calibrated on different numbers of points')
+    measured = [acq_blocks(name, folder, deliminput, block) for name in names]
+    start = 0
+    with open(os.path.join(folder, outputs[0]), 'w') as sa_file, open(os.path.join(folder, outputs[1]), 'w') as za_file:
+        for blocks in itertools.zip_longest(*measured):
+            check_blocks(blocks, names, folder)
+            Stimulus = blocks[0][0]
+            stop = start + len(Stimulus)
+            records = [probe.read(start, stop) for probe in probes]
+            if stop > probes[0].points or not all(np.allclose(Stimulus, r['f']) for r in records):
+                raise ValueError('The device under test in %s was measured on other frequency points than the probes'
+                                 % folder)
+            if len(probes) == 1:
+                SA = correct_1port(blocks[0][1], records[0]['x'], records[0]['y'], records[0]['z'])
+                ZA = 50.0 * (1.0 + SA) / (1.0 - SA)
+            else:
+                MS11, MS21, MS12, MS22 = [S for _, S in blocks]
+                SA, ZA = deembed_2port(MS11, MS21, MS12, MS22, probes[0].s2p(records[0]), probes[1].s2p(records[1]))
+
+            LinMagSA, LogMagSA, LinMagZA, LogMagStimulus, LogMagZA = magnitudes(Stimulus, SA, ZA)
+            np.savetxt(sa_file, np.column_stack((Stimulus, SA.real, SA.imag, LinMagSA, LogMagSA)),
+                       delimiter=delimoutput)
+            np.savetxt(za_file, np.column_stack((Stimulus, ZA.real, ZA.imag, LinMagZA, LogMagStimulus, LogMagZA)),
+                       delimiter=delimoutput)
+            start = stop
+    if start != probes[0].points:
+        raise ValueError('The device under test in %s was measured on other frequency points than the probes' % folder)
+    return start
+
+def run_streaming(config, block=BLOCK, workdir=None):
+    # Same output files as Calibration.run_deembedding, with the memory bounded by the block size.
+    # workdir - folder of the temporary binary files of the probes (default: the system temporary folder)
+    # Returns the list of StreamedProbe (their binary files are removed on return)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        probes = []
+        for n in range(1, config.probe_flag + 1):
+            probe = calibrate_stream(config, n, tmp, block)
+            write_probe_files(probe, n, config.folder, config.delimoutput, block)
+            probes.append(probe)
+        if config.VNA == 0:
+            deembed_stream(probes, config.folder, config.deliminput, config.delimoutput, block)
+    return probes
@@ -0,0 +1,193 @@
+#
+# Reading and writing Touchstone files (.s1p, .s2p, ... .snp), versions 1.0 and 2.0
+# S-parameters are returned and accepted as (N, P, P) complex arrays for N frequency points and P ports
+#
+
+import re
+import numpy as np
+from Instrumentation import instrumented
+
+UNITS = {'HZ': 1.0, 'KHZ': 1.0e3, 'MHZ': 1.0e6, 'GHZ': 1.0e9}
+DEFAULT_OPTIONS = '# GHz S MA R 50'  # options assumed by the Touchstone specification if the file has no option line
+
+def parse_options(line):
+    # line - option line, e.g. '# Hz S RI R 50.00'
+    # Returns the frequency multiplier, parameter type, data format and reference impedance
+    unit, parameter, fmt, z0 = 1.0e9, 'S', 'MA', 50.0
+    words = line.lstrip('#').upper().split()
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in UNITS:
+            unit = UNITS[word]
+        elif word in ('S', 'Y', 'Z', 'H', 'G'):
+            parameter = word
+        elif word in ('RI', 'MA', 'DB'):
+            fmt = word
+        elif word == 'R' and i + 1 < len(words):
+            z0 = float(words[i + 1])
+            i += 1
+        i += 1
+    return unit, parameter, fmt, z0
+
+def to_complex(a, b, fmt):
+    # Pairs of numbers in the RI, MA or DB format converted to complex values
+    if fmt == 'RI':
+        return a + 1j * b
+    if fmt == 'DB':
+        a = 10.0 ** (a / 20.0)
+    return a * np.exp(1j * np.deg2rad(b))
+
+def from_complex(S, fmt):
+    # Complex values converted to pairs of numbers in the RI, MA or DB format
+    if fmt == 'RI':
+        return S.real, S.imag
+    mag = np.abs(S)
+    if fmt == 'DB':
+        mag = 20.0 * np.log10(mag)
+    return mag, np.rad2deg(np.angle(S))
+
+def ports_from_name(filename):
+    # Number of ports from the file extension: .s2p -> 2
+    match = re.search(r'\.s(\d+)p$', filename, re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+def is_touchstone(filename):
+    return ports_from_name(filename) is not None
+
+def read_touchstone(address, options=None):
+    # address - full address of the file
+    # options - option line used if the file has none (the VNA exports, e.g. DogBonePCB_OPEN.s2p, have no option
+    #           line and are written in '# Hz S RI R 50'); by default the Touchstone specification default is used
+    # Returns Freq (Hz), S (N, P, P) complex array and the reference impedance
+    with open(address, 'r') as file:
+        text = file.read()
+
+    P = ports_from_name(address)
+    option_line, rest = None, text.lstrip()
+    if rest.startswith('#'):
+        option_line, _, rest = rest.partition('\n')
+    if '!' not in rest and '[' not in rest and '#' not in rest:  # plain version 1.0 data: parsed at once
+        data = np.fromstring(rest, sep=' ')
+        # 2-port files may end with noise parameters, which start at the first frequency that does not increase
+        if P != 2 or (data.size % 9 == 0 and np.all(np.diff(data[::9]) > 0)):
+            return network(address, data, P, option_line or options, '21_12')
+
+    option_line = None
+    order = '21_12'  # order of S12 and S21 for 2-port data (version 1.0 and the default of version 2.0)
+    network_data = True  # version 1.0 files contain only the network data after the option line
+    reference = None  # impedances of the [Reference] keyword of version 2.0
+    previous = -np.inf  # last frequency of the 2-port network data
+    numbers = []
+    for line in text.splitlines():
+        line = line.split('!', 1)[0].strip()  # comments
+        if not line:
+            continue
+        if line.startswith('#'):
+            if option_line is None:  # only the first option line is used
+                option_line = line
+        elif line.startswith('['):  # version 2.0 keywords
+            keyword, _, value = line[1:].partition(']')
+            keyword = keyword.strip().upper()
+            value = value.strip()
+            if keyword == 'NUMBER OF PORTS':
+                P = int(value)
+            elif keyword == 'TWO-PORT DATA ORDER':
+                order = value
+            elif keyword == 'MATRIX FORMAT' and value.upper() != 'FULL':
+                raise ValueError('Only the Full matrix format is supported')
+            elif keyword == 'REFERENCE':
+                reference = value.split()
+            network_data = keyword == 'NETWORK DATA'
+        elif reference is not None and P is not None and len(reference) < P:  # [Reference] over several lines
+            reference += line.split()
+        elif network_data:
+            if P == 2:  # one line per frequency; the noise parameters of version 1.0 follow the network data
+                frequency = float(line.split()[0])
+                if frequency <= previous:
+                    network_data = False
+                    continue
+                previous = frequency
+            numbers.append(line)
+    z0 = None
+    if reference is not None:
+        reference = [float(value) for value in reference]
+        if any(value != reference[0] for value in reference):
+            raise ValueError('%s has different reference impedances of the ports %s: only one reference impedance '
+                             'is supported' % (address, reference))
+        z0 = reference[0]
+    return network(address, np.fromstring(' '.join(numbers), sep=' '), P, option_line or options, order, z0)
+
+def network(address, data, P, option_line, order, z0=None):
+    # Converts the numbers of the network data block into Freq (Hz), S (N, P, P) complex array and the reference
+    # impedance (z0 - impedance of the [Reference] keyword instead of the option line)
+    if P is None:
+        raise ValueError('Number of ports is unknown: use the .snp extension or the [Number of Ports] keyword')
+    unit, parameter, fmt, R = parse_options(option_line or DEFAULT_OPTIONS)
+    if parameter != 'S':
+        raise ValueError('Only S-parameters are supported, the file contains %s-parameters' % parameter)
+    width = 1 + 2 * P * P
+    if data.size % width != 0:
+        raise ValueError('The number of values in %s does not match %d-port data' % (address, P))
+    data = data.reshape(-1, width)
+
+    Freq = data[:, 0] * unit
+    S = to_complex(data[:, 1::2], data[:, 2::2], fmt).reshape(-1, P, P)  # row-major: S11 S12 ... S21 S22 ...
+    if P == 2 and order == '21_12':
+        S = S.transpose(0, 2, 1)  # 2-port data are stored as S11 S21 S12 S22
+    return Freq, S, R if z0 is None else z0
+
+@instrumented('write', lambda args, result: len(args[1]))
+def write_touchstone(address, Freq, S, z0=50.0, fmt='RI', unit='Hz', delimiter='\t', comments=(),
+                     number_format='%.18e'):
+    # address - full address of the file; the extension should be .snp for P ports
+    # Freq - frequency points, Hz
+    # S - (N, P, P) complex S-parameters (a 1D array is treated as 1-port data)
+    # fmt - RI, MA or DB
+    # delimiter - white space used between the numbers (tab or space)
+    # number_format - format of the parameter values (the frequencies are always written with 18 decimals)
+    S = np.asarray(S)
+    if S.ndim == 1:
+        S = S[:, None, None]
+    P = S.shape[1]
+    if P == 2:
+        S = S.transpose(0, 2, 1)  # 2-port data are stored as S11 S21 S12 S22
+    a, b = from_complex(S.reshape(len(Freq), P * P), fmt)
+    columns = np.empty((len(Freq), 1 + 2 * P * P))
+    columns[:, 0] = np.asarray(Freq) / UNITS[unit.upper()]
+    columns[:, 1::2] = a
+    columns[:, 2::2] = b
+
+    lines = ['! ' + comment for comment in comments]
+    lines.append('# %s S %s R %g' % (unit, fmt, z0))
+    with open(address, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+        if P <= 2:
+            np.savetxt(file, columns, delimiter=delimiter, fmt=['%.18e'] + [number_format] * (2 * P * P))
+        else:  # version 1.0 N-port data: one matrix row per line, at most 4 pairs per line
+            pairs = columns[:, 1:].reshape(len(Freq), P, P, 2)
+            for n in range(len(Freq)):
+                row_lines = []
+                for i in range(P):
+                    values = pairs[n, i].reshape(-1)
+                    for k in range(0, 2 * P, 8):
+                        row_lines.append(delimiter.join(number_format % v for v in values[k:k + 8]))
+                row_lines[0] = '%.18e' % columns[n, 0] + delimiter + row_lines[0]
+                file.write('\n'.join(row_lines) + '\n')
+
+def s2p_array(Freq, S11, S21, S12, S22):
+    # Stacks the four 2-port S-parameters into the (N, 2, 2) array used by write_touchstone
+    S = np.empty((len(Freq), 2, 2), dtype=np.result_type(S11, S21, S12, S22, np.complex64))
+    S[:, 0, 0] = S11
+    S[:, 0, 1] = S12
+    S[:, 1, 0] = S21
+    S[:, 1, 1] = S22
+    return S
+
+def write_s2p(address, S2P, delimiter='\t', z0=50.0, number_format='%.18e'):
+    # S2P - 9 columns: frequency, Re[S11], Im[S11], Re[S21], Im[S21], Re[S12], Im[S12], Re[S22], Im[S22]
+    # delimiter - tab or space; other delimiters are not allowed by the Touchstone specification and tab is used
+    S = s2p_array(S2P[:, 0], S2P[:, 1] + 1j * S2P[:, 2], S2P[:, 3] + 1j * S2P[:, 4],
+                  S2P[:, 5] + 1j * S2P[:, 6], S2P[:, 7] + 1j * S2P[:, 8])
+    write_touchstone(address, S2P[:, 0], S, z0, delimiter=delimiter if delimiter.isspace() else '\t',
+                     number_format=number_format)
@@ -0,0 +1,174 @@
+#
+# Monte Carlo uncertainty of the deembedded device under test
+# M perturbed copies of the SOL calibration and of the measurement of the device under test are drawn:
+#   standards   - the definitions of SHORT, OPEN and LOAD (ideal or the S11S/S11O/S11L files) are shifted by a complex
+#                 deviation drawn once per sample and standard (a systematic error of the definition)
+#   measurement - every measured reflection/transmission (MS11S..., MS11...) gets complex noise at every point
+# All samples go through the 3-term solve, the transmission recovery and the correction of the device under test as
+# (M, N) arrays, in chunks of samples whose size is set by a memory budget. The samples keep the phase unwrapping
+# decisions (jumps, phase factor, sign of the slope) of the nominal probe: the phase of z + x y of a sample is the
+# nominal unwrapped phase plus its deviation from the nominal, which must stay well below pi.
+# The bands of the real part, the imaginary part and the magnitude of S11A/S21A and ZA are the percentiles of the
+# samples at every frequency point (e.g. 2.5 % and 97.5 % for the level 0.95).
+#
+# Output files (one probe: S11A_uncertainty.CSV, ZA_from_S11A_uncertainty.CSV; two probes: S21A, ZA_from_S21A), columns:
+#   frequency, then for Re, Im and |.|: nominal, mean, standard deviation, lower and upper limit of the band
+#
+# Example: python cli.py --folder data --probes 2 --uncertainty 1000
+#
+
+import os
+from dataclasses import dataclass
+import numpy as np
+from ErrorModel import three_term_error, correct_1port, correct_2port
+from Calibration import (ideal_standards, calibrate_probe, deembed_1port, deembed_2port_probes, read_sol, read_dut,
+                         probe_phase_factor)
+from Instrumentation import instrumented, savetxt
+from Precision import PRECISIONS, complex_dtype, precision, text_formats
+
+ARRAYS = 72  # complex (N,) arrays per sample alive at once in a chunk (inputs, error terms, fixture blocks of NPort.py)
+PARTS = ('real', 'imag', 'abs')
+
+@dataclass
+class UncertaintyConfig:
+    samples: int = 1000  # number of Monte Carlo samples M
+    standards: float = 0.01  # standard deviation of the complex error of the SOL definitions
+    measurement: float = 1.0e-3  # standard deviation of the complex noise of the measured S-parameters
+    level: float = 0.95  # coverage of the confidence bands
+    seed: int = None  # seed of the random generator (None - a new sequence on every run)
+    memory: float = 256.0e6  # bytes of the intermediate arrays of one chunk of samples
+    precision: str = 'single'  # precision of the samples (see Precision.py): the spread of the samples is orders of
+                               # magnitude above the rounding errors of single precision (benchmarks/accuracy.py)
+
+@dataclass
+class UncertaintyResult:
+    Stimulus: np.ndarray  # frequency points, Hz
+    SA: np.ndarray  # nominal S11A (one probe) or S21A (two probes)
+    ZA: np.ndarray  # nominal impedance of the device under test
+    bands: dict  # (N, 4) arrays of mean, standard deviation, lower and upper limit for SA_real, SA_imag, SA_abs,
+                 # ZA_real, ZA_imag, ZA_abs
+    samples: int  # number of samples
+    level: float  # coverage of the bands
+
+def complex_noise(rng, shape, sigma):
+    # Complex Gaussian noise with E|n|^2 = sigma^2 in the current precision
+    dtype = np.dtype(complex_dtype())
+    if sigma == 0.0:
+        return dtype.type(0.0)
+    noise = rng.standard_normal(shape + (2,), dtype=np.float32 if dtype == np.complex64 else np.float64)
+    noise *= sigma / np.sqrt(2.0)
+    return noise.view(dtype)[..., 0]
+
+def slope_sign(probe):
+    # +1 if S21 of the probe follows the unwrapped phase of z + x y, -1 if its phase was mirrored (see
+    # Calibration.probe_transmission)
+    transvar = probe.z + probe.x * probe.y
+    S2 = probe.S21 * probe.S21
+    return 1.0 if np.abs(S2 - transvar).sum() <= np.abs(S2 - np.conj(transvar)).sum() else -1.0
+
+def sample_transmission(S21, transvar, sign, x, y, z):
+    # S21 of the perturbed probes (m, N): the nominal S21 with the deviation of z + x y from its nominal transvar
+    ratio = (z + x * y) / transvar
+    return S21 * np.sqrt(np.abs(ratio)) * np.exp((0.5j * sign) * np.angle(ratio)).astype(ratio.dtype, copy=False)
+
+def sample_probe(rng, m, sol, config):
+    # Error terms x, y, z (m, N) of m perturbed calibrations of a probe
+    # sol - MSS, MSO, MSL, SS, SO, SL of the probe (the standards on the frequency points, ideal or from files)
+    MSS, MSO, MSL, SS, SO, SL = sol
+    N = len(MSS)
+    standards = [S + complex_noise(rng, (m, 1), config.standards) for S in (SS, SO, SL)]
+    measured = [MS + complex_noise(rng, (m, N), config.measurement) for MS in (MSS, MSO, MSL)]
+    return three_term_error(*standards, *measured)
+
+def chunk_size(M, N, memory, dtype):
+    # Samples per chunk whose intermediate arrays fit in memory (bytes)
+    return int(max(1, min(M, memory // (ARRAYS * np.dtype(dtype).itemsize * N))))
+
+@instrumented('uncertainty', lambda args, result: result.samples * len(result.Stimulus))
+def propagate(Stimulus, sols, MS, probes, config=UncertaintyConfig()):
+    # Stimulus - frequency points, Hz
+    # sols - MSS, MSO, MSL, SS, SO, SL of every probe (SS, SO, SL may be None - ideal terminations)
+    # MS - MS11 (one probe) or (MS11, MS21, MS12, MS22) (two probes) of the device under test
+    # probes - nominal ProbeModel of every probe
+    # Returns an UncertaintyResult
+    M, N = config.samples, len(Stimulus)
+    if M < 1 or not 0.0 < config.level < 1.0:
+        raise ValueError('The uncertainty needs at least one sample and a level between 0 and 1')
+    if len(probes) == 1:
+        SA, ZA = deembed_1port(MS, probes[0])
+    else:
+        SA, ZA = deembed_2port_probes(*MS, *probes)
+    # inputs and nominal terms in the precision of the samples
+    dtype = PRECISIONS[config.precision][0]
+    sols = [sol if sol[3] is not None else tuple(sol[:3]) + ideal_standards(N) for sol in sols]
+    sols = [[np.asarray(S).astype(dtype) for S in sol] for sol in sols]
+    MS = np.asarray(MS).astype(dtype)
+    nominal = [(probe.S21.astype(dtype), (probe.z + probe.x * probe.y).astype(dtype), slope_sign(probe))
+               for probe in probes]
+    rng = np.random.default_rng(config.seed)
+    # real and imaginary parts of the samples of SA and ZA; single precision halves the memory of the M x N samples
+    values = {name: np.empty((M, N), dtype=np.float32) for name in ('SA_real', 'SA_imag', 'ZA_real', 'ZA_imag')}
+    chunk = chunk_size(M, N, config.memory, dtype)
+    with precision(config.precision):
+        for start in range(0, M, chunk):
+            sample_chunk(rng, start, min(chunk, M - start), sols, MS, nominal, config, values)
+    bands = {}
+    for name in ('SA', 'ZA'):
+        real, imag = values.pop(name + '_real'), values.pop(name + '_imag')
+        bands[name + '_real'] = band(real, config.level)
+        bands[name + '_imag'] = band(imag, config.level)
+        bands[name + '_abs'] = band(np.hypot(real, imag, out=real), config.level)
+    return UncertaintyResult(Stimulus, SA, ZA, bands, M, config.level)
+
+def sample_chunk(rng, start, m, sols, MS, nominal, config, values):
+    # Deembeds the samples start...start + m - 1 into values (see propagate)
+    N = MS.shape[-1]
+    terms = [sample_probe(rng, m, sol, config) for sol in sols]
+    if len(sols) == 1:
+        x, y, z = terms[0]
+        SA = correct_1port(MS + complex_noise(rng, (m, N), config.measurement), x, y, z)
+        ZA = 50.0 * (1.0 + SA) / (1.0 - SA)
+    else:
+        (x1, y1, z1), (x2, y2, z2) = terms
+        S21_1 = sample_transmission(*nominal[0], x1, y1, z1)
+        S21_2 = sample_transmission(*nominal[1], x2, y2, z2)
+        MS11, MS21, MS12, MS22 = [S + complex_noise(rng, (m, N), config.measurement) for S in MS]
+        SA = correct_2port(MS11, MS21, MS12, MS22, x1, y1, S21_1, x2, y2, S21_2)
+        ZA = 100.0 * (1.0 - SA) / SA
+    for name, value in (('SA', SA), ('ZA', ZA)):
+        values[name + '_real'][start:start + m] = value.real
+        values[name + '_imag'][start:start + m] = value.imag
+
+def band(samples, level, block=1024):
+    # (N, 4) mean, standard deviation, lower and upper limit of the (M, N) samples at every point; the percentiles are
+    # taken over blocks of points so that their temporary copies stay small
+    N = samples.shape[1]
+    result = np.empty((N, 4))
+    limits = [0.5 * (1.0 - level), 0.5 * (1.0 + level)]
+    for start in range(0, N, block):
+        part = samples[:, start:start + block]
+        result[start:start + block, 0] = part.mean(axis=0, dtype=np.float64)
+        result[start:start + block, 1] = part.std(axis=0, dtype=np.float64)
+        result[start:start + block, 2:] = np.quantile(part, limits, axis=0).T
+    return result
+
+def run_uncertainty(config, uconfig=UncertaintyConfig()):
+    # config - DeembeddingConfig of the calibration and the device under test (one or two probes)
+    # Calibrates the probes, propagates the perturbations and writes the *_uncertainty.CSV files into config.folder
+    if config.probe_flag not in (1, 2):
+        raise ValueError('The uncertainty is calculated for one or two probes')
+    with precision(config.precision):
+        sols = [read_sol(config, n) for n in range(1, config.probe_flag + 1)]
+        probes = [calibrate_probe(*sol, probe_phase_factor(config, n)) for n, sol in enumerate(sols, start=1)]
+        Stimulus, MS = read_dut(config.folder, config.deliminput, probes)
+        result = propagate(Stimulus, [sol[1:] for sol in sols], MS, probes, uconfig)
+
+        parameter = 'S11A' if config.probe_flag == 1 else 'S21A'
+        for name, nominal, stem in (('SA', result.SA, parameter), ('ZA', result.ZA, 'ZA_from_' + parameter)):
+            columns = [Stimulus]
+            for part in PARTS:
+                columns += [getattr(np, part)(nominal)] + list(result.bands['%s_%s' % (name, part)].T)
+            data = np.column_stack(columns)
+            savetxt(os.path.join(config.folder, stem + '_uncertainty.CSV'), data, delimiter=config.delimoutput,
+                    fmt=text_formats(data.shape[1]))
+    return result
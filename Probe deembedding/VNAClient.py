@@ -0,0 +1,173 @@
+#
+# Asynchronous acquisition of the sweeps from a VNA over SCPI (raw socket, usually port 5025)
+# The sweeps are transferred as IEEE 488.2 binary blocks of 64-bit floats, so no export/copy of text files is needed.
+# acquire() overlaps the transfer of the next sweep with the processing of the current one (in a worker thread).
+# VNASimulator.py serves the bundled measurement files with the same commands for offline work.
+#
+# Example (offline): python VNAClient.py --simulate DogBonePCB_10.03.2022 --probes 2
+#
+
+import re
+import asyncio
+import argparse
+import numpy as np
+from Calibration import calibrate_probe, deembed_1port
+
+LINE_LIMIT = 1 << 26  # longest text response, bytes (ASCII sweeps of millions of points)
+ERROR = re.compile(r'([+-]?\d+),\s*".*"$')  # response of SYST:ERR?, e.g. -113,"Undefined header"
+
+def raise_error(command, response):
+    # Raises ValueError if response is an entry of the error queue (code, "message") with a nonzero code
+    match = ERROR.match(response)
+    if match and int(match.group(1)) != 0:
+        raise ValueError('VNA error after %s: %s' % (command, response))
+
+class VNAClient:
+    def __init__(self, reader, writer, timeout=30.0):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout  # s, for every response
+        self.device = None  # device connected with the last connect() call
+
+    @classmethod
+    async def connect(cls, host, port=5025, timeout=30.0):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port, limit=LINE_LIMIT), timeout)
+        client = cls(reader, writer, timeout)
+        await client.write('FORM:DATA REAL,64', 'FORM:BORD SWAP')  # little-endian 64-bit binary blocks
+        return client
+
+    async def write(self, *commands):
+        self.writer.write((';'.join(commands) + '\n').encode())
+        await self.writer.drain()
+
+    async def readline(self):
+        return (await asyncio.wait_for(self.reader.readline(), self.timeout)).decode().strip()
+
+    async def query(self, command):
+        # The error queue is queried right after the command: an instrument that rejects a query sends no response,
+        # so the answer of SYST:ERR? is then the first line and the error is raised without waiting for the timeout
+        await self.write(command)
+        await self.write('SYST:ERR?')
+        response = await self.readline()
+        raise_error(command, response)
+        raise_error(command, await self.readline())
+        return response
+
+    async def read_block(self, command):
+        # IEEE 488.2 definite-length block: #, number of digits, length, data, line feed
+        start = await asyncio.wait_for(self.reader.readexactly(2), self.timeout)
+        if start[:1] != b'#':  # a text line instead of the block: the answer of SYST:ERR? to a rejected query
+            line = start + await asyncio.wait_for(self.reader.readline(), self.timeout)
+            raise_error(command, line.decode().strip())
+            raise ValueError('The response to %s is not a definite-length binary block' % command)
+        if start[1:] == b'0':
+            raise ValueError('The response to %s is not a definite-length binary block' % command)
+        length = int(await asyncio.wait_for(self.reader.readexactly(int(start[1:])), self.timeout))
+        data = await asyncio.wait_for(self.reader.readexactly(length), self.timeout)
+        await asyncio.wait_for(self.reader.readline(), self.timeout)
+        return data
+
+    async def query_values(self, command):
+        await self.write(command)
+        await self.write('SYST:ERR?')
+        data = await self.read_block(command)
+        raise_error(command, await self.readline())
+        return np.frombuffer(data, dtype='<f8')
+
+    async def sweep(self, parameter='S11'):
+        # Triggers a sweep and returns Freq (Hz) and the complex parameter
+        await self.write('CALC:PAR %s' % parameter, 'INIT:IMM')
+        await self.query('*OPC?')  # waits for the end of the sweep; raises if the sweep could not be started
+        Freq = await self.query_values('SENS:FREQ:DATA?')
+        data = await self.query_values('CALC:DATA? SDATA')
+        return Freq, data[0::2] + 1j * data[1::2]
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def simulator_connect(client, device):
+    # Connects a device (SHORT, OPEN, LOAD or a file name) to the simulated VNA
+    await client.write('SIM:LOAD %s' % device)
+
+async def fetch(client, request, connect=simulator_connect):
+    # request - (device, parameter); the device is connected only when it changes
+    device, parameter = request
+    if device != client.device:
+        await connect(client, device)
+        client.device = device
+    return await client.sweep(parameter)
+
+async def sweeps(client, requests, connect=simulator_connect):
+    # Asynchronous generator of (request, (Freq, S)); the transfer of the next sweep starts before the current one
+    # is returned to the consumer
+    requests = list(requests)
+    task = asyncio.ensure_future(fetch(client, requests[0], connect)) if requests else None
+    for i, request in enumerate(requests):
+        data = await task
+        if i + 1 < len(requests):
+            task = asyncio.ensure_future(fetch(client, requests[i + 1], connect))
+        yield request, data
+
+async def acquire(client, requests, process, connect=simulator_connect):
+    # Fetches the sweeps of requests and calls process(request, Freq, S) in a worker thread while the next sweep
+    # is transferred. Returns the list of the results of process.
+    loop = asyncio.get_running_loop()
+    results = []
+    pending = None
+    for request in requests:
+        Freq, S = await fetch(client, request, connect)
+        if pending is not None:
+            results.append(await pending)
+        pending = loop.run_in_executor(None, process, request, Freq, S)
+    if pending is not None:
+        results.append(await pending)
+    return results
+
+async def calibrate_from_vna(client, port=1, phase_factor=None, connect=simulator_connect):
+    # ProbeModel of the probe connected to the VNA port (ideal SHORT, OPEN and LOAD are measured in turn)
+    parameter = 'S%d%d' % (port, port)
+    measured = {}
+    async for (device, _), data in sweeps(client, [(t, parameter) for t in ('SHORT', 'OPEN', 'LOAD')], connect):
+        measured[device] = data
+    Stimulus = measured['SHORT'][0]
+    return calibrate_probe(Stimulus, measured['SHORT'][1], measured['OPEN'][1], measured['LOAD'][1],
+                           phase_factor=phase_factor)
+
+async def deembed_from_vna(client, devices, probe, connect=simulator_connect):
+    # S11A and ZA of every device measured through the probe 1; the deembedding of a device overlaps the transfer
+    # of the next one
+    def process(request, Freq, S):
+        if len(Freq) != len(probe.Stimulus) or not np.allclose(Freq, probe.Stimulus):
+            raise ValueError('%s was measured on other frequency points than the probe' % request[0])
+        return deembed_1port(S, probe)
+    return await acquire(client, [(device, 'S11') for device in devices], process, connect)
+
+async def demo(host, port, probes, simulate):
+    server = None
+    if simulate is not None:
+        from VNASimulator import serve
+        server = await serve(simulate, host, 0)
+        port = server.sockets[0].getsockname()[1]
+    client = await VNAClient.connect(host, port)
+    try:
+        print(await client.query('*IDN?'))
+        for n in range(1, probes + 1):
+            probe = await calibrate_from_vna(client, n)
+            print('Probe', n, ': number of phase jumps = ', probe.number_jumps, '; phase factor', probe.phase_factor)
+            if probe.dt is not None:
+                print('Delay time along the probe', n, '= ', probe.dt / 1.0e-12, 'ps')
+    finally:
+        await client.close()
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Probe calibration with the sweeps acquired from a VNA over SCPI.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5025)
+    parser.add_argument('--probes', type=int, choices=(1, 2), default=1)
+    parser.add_argument('--simulate', default=None, help='start a simulated VNA serving the files of this folder')
+    args = parser.parse_args()
+    asyncio.run(demo(args.host, args.port, args.probes, args.simulate))
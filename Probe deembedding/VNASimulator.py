@@ -0,0 +1,163 @@
+#
+# Simulated VNA serving the bundled measurement files over SCPI (raw socket, one command line per request)
+# The "connected" device is chosen with the simulator command SIM:LOAD <name>: SHORT, OPEN and LOAD select the
+# Touchstone files *_SHORT.s2p, *_OPEN.s2p, *_LOAD.s2p of the folder; any other name loads that file (.snp or a
+# 3-column .csv with S11). Data are sent as IEEE 488.2 definite-length binary blocks.
+#
+# Supported commands (short or long form, several per line separated by ;):
+#   *IDN?  *RST  *CLS  *OPC?  SYST:ERR?
+#   FORM:DATA REAL,64 | ASCII      FORM:BORD NORM | SWAP
+#   SIM:LOAD <name>                CALC:PAR <S11 | S21 | S12 | S22>
+#   INIT:IMM                       SENS:SWE:POIN?
+#   SENS:FREQ:DATA?                CALC:DATA? SDATA
+#
+# Example: python VNASimulator.py --folder DogBonePCB_10.03.2022 --port 5025
+#
+
+import os
+import re
+import glob
+import asyncio
+import argparse
+import numpy as np
+from Acquisition import acq
+from Touchstone import is_touchstone, read_touchstone
+
+LONG_FORMS = {'SENSE': 'SENS', 'FREQUENCY': 'FREQ', 'CALCULATE': 'CALC', 'PARAMETER': 'PAR', 'FORMAT': 'FORM',
+              'BORDER': 'BORD', 'INITIATE': 'INIT', 'IMMEDIATE': 'IMM', 'SWEEP': 'SWE', 'POINTS': 'POIN',
+              'SYSTEM': 'SYST', 'ERROR': 'ERR', 'SIMULATE': 'SIM'}
+STANDARDS = ('SHORT', 'OPEN', 'LOAD')
+
+def binary_block(data):
+    # IEEE 488.2 definite-length block: #, number of digits, length, data
+    length = str(len(data)).encode()
+    return b'#' + str(len(length)).encode() + length + data
+
+def header(command):
+    # Canonical short form of a command header, e.g. :SENSe1:FREQuency:DATA? -> SENS:FREQ:DATA?
+    words = command.strip().lstrip(':').upper().split(':')
+    return ':'.join(LONG_FORMS.get(re.sub(r'\d+$', '', w), re.sub(r'\d+$', '', w)) for w in words)
+
+class SimulatedVNA:
+    def __init__(self, folder, options='# Hz S RI R 50'):
+        self.folder = folder
+        self.options = options  # option line of the Touchstone files without one (VNA exports)
+        self.reset()
+
+    def reset(self):
+        self.Freq = None
+        self.S = None  # (N, P, P) S-parameters of the connected device
+        self.parameter = (0, 0)
+        self.ascii = False
+        self.byteorder = '>'  # NORM - big-endian, SWAP - little-endian
+        self.errors = []
+        self.swept = False
+
+    def load(self, name):
+        name = name.strip().strip('"\'')
+        if name.upper() in STANDARDS:
+            files = glob.glob(os.path.join(self.folder, '*_%s.s[0-9]p' % name.upper()))
+            if not files:
+                raise ValueError('No %s file in %s' % (name.upper(), self.folder))
+            name = os.path.basename(files[0])
+        if is_touchstone(name):
+            self.Freq, self.S, _ = read_touchstone(os.path.join(self.folder, name), self.options)
+        else:
+            self.Freq, S11 = acq(name, self.folder, ',')
+            self.S = S11[:, None, None]
+        self.swept = False
+
+    def data(self, values):
+        if self.ascii:
+            return ','.join('%.17g' % v for v in values).encode()
+        return binary_block(np.asarray(values, dtype=self.byteorder + 'f8').tobytes())
+
+    def execute(self, command):
+        # Returns the response (bytes) of a query or None
+        head, _, argument = command.strip().partition(' ')
+        head = header(head)
+        argument = argument.strip()
+        if head == '*IDN?':
+            return b'DYK team,Simulated VNA,0,1.0'
+        if head == '*RST':
+            self.reset()
+        elif head == '*CLS':
+            self.errors = []
+        elif head == '*OPC?':
+            return b'1'
+        elif head == 'SYST:ERR?':
+            return self.errors.pop(0).encode() if self.errors else b'0,"No error"'
+        elif head == 'FORM:DATA' or head == 'FORM':
+            self.ascii = argument.upper().startswith('ASC')
+        elif head == 'FORM:BORD':
+            self.byteorder = '<' if argument.upper().startswith('SWAP') else '>'
+        elif head == 'SIM:LOAD':
+            self.load(argument)
+        elif head == 'CALC:PAR':
+            match = re.fullmatch(r'["\']?S(\d)(\d)["\']?', argument.upper())
+            if not match:
+                raise ValueError('Unknown parameter %s' % argument)
+            self.parameter = (int(match.group(1)) - 1, int(match.group(2)) - 1)
+        elif head in ('INIT:IMM', 'INIT'):
+            if self.S is None:
+                raise ValueError('No device is connected: use SIM:LOAD')
+            self.swept = True
+        elif head == 'SENS:SWE:POIN?':
+            return str(0 if self.Freq is None else len(self.Freq)).encode()
+        elif head == 'SENS:FREQ:DATA?':
+            self.check_sweep()
+            return self.data(self.Freq)
+        elif head == 'CALC:DATA?':
+            self.check_sweep()
+            i, j = self.parameter
+            if i >= self.S.shape[1] or j >= self.S.shape[2]:
+                raise ValueError('The connected device has %d port(s)' % self.S.shape[1])
+            S = self.S[:, i, j]
+            return self.data(np.column_stack((S.real, S.imag)).ravel())
+        else:
+            raise ValueError('Undefined header %s' % head)
+        return None
+
+    def check_sweep(self):
+        if not self.swept:
+            raise ValueError('No sweep: use INIT:IMM')
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for command in line.decode().split(';'):
+                    if not command.strip():
+                        continue
+                    try:
+                        response = self.execute(command)
+                    except (ValueError, OSError) as error:
+                        self.errors.append('-100,"%s"' % error)
+                        continue
+                    if response is not None:
+                        writer.write(response + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+async def serve(folder, host='127.0.0.1', port=5025, options='# Hz S RI R 50'):
+    # Starts the simulator; every client gets its own instrument state. Returns the asyncio server.
+    async def handle(reader, writer):
+        await SimulatedVNA(folder, options).handle(reader, writer)
+    return await asyncio.start_server(handle, host, port)
+
+async def run_forever(folder, host, port):
+    server = await serve(folder, host, port)
+    print('Simulated VNA serving', folder, 'on', host, port)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulated VNA serving the measurement files of a folder over SCPI.')
+    parser.add_argument('--folder', required=True, help='folder with the *_SHORT/OPEN/LOAD.s2p and other files')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5025)
+    args = parser.parse_args()
+    asyncio.run(run_forever(args.folder, args.host, args.port))
@@ -0,0 +1,205 @@
+#
+# Command-line interface of the probe deembedding algorithm without prompts (see Calibration.py)
+# Example: python cli.py --folder data --probes 2 --non-ideal --output-delimiter tab
+#
+
+import time
+START = time.perf_counter()  # before the other imports: --startup-time reports the time of the imports as well
+import os
+import argparse
+import dataclasses
+import Cache
+import Instrumentation
+from Precision import precision
+from Calibration import DeembeddingConfig, run_deembedding
+from Streaming import BLOCK, run_streaming
+from RealTime import BUDGET, CAPACITY, RealTimeDeembedder, watch
+from Uncertainty import UncertaintyConfig, run_uncertainty
+
+def delimiter(value):
+    # The words tab and space can be used instead of the characters
+    return {'tab': '\t', 'space': ' '}.get(value, value)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Probe calibration with SHORT/OPEN/LOAD terminations and numerical '
+                                                 'deembedding of the device under test (files as described in main.py).')
+    parser.add_argument('--folder', required=True, help='folder where all files are located')
+    parser.add_argument('--probes', type=int, choices=(1, 2, 3, 4), default=1,
+                        help='number of probes (default: 1); more than 2 probes need --dut')
+    parser.add_argument('--input-delimiter', type=delimiter, default=',',
+                        help='delimiter used in the input files: , ; tab space (default: ,)')
+    parser.add_argument('--output-delimiter', type=delimiter, default=',',
+                        help='delimiter used in the output files: , ; tab space (default: ,)')
+    parser.add_argument('--non-ideal', action='store_true',
+                        help='use the S11S/S11O/S11L (S22S/S22O/S22L) files instead of ideal terminations')
+    parser.add_argument('--vna', action='store_true',
+                        help='modern VNA with automatic S2P deembedding: only the probe models are created')
+    parser.add_argument('--phase-factor', type=int, choices=(1, 2), default=None,
+                        help='phase factor of the probe 1: 1 if the phase jumps at pi/2, 2 if at pi '
+                             '(default: detected from the jumps)')
+    parser.add_argument('--phase-factor-2', type=int, choices=(1, 2), default=None,
+                        help='phase factor of the probe 2 (default: detected from the jumps)')
+    parser.add_argument('--sol-files', nargs=3, metavar=('SHORT', 'OPEN', 'LOAD'), default=None,
+                        help='Touchstone files (.s1p/.s2p) measured with SHORT, OPEN and LOAD instead of MS11S.CSV...; '
+                             'S11 is used for the probe 1 and S22 for the probe 2')
+    parser.add_argument('--sol-options', default='# Hz S RI R 50',
+                        help="option line of the SOL Touchstone files if they have none (default: '# Hz S RI R 50')")
+    parser.add_argument('--dut', default=None,
+                        help='Touchstone file (.snp) of a P-port device under test measured through --probes P probes '
+                             '(e.g. a multi-wire sample on a 4-port VNA): written deembedded as <name>_deembedded.snp')
+    parser.add_argument('--probe-store', default=None,
+                        help='folder of the saved probe models: the probes are calibrated only when their SOL files '
+                             'or parameters change, later runs only deembed the device under test')
+    parser.add_argument('--batch', default=None,
+                        help='folder with one subfolder per device under test (MS11.CSV...), or a manifest file '
+                             'listing such folders; all of them are deembedded with the same probes')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes for --batch (default: CPUs)')
+    parser.add_argument('--stream', action='store_true',
+                        help='bounded-memory mode for very long sweeps: the text files are processed block by block')
+    parser.add_argument('--block', type=int, default=BLOCK,
+                        help='frequency points per block in the --stream mode (default: %d)' % BLOCK)
+    parser.add_argument('--watch', default=None,
+                        help='real-time mode: keep the probes in memory and deembed every new sweep file written into '
+                             'this folder (3-column .csv or Touchstone for one probe, .s2p for two) until Ctrl+C')
+    parser.add_argument('--watch-output', default=None,
+                        help='folder where the S11A/S21A and ZA files of every sweep are written in the --watch mode '
+                             '(default: the results are only kept in memory)')
+    parser.add_argument('--ring', type=int, default=CAPACITY,
+                        help='sweeps kept in memory in the --watch mode (default: %d)' % CAPACITY)
+    parser.add_argument('--budget', type=float, default=BUDGET * 1.0e3,
+                        help='latency budget of one sweep in ms in the --watch mode (default: %g)' % (BUDGET * 1.0e3))
+    parser.add_argument('--uncertainty', type=int, default=None, metavar='M',
+                        help='Monte Carlo uncertainty of S11A/S21A and ZA from M perturbed calibrations and '
+                             'measurements: writes *_uncertainty.CSV with the confidence bands (Uncertainty.py)')
+    parser.add_argument('--sigma-standards', type=float, default=UncertaintyConfig.standards,
+                        help='standard deviation of the complex error of the SOL definitions in the --uncertainty '
+                             'mode (default: %g)' % UncertaintyConfig.standards)
+    parser.add_argument('--sigma-measurement', type=float, default=UncertaintyConfig.measurement,
+                        help='standard deviation of the complex noise of the measured S-parameters in the '
+                             '--uncertainty mode (default: %g)' % UncertaintyConfig.measurement)
+    parser.add_argument('--level', type=float, default=UncertaintyConfig.level,
+                        help='coverage of the confidence bands in the --uncertainty mode (default: %g)'
+                             % UncertaintyConfig.level)
+    parser.add_argument('--seed', type=int, default=None, help='seed of the --uncertainty samples')
+    parser.add_argument('--archive', default=None,
+                        help='write all output tables with the parameters of the run into this compressed archive '
+                             '(relative to --folder), readable column by column (Archive.py)')
+    parser.add_argument('--no-text', action='store_true',
+                        help='do not write the text output files (only with --archive; they can be exported later '
+                             'with python Archive.py)')
+    parser.add_argument('--precision', choices=('double', 'single'), default='double',
+                        help='precision of the complex arrays: single (complex64) halves the memory and bandwidth '
+                             'with about 7 significant digits, see benchmarks/accuracy.py (default: double)')
+    parser.add_argument('--profile', default=None,
+                        help='save the time, memory and points of every stage (acq, cubspl...) as a JSON report')
+    parser.add_argument('--profile-time-only', action='store_true',
+                        help='do not trace the memory in the --profile report (the tracing slows down the writing)')
+    parser.add_argument('--cache', action='store_true',
+                        help='keep the parsed input files in the cache of Cache.py (PROBE_CACHE_DIR, default: '
+                             '~/.cache/probe_deembedding) to skip the parsing of unchanged files in later runs')
+    parser.add_argument('--startup-time', action='store_true',
+                        help='print the startup time (imports and parsing of the arguments) before running')
+    args = parser.parse_args(argv)
+    if args.dut is not None and (args.batch or args.stream or args.watch):
+        parser.error('--dut cannot be used with --batch, --stream or --watch')
+    if (args.watch is not None and args.watch_output is not None
+            and os.path.realpath(args.watch) == os.path.realpath(args.watch_output)):
+        parser.error('--watch-output must be another folder than --watch: the written files would be taken as '
+                     'new sweeps')
+    if args.precision == 'single' and args.stream:
+        parser.error('--stream always runs in double precision')
+    if args.uncertainty is not None and (args.dut or args.batch or args.stream or args.watch or args.vna
+                                         or args.probes > 2):
+        parser.error('--uncertainty needs the device under test files of one or two probes (MS11.CSV...) and '
+                     'cannot be used with --dut, --batch, --stream, --watch or --vna')
+    if args.archive is not None and (args.batch or args.stream or args.watch or args.uncertainty is not None):
+        parser.error('--archive cannot be used with --batch, --stream, --watch or --uncertainty')
+    if args.no_text and args.archive is None:
+        parser.error('--no-text needs --archive')
+    if args.probes > 2 and args.dut is None and not args.vna:
+        parser.error('more than two probes need --dut (or --vna to create the probe models only)')
+    return args
+
+def report_startup(args):
+    if args.startup_time:
+        print('Startup time: %.1f ms' % ((time.perf_counter() - START) * 1.0e3))
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_startup(args)
+    if args.profile is None:
+        return run(args)
+    with Instrumentation.profile(memory=not args.profile_time_only) as report:
+        result = run(args)
+    report.save(args.profile)
+    for name, s in report.summary().items():
+        print('%-18s %4d calls %10.3f ms wall %10.3f ms CPU %9.1f MB %10d points'
+              % (name, s['calls'], s['wall'] * 1.0e3, s['cpu'] * 1.0e3, s['peak_memory'] / 1.0e6, s['points']))
+    return result
+
+def run(args):
+    if args.cache:
+        Cache.enabled = True
+        os.environ['PROBE_CACHE'] = '1'  # the worker processes of --batch import Cache.py again
+    config = DeembeddingConfig(args.folder, args.probes, args.input_delimiter, args.output_delimiter,
+                               0 if args.non_ideal else 1, 1 if args.vna else 0,
+                               (args.phase_factor, args.phase_factor_2),
+                               tuple(args.sol_files) if args.sol_files else None, args.sol_options, args.probe_store,
+                               args.dut, args.precision, args.archive, not args.no_text)
+    if args.batch is not None:
+        from Batch import run_batch  # imported here: the process pool is loaded only for batches
+        report = run_batch(config, args.batch, args.workers)
+        for folder, points, error in report:
+            print(folder, ':', error if error else '%d points deembedded' % points)
+        return report
+
+    if args.watch is not None:
+        return run_watch(config, args)
+
+    if args.uncertainty is not None:
+        return run_monte_carlo(config, args)
+
+    if args.stream:
+        result = probes = run_streaming(config, args.block)
+    else:
+        result = run_deembedding(config)
+        probes = result.probes
+    for n, probe in enumerate(probes, start=1):
+        print('Probe', n, ': number of phase jumps = ', probe.number_jumps, '; phase factor', probe.phase_factor)
+        if probe.dt is not None:
+            print('Delay time along the probe', n, '= ', probe.dt / 1.0e-12, 'ps')
+    return result
+
+def run_monte_carlo(config, args):
+    # Confidence bands of the device under test from args.uncertainty samples
+    result = run_uncertainty(config, UncertaintyConfig(args.uncertainty, args.sigma_standards, args.sigma_measurement,
+                                                       args.level, args.seed))
+    lower, upper = result.bands['ZA_abs'][:, 2], result.bands['ZA_abs'][:, 3]
+    width = (upper - lower) / abs(result.ZA)
+    print('%d samples: the %g %% band of |ZA| is %.3g %% of |ZA| wide on average, %.3g %% at most (%.6g Hz)'
+          % (result.samples, 100.0 * result.level, 100.0 * width.mean(), 100.0 * width.max(),
+             result.Stimulus[width.argmax()]))
+    return result
+
+def run_watch(config, args):
+    # Calibrates the probes once, then deembeds the new sweeps of args.watch until Ctrl+C
+    probes = run_deembedding(dataclasses.replace(config, VNA=1)).probes
+    with precision(config.precision):
+        deembedder = RealTimeDeembedder(probes, args.ring, args.budget * 1.0e-3, args.watch_output, config.deliminput,
+                                        config.sol_options)
+    print('Watching', args.watch, 'for new sweeps (Ctrl+C to stop)')
+
+    def report(name, latency):
+        print('%s: %.3f ms%s' % (name, latency * 1.0e3, '  OVER BUDGET' if latency > deembedder.budget else ''))
+
+    try:
+        deembedder.run(watch(args.watch), report)
+    except KeyboardInterrupt:
+        pass
+    for name, error in deembedder.errors:
+        print(name, ':', error)
+    print(deembedder.statistics())
+    return deembedder
+
+if __name__ == '__main__':
+    main()
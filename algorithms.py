@@ -0,0 +1,28 @@
+#
+# Folders of the three algorithms and the import of their modules by the tools outside them (pipeline/jobs.py,
+# benchmarks/benchmark.py, tests/modules.py)
+# The folders contain modules with the same names (Acquisition.py...), so the modules of the previous folder are
+# removed from sys.modules before importing from the next one.
+#
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROBE = os.path.join(ROOT, 'Probe deembedding')
+DELAY = os.path.join(ROOT, 'Delay time')
+IMPEDANCE = os.path.join(ROOT, 'Impedance dispersion')
+FOLDERS = (PROBE, DELAY, IMPEDANCE)
+
+def load_modules(folder, names):
+    # folder - one of FOLDERS (or another folder of modules); names - modules to import from it
+    # Returns the list of the modules
+    for name in list(sys.modules):
+        module_file = getattr(sys.modules[name], '__file__', None) or ''
+        if os.path.dirname(module_file) in FOLDERS:
+            del sys.modules[name]
+    sys.path.insert(0, folder)
+    try:
+        return [__import__(name) for name in names]
+    finally:
+        sys.path.remove(folder)
@@ -0,0 +1,142 @@
+#
+# Accuracy of the single precision mode (complex64, see Probe deembedding/Precision.py) against double precision
+# on the bundled DogBonePCB_10.03.2022 and StraightPCB_10.03.2022 datasets
+# For every probe the relative errors of the error terms x, y, z of the 3-term solve, the recovered S21 and the delay
+# time are reported over all frequency points and over the worst-conditioned 1 % of the points: near the OPEN
+# resonance the SHORT, OPEN and LOAD measurements become nearly dependent and the 3-term system amplifies the
+# rounding errors of the measured data by its condition number.
+# The bundled datasets have no device under test measured through the probes, so a microwire-like device (series
+# R + jwL) is embedded between the double-precision probes and deembedded in both precisions (1-port: the device
+# terminates the probe 1; 2-port: the device between the probes 1 and 2).
+#
+# Example: python accuracy.py --save accuracy.json
+#
+
+import sys
+import json
+import argparse
+import numpy as np
+from benchmark import PROBE, load_modules
+
+DATASETS = ('DogBonePCB_10.03.2022', 'StraightPCB_10.03.2022')
+WORST = 0.01  # fraction of the worst-conditioned points reported separately
+
+def condition(MSS, MSO, MSL, SS=-1.0, SO=1.0, SL=0.0):
+    # Condition number of the 3-term system x + A AM y + A z = AM (A = SHORT, OPEN, LOAD) at every frequency point
+    N = len(MSS)
+    A = np.empty((N, 3, 3), dtype=np.complex128)
+    for row, (S, MS) in enumerate(((SS, MSS), (SO, MSO), (SL, MSL))):
+        A[:, row, 0] = 1.0
+        A[:, row, 1] = S * MS
+        A[:, row, 2] = S
+    return np.linalg.cond(A)
+
+def errors(Stimulus, single, double, worst):
+    # Relative errors of the single-precision values: over all points and over the worst-conditioned points.
+    # The relative error of a value close to zero is large even if the value is accurate relative to the rest of the
+    # sweep, so the error scaled by the RMS value of the sweep is reported as well.
+    difference = np.abs(single.astype(np.complex128) - double)
+    error = difference / np.maximum(np.abs(double), np.finfo(float).tiny)
+    return {'max': float(error.max()), 'median': float(np.median(error)), 'p99': float(np.percentile(error, 99)),
+            'frequency_of_max': float(Stimulus[np.argmax(error)]),
+            'scaled_max': float(difference.max() / np.sqrt(np.mean(np.abs(double) ** 2))),
+            'worst_conditioned_max': float(error[worst].max()),
+            'worst_conditioned_median': float(np.median(error[worst]))}
+
+def impedance(Stimulus, R=10.0, L=5.0e-9):
+    # Impedance of the device under test: R + jwL
+    return R + 2j * np.pi * Stimulus * L
+
+def series_device(Z, z0=50.0):
+    # S-matrices (N, 2, 2) of the series impedance Z between two z0 ports
+    S = np.empty((len(Z), 2, 2), dtype=np.complex128)
+    S[:, 0, 0] = S[:, 1, 1] = Z / (Z + 2.0 * z0)
+    S[:, 0, 1] = S[:, 1, 0] = 2.0 * z0 / (Z + 2.0 * z0)
+    return S
+
+def dataset_accuracy(dataset):
+    Cache, Precision, Acquisition, Calibration, NPort = load_modules(
+        PROBE, ['Cache', 'Precision', 'Acquisition', 'Calibration', 'NPort'])
+    Cache.enabled = False
+    kit = dataset.split('_')[0]
+    config = Calibration.DeembeddingConfig(PROBE + '/' + dataset, 2, VNA=1,
+                                           sol_files=tuple('%s_%s.s2p' % (kit, t) for t in ('SHORT', 'OPEN', 'LOAD')))
+    report = {}
+    probes = {}
+    conditions = []
+    for name in ('double', 'single'):
+        with Precision.precision(name):
+            probes[name] = [Calibration.calibrate_from_files(config, n) for n in (1, 2)]
+
+    for n, (single, double) in enumerate(zip(probes['single'], probes['double']), start=1):
+        # condition numbers from the double-precision measurements of the SOL standards
+        names = Calibration.sol_file_names(config, n)
+        cond = condition(*[Acquisition.acq(name, config.folder, ',', n, config.sol_options)[1] for name in names])
+        conditions.append(cond)
+        worst = cond >= np.quantile(cond, 1.0 - WORST)
+        report['probe_%d' % n] = {
+            'condition_max': float(cond.max()), 'condition_median': float(np.median(cond)),
+            'frequency_of_condition_max': float(double.Stimulus[np.argmax(cond)]),
+            'number_jumps': [single.number_jumps, double.number_jumps],
+            'phase_factor': [single.phase_factor, double.phase_factor],
+            'dt_relative_error': (abs(single.dt - double.dt) / double.dt if double.dt else None),
+            'x': errors(double.Stimulus, single.x, double.x, worst),
+            'y': errors(double.Stimulus, single.y, double.y, worst),
+            'z': errors(double.Stimulus, single.z, double.z, worst),
+            'S21': errors(double.Stimulus, single.S21, double.S21, worst)}
+
+    # Device under test embedded between the double-precision probes
+    Stimulus = probes['double'][0].Stimulus
+    Z = impedance(Stimulus)
+    M = NPort.embed(series_device(Z), NPort.fixture_from_probes([p.network() for p in probes['double']]))
+    S11 = (Z - 50.0) / (Z + 50.0)  # the device terminates the probe 1
+    p1 = probes['double'][0]
+    MS11 = p1.x + (p1.z + p1.x * p1.y) * S11 / (1.0 - p1.y * S11)
+    results = {}
+    for name in ('double', 'single'):
+        with Precision.precision(name):
+            dtype = Precision.complex_dtype()
+            m = M.astype(dtype)
+            one = Calibration.deembed_1port(MS11.astype(dtype), probes[name][0])
+            two = Calibration.deembed_2port_probes(m[:, 0, 0], m[:, 1, 0], m[:, 0, 1], m[:, 1, 1], *probes[name])
+            results[name] = one + two
+    cond = np.maximum(*conditions)
+    worst = cond >= np.quantile(cond, 1.0 - WORST)
+    for i, name in enumerate(('S11A', 'ZA_1port', 'S21A', 'ZA_2port')):
+        report[name] = errors(Stimulus, results['single'][i], results['double'][i], worst)
+    return report
+
+def print_errors(indent, name, value):
+    print('%s%-10s max %9.2e at %9.4g Hz  median %9.2e  p99 %9.2e  scaled max %9.2e  worst-conditioned max %9.2e'
+          % (indent, name, value['max'], value['frequency_of_max'], value['median'], value['p99'], value['scaled_max'],
+             value['worst_conditioned_max']))
+
+def print_report(dataset, report):
+    print(dataset)
+    for n in (1, 2):
+        p = report['probe_%d' % n]
+        print('  probe %d: condition median %.3g, max %.3g at %.6g Hz; dt relative error %s'
+              % (n, p['condition_median'], p['condition_max'], p['frequency_of_condition_max'],
+                 '%.2e' % p['dt_relative_error'] if p['dt_relative_error'] is not None else '-'))
+        print('    phase jumps (single, double) %s; phase factor %s' % (p['number_jumps'], p['phase_factor']))
+        for name in ('x', 'y', 'z', 'S21'):
+            print_errors('    ', name, p[name])
+    for name in ('S11A', 'ZA_1port', 'S21A', 'ZA_2port'):
+        print_errors('  ', name, report[name])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Accuracy of the single precision mode against double precision.')
+    parser.add_argument('--datasets', nargs='+', choices=DATASETS, default=list(DATASETS))
+    parser.add_argument('--save', default=None, help='save the report as JSON')
+    args = parser.parse_args(argv)
+    report = {}
+    for dataset in args.datasets:
+        report[dataset] = dataset_accuracy(dataset)
+        print_report(dataset, report[dataset])
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=1)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#
+# Benchmarks of the hot paths of the three algorithms: run time and peak memory at 5k, 100k and 1M points
+# (realtime_1port/2port: per-sweep correction of RealTime.py, whose budget is 10 ms for a 5000-point sweep)
+# Datasets: the bundled DogBonePCB_10.03.2022 and StraightPCB_10.03.2022 sweeps (interpolated to the requested
+# number of points) and a synthetic probe with a controllable delay and number of phase jumps.
+# The results are saved as JSON baselines; --compare reports the cases that became slower than a baseline.
+#
+# Examples:
+#   python benchmark.py --save baseline.json
+#   python benchmark.py --sizes 5000 100000 --compare baseline.json
+#
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algorithms import PROBE, IMPEDANCE, load_modules
+
+DATASETS = ('synthetic', 'DogBonePCB_10.03.2022', 'StraightPCB_10.03.2022')
+SIZES = (5000, 100000, 1000000)
+
+def synthetic_probe(N, delay=500.0e-12, jumps=10, fstart=1.0e8):
+    # SOL measurements of a probe with the delay time (s) along it; the frequency span is chosen so that the phase
+    # of S21**2 jumps the given number of times at pi. Returns Stimulus, MSS, MSO, MSL and the probe S-parameters.
+    Stimulus = np.linspace(fstart, fstart + jumps / (2.0 * delay), N)
+    x = 0.05 * np.exp(-1j * np.pi * Stimulus * 0.1 * delay)  # S11 of the probe
+    y = 0.03 * np.exp(-1j * np.pi * Stimulus * 0.05 * delay)  # S22 of the probe
+    S21 = 0.9 * np.exp(-2j * np.pi * Stimulus * delay)
+    MSS, MSO, MSL = [x + S21 * S21 * A / (1.0 - y * A) for A in (-1.0, 1.0, 0.0)]
+    return Stimulus, MSS, MSO, MSL, (x, S21, S21, y)
+
+def bundled_probe(folder, N):
+    # SOL measurements of the probe 1 and the probe model of a bundled dataset interpolated on N points
+    folder = os.path.join(PROBE, folder)
+    sol = [np.loadtxt(os.path.join(folder, 'MS11%s.csv' % t), delimiter=',') for t in 'SOL']
+    model = np.loadtxt(os.path.join(folder, 'Probe_1.S2P'), skiprows=1)
+    Stimulus = np.linspace(sol[0][0, 0], sol[0][-1, 0], N)
+
+    def resample(freq, re, im):
+        return np.interp(Stimulus, freq, re) + 1j * np.interp(Stimulus, freq, im)
+
+    MSS, MSO, MSL = [resample(*data.T[:3]) for data in sol]
+    S = tuple(resample(model[:, 0], model[:, k], model[:, k + 1]) for k in (1, 3, 5, 7))
+    return Stimulus, MSS, MSO, MSL, S
+
+def s2p_model(Stimulus, S):
+    S11, S21, S12, S22 = S
+    return np.column_stack((Stimulus, S11.real, S11.imag, S21.real, S21.imag, S12.real, S12.imag, S22.real, S22.imag))
+
+def probe_cases(data, tmp):
+    # Callables of the Probe deembedding hot paths for one dataset and size
+    Acquisition, Cache, CubSpline, ErrorModel, Jumps, PhaseUnwrapping, Cascade, Calibration, RealTime, NPort = \
+        load_modules(PROBE, ['Acquisition', 'Cache', 'CubSpline', 'ErrorModel', 'Jumps', 'PhaseUnwrapping', 'Cascade',
+                             'Calibration', 'RealTime', 'NPort'])
+    Stimulus, MSS, MSO, MSL, S = data
+    N = len(Stimulus)
+    np.savetxt(os.path.join(tmp, 'MS11S.CSV'), np.column_stack((Stimulus, MSS.real, MSS.imag)), delimiter=',')
+    Cache.cache_dir = os.path.join(tmp, 'cache')
+    kit = np.column_stack((Stimulus[::max(1, N // 700)], MSS.real[::max(1, N // 700)], MSS.imag[::max(1, N // 700)]))
+    x, y, z = ErrorModel.three_term_error(-1.0, 1.0, 0.0, MSS, MSO, MSL)
+    transvar = z + x * y
+    model = s2p_model(Stimulus, S)
+
+    def acq():
+        Cache.enabled = False
+        try:
+            return Acquisition.acq('MS11S.CSV', tmp, ',')
+        finally:
+            Cache.enabled = True
+
+    def acq_cached():
+        return Acquisition.acq('MS11S.CSV', tmp, ',')
+
+    def cubspl():
+        CubSpline.splines.clear()
+        Cache.enabled = False
+        try:
+            return CubSpline.cubspl(kit, Stimulus)
+        finally:
+            Cache.enabled = True
+
+    def unwrap():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return PhaseUnwrapping.unwrap(Stimulus, transvar.real, transvar.imag, 2)
+
+    probe = Calibration.ProbeModel(Stimulus, x, y, z, S[1], np.angle(transvar), np.angle(transvar))
+    hot1 = RealTime.HotProbes([probe])
+    hot2 = RealTime.HotProbes([probe, probe])
+    SA, ZA = np.empty(N, dtype=np.complex128), np.empty(N, dtype=np.complex128)
+    fixture4 = NPort.fixture_from_probes([Cascade.s2p_network(model)] * 4)
+    M4 = np.empty((N, 4, 4), dtype=np.complex128)
+    M4[:] = 0.1
+    M4[:, range(4), range(4)] = MSL[:, None]
+
+    acq_cached()  # the cache entry is created before timing
+    return {
+        'acq': acq,
+        'acq_cached': acq_cached,
+        'cubspl': cubspl,
+        'three_term_error': lambda: ErrorModel.three_term_error(-1.0, 1.0, 0.0, MSS, MSO, MSL),
+        'jumps': lambda: Jumps.jumps(transvar.real, transvar.imag),
+        'unwrap': unwrap,
+        'cascade_2port': lambda: Cascade.deembed_2port(MSS, MSO, MSO, MSL, model, model),
+        'nport_4port': lambda: NPort.deembed(M4, fixture4),
+        'realtime_1port': lambda: hot1.correct(MSL, SA, ZA),
+        'realtime_2port': lambda: hot2.correct((MSS, MSO, MSO, MSL), SA, ZA),
+    }
+
+def impedance_cases(data, tmp):
+    # Callables of the Impedance dispersion hot paths
+    Impedance, = load_modules(IMPEDANCE, ['Impedance'])
+    Stimulus, MSS = data[0], data[1]
+    return {'correct_delay': lambda: Impedance.impedance(Impedance.correct_delay(Stimulus, MSS, 100.0e-12), 11)}
+
+def measure(function, min_time=0.2, max_repeats=20):
+    # Minimum and median run time (s) over several calls, and the peak memory (bytes) of one call
+    times = []
+    while len(times) < 3 or (sum(times) < min_time and len(times) < max_repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'time_min': min(times), 'time_median': float(np.median(times)), 'repeats': len(times),
+            'peak_memory': peak}
+
+def run(sizes, datasets, cases=None, delay=500.0e-12, jumps=10):
+    results = []
+    for dataset in datasets:
+        for N in sizes:
+            if dataset == 'synthetic':
+                data = synthetic_probe(N, delay, jumps)
+            else:
+                data = bundled_probe(dataset, N)
+            tmp = tempfile.mkdtemp()
+            try:
+                functions = probe_cases(data, tmp)
+                functions.update(impedance_cases(data, tmp))
+                for name, function in functions.items():
+                    if cases and name not in cases:
+                        continue
+                    result = {'name': name, 'dataset': dataset, 'points': N}
+                    result.update(measure(function))
+                    results.append(result)
+                    print('%-18s %-24s %8d  %10.3f ms  %8.1f MB' % (name, dataset, N, result['time_min'] * 1.0e3,
+                                                                   result['peak_memory'] / 1.0e6))
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+def metadata():
+    import scipy
+    return {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'scipy': scipy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor()}
+
+def compare(results, baseline, threshold):
+    # Prints the ratio of the run times to the baseline; returns the number of cases slower than threshold
+    base = {(r['name'], r['dataset'], r['points']): r for r in baseline['results']}
+    slower = 0
+    for r in results:
+        b = base.get((r['name'], r['dataset'], r['points']))
+        if b is None:
+            continue
+        ratio = r['time_min'] / b['time_min']
+        memory = r['peak_memory'] / b['peak_memory'] if b['peak_memory'] else 1.0
+        flag = ''
+        if ratio > threshold:
+            flag = '  SLOWER'
+            slower += 1
+        print('%-18s %-24s %8d  time x%.2f  memory x%.2f%s' % (r['name'], r['dataset'], r['points'], ratio, memory,
+                                                               flag))
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the hot paths (run time and peak memory).')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='numbers of frequency points')
+    parser.add_argument('--datasets', nargs='+', choices=DATASETS, default=list(DATASETS))
+    parser.add_argument('--cases', nargs='+', default=None, help='run only these cases (e.g. acq unwrap)')
+    parser.add_argument('--delay', type=float, default=500.0, help='delay time of the synthetic probe in ps')
+    parser.add_argument('--jumps', type=int, default=10, help='number of phase jumps of the synthetic probe')
+    parser.add_argument('--save', default=None, help='save the results as a JSON baseline')
+    parser.add_argument('--compare', default=None, help='compare with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='time ratio reported as a regression by --compare (default: 1.25)')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.datasets, args.cases, args.delay * 1.0e-12, args.jumps)
+    report = {'meta': metadata(), 'results': results}
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            slower = compare(results, json.load(file), args.threshold)
+        print(slower, 'case(s) slower than the baseline')
+        return 1 if slower else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#
+# Incremental job runner for the multi-stage calibration: only the stages whose inputs changed are recomputed
+# The workflow of every PCB fixture is a dependency graph of stages:
+#   probe_n    SOL files -> error terms -> Probe_n_phase_initial.CSV, Probe_n_phase_unwrapped.CSV, Probe_n.S2P
+#              (Probe deembedding; the probe model is also saved in the probe store of the fixture)
+#   deembed    probe models + MS11.CSV... of a device under test -> S11A/S21A and ZA files (Probe deembedding)
+#   delay      S11A.CSV (one probe) or S21A.CSV (two probes) -> Phase_initial.CSV, Phase_unwrapped.csv, delay time
+#              (Delay time)
+#   impedance  S11A/S21A.CSV + delay time -> S_corrected.CSV, Z_corrected.CSV (Impedance dispersion)
+# The fingerprint of a stage is the hash of its parameters (delimiters, ideal, phase_factor, delay...), of the content
+# of its input files and of the results of the stages it depends on. The fingerprints and the hashes of the output
+# files are kept in a state file; a stage runs again only if its fingerprint changed or an output file was removed
+# or modified. A stage that runs again but produces the same results (e.g. a recalibrated probe with the same model)
+# does not make the next stages stale. The state is saved after every stage; a stage that fails (any exception) is
+# recorded as failed, its dependents are skipped and the other stages go on. Stages that do not depend on each other
+# (the probes 1 and 2, the devices under test, the fixture folders) run in parallel in a pool of processes.
+#
+# Job file (JSON; the folders are relative to the job file):
+#   {"fixtures": [{"folder": "DogBonePCB", "probes": 2, "sol_files": ["K_SHORT.s2p", "K_OPEN.s2p", "K_LOAD.s2p"],
+#                  "duts": ["DogBonePCB/sample_1", "DogBonePCB/sample_2"], "delay": {"auto_range": "longest"}}]}
+# The keys of a fixture are the fields of Fixture below.
+#
+# Example: python jobs.py calibration.json --workers 4
+#
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algorithms import PROBE, DELAY, IMPEDANCE, load_modules
+
+VERSION = '1'  # change when the stages change so that the old states are not used
+
+@dataclasses.dataclass
+class Fixture:
+    folder: str  # folder of the SOL measurements; the probe files are written there
+    probes: int = 1  # number of probes
+    deliminput: str = ','  # delimiter used in the input files
+    delimoutput: str = ','  # delimiter used in the output files
+    ideal: int = 1  # 1 - ideal SOL terminations, 0 - S11S/S11O/S11L (S22S/S22O/S22L) files are provided
+    phase_factor: list = None  # phase factor of every probe; None - detected from the phase jumps
+    sol_files: list = None  # Touchstone files measured with SHORT, OPEN, LOAD (instead of MS11S.CSV...)
+    sol_options: str = '# Hz S RI R 50'  # option line of the sol_files if they have none
+    precision: str = 'double'  # double or single (see Probe deembedding/Precision.py)
+    probe_store: str = None  # folder of the probe models; None - .probe_store in the fixture folder
+    duts: list = dataclasses.field(default_factory=list)  # folders of the devices under test measured with the probes
+    delay: dict = None  # DelayConfig fields (phase_factor, fstart, fstop, auto_range), {} - the defaults;
+                        # None - no delay stage and no impedance stage without a fixed delay time
+    impedance: dict = dataclasses.field(default_factory=dict)  # {"delay": s}: fixed delay time instead of the
+                                                               # delay stage; None - no impedance stage
+
+@dataclasses.dataclass
+class Stage:
+    name: str  # unique name: folder relative to the job file / stage
+    function: str  # stage function of this module, called with the results of deps and kwargs
+    kwargs: dict  # parameters (JSON values)
+    inputs: list  # files read by the stage
+    outputs: list  # files written by the stage (the files that do not exist after the run are ignored)
+    deps: list = dataclasses.field(default_factory=list)  # names of the stages whose results are needed
+
+def file_hash(address):
+    h = hashlib.blake2b(digest_size=20)
+    with open(address, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def output_hashes(addresses):
+    return {address: file_hash(address) for address in addresses if os.path.exists(address)}
+
+def probe_stage(results, folder, n, probes, deliminput, delimoutput, ideal, phase_factor, sol_files, sol_options,
+                precision, model):
+    # Calibrates the probe n, writes its files and saves its model (model - .npz address)
+    Cache, Precision, Calibration, ProbeStore = load_modules(PROBE, ['Cache', 'Precision', 'Calibration',
+                                                                     'ProbeStore'])
+    config = Calibration.DeembeddingConfig(folder, probes, deliminput, delimoutput, ideal, 1, tuple(phase_factor),
+                                           None if sol_files is None else tuple(sol_files), sol_options,
+                                           precision=precision)
+    with Precision.precision(precision):
+        probe = Calibration.calibrate_from_files(config, n)
+        Calibration.save_probe_files(config, n, probe)
+    os.makedirs(os.path.dirname(model), exist_ok=True)
+    ProbeStore.save_probe(model, probe, {})
+    arrays = [value for value in vars(probe).values() if hasattr(value, 'dtype')]
+    return {'model': Cache.array_key(*arrays), 'number_jumps': int(probe.number_jumps),
+            'phase_factor': probe.phase_factor, 'dt': None if probe.dt is None else float(probe.dt)}
+
+def deembed_stage(results, folder, models, deliminput, delimoutput, precision):
+    # Deembeds the device under test of folder through the probe models (.npz addresses)
+    Precision, Calibration, ProbeStore = load_modules(PROBE, ['Precision', 'Calibration', 'ProbeStore'])
+    probes = []
+    for model in models:
+        fields = ProbeStore.load_probe(model)
+        if fields is None:
+            raise ValueError('Cannot load the probe model %s' % model)
+        probes.append(Calibration.ProbeModel(**fields))
+    with Precision.precision(precision):
+        Stimulus, _, _ = Calibration.deembed_files(probes, folder, deliminput, delimoutput)
+    return {'points': len(Stimulus)}
+
+def delay_stage(results, folder, filename, deliminput, phase_factor=None, fstart=None, fstop=None, auto_range=None):
+    # Delay time along the device under test from the phase of filename
+    DelayTime, = load_modules(DELAY, ['DelayTime'])
+    estimate = DelayTime.run_delay(DelayTime.DelayConfig(folder, deliminput, phase_factor, fstart, fstop, filename,
+                                                         auto_range))
+    return {'dt': float(estimate.dt), 'number_jumps': int(estimate.number_jumps),
+            'phase_factor': estimate.phase_factor}
+
+def impedance_stage(results, folder, filename, parameter, deliminput, delay=None, source=None):
+    # Impedance of the device under test corrected by the delay time (s); None - the delay time of the stage source
+    Impedance, = load_modules(IMPEDANCE, ['Impedance'])
+    if delay is None:
+        delay = results[source]['dt']
+    Freq, _, _ = Impedance.run_impedance(Impedance.ImpedanceConfig(folder, delay, parameter, deliminput, filename))
+    return {'delay': delay, 'points': len(Freq)}
+
+def execute(function, results, kwargs):
+    # Runs a stage (in a worker process); returns the results and the run time, s
+    start = time.perf_counter()
+    return globals()[function](results, **kwargs), time.perf_counter() - start
+
+def fixture_stages(fixture, base):
+    # Stages of a Fixture; base - folder of the job file
+    def path(folder):
+        return os.path.normpath(os.path.join(base, folder))
+
+    def name(folder, stage):
+        return '%s/%s' % (os.path.relpath(folder, base).replace(os.sep, '/'), stage)
+
+    folder = path(fixture.folder)
+    store = path(fixture.probe_store) if fixture.probe_store is not None else os.path.join(folder, '.probe_store')
+    P = fixture.probes
+    phase_factor = list(fixture.phase_factor) if fixture.phase_factor is not None else [None] * P
+    if len(phase_factor) < P:
+        raise ValueError('%s: phase_factor must have a value for each of the %d probes' % (fixture.folder, P))
+    if fixture.duts and P > 2:
+        raise ValueError('%s: the devices under test are deembedded with one or two probes' % fixture.folder)
+    unknown = set(fixture.delay or {}) - {'phase_factor', 'fstart', 'fstop', 'auto_range'}
+    unknown |= set(fixture.impedance or {}) - {'delay'}
+    if unknown:
+        raise ValueError('%s: unknown delay or impedance parameters %s' % (fixture.folder, ', '.join(sorted(unknown))))
+    stages = []
+    models = []
+    for n in range(1, P + 1):
+        if fixture.sol_files is None:
+            names = ['MS%d%d%s.CSV' % (n, n, t) for t in 'SOL']
+        else:
+            names = list(fixture.sol_files)
+        if fixture.ideal == 0:
+            names += ['S%d%d%s.CSV' % (n, n, t) for t in 'SOL']
+        model = os.path.join(store, 'Probe_%d_model.npz' % n)
+        models.append(model)
+        outputs = ['Probe_%d_phase_initial.CSV' % n, 'Probe_%d_phase_unwrapped.CSV' % n, 'Probe_%d.S2P' % n]
+        stages.append(Stage(name(folder, 'probe_%d' % n), 'probe_stage',
+                            {'folder': folder, 'n': n, 'probes': P, 'deliminput': fixture.deliminput,
+                             'delimoutput': fixture.delimoutput, 'ideal': fixture.ideal,
+                             'phase_factor': phase_factor, 'sol_files': fixture.sol_files,
+                             'sol_options': fixture.sol_options, 'precision': fixture.precision, 'model': model},
+                            [os.path.join(folder, name) for name in names],
+                            [os.path.join(folder, name) for name in outputs] + [model]))
+    probe_stages = [stage.name for stage in stages]
+
+    parameter = 11 if P == 1 else 21
+    filename = 'S%dA.CSV' % parameter
+    for dut in fixture.duts:
+        dut = path(dut)
+        measured = ['MS11.CSV'] if P == 1 else ['MS11.CSV', 'MS22.CSV', 'MS21.CSV', 'MS12.CSV']
+        stages.append(Stage(name(dut, 'deembed'), 'deembed_stage',
+                            {'folder': dut, 'models': models, 'deliminput': fixture.deliminput,
+                             'delimoutput': fixture.delimoutput, 'precision': fixture.precision},
+                            [os.path.join(dut, name) for name in measured],
+                            [os.path.join(dut, name) for name in (filename, 'ZA_from_S%dA.CSV' % parameter)],
+                            probe_stages))
+        source = None
+        if fixture.delay is not None:
+            source = name(dut, 'delay')
+            stages.append(Stage(source, 'delay_stage',
+                                dict(fixture.delay, folder=dut, filename=filename, deliminput=fixture.delimoutput),
+                                [os.path.join(dut, filename)],
+                                [os.path.join(dut, name) for name in ('Phase_initial.CSV', 'Phase_unwrapped.csv')],
+                                [name(dut, 'deembed')]))
+        if fixture.impedance is None or fixture.impedance.get('delay') is None and source is None:
+            continue
+        delay = fixture.impedance.get('delay')
+        stages.append(Stage(name(dut, 'impedance'), 'impedance_stage',
+                            {'folder': dut, 'filename': filename, 'parameter': parameter,
+                             'deliminput': fixture.delimoutput, 'delay': delay,
+                             'source': source if delay is None else None},
+                            [os.path.join(dut, filename)],
+                            [os.path.join(dut, name) for name in ('S_corrected.CSV', 'Z_corrected.CSV')],
+                            [name(dut, 'deembed')] + ([source] if delay is None else [])))
+    return stages
+
+def read_job(address):
+    # Returns the stages of all fixtures of the job file
+    with open(address) as file:
+        job = json.load(file)
+    base = os.path.dirname(os.path.abspath(address))
+    stages = []
+    for entry in job.get('fixtures', []):
+        try:
+            fixture = Fixture(**entry)
+        except TypeError as error:
+            raise ValueError('%s: %s' % (address, error))
+        stages += fixture_stages(fixture, base)
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError('%s: a folder is used by two fixtures or listed twice' % address)
+    return stages
+
+def fingerprint(stage, results):
+    # Hash of the parameters, the content of the input files and the results of the dependencies of the stage
+    h = hashlib.blake2b(VERSION.encode(), digest_size=20)
+    h.update(json.dumps([stage.function, stage.kwargs, [results[name] for name in stage.deps]],
+                        sort_keys=True).encode())
+    for address in stage.inputs:
+        h.update(b'\0' + address.encode() + b'\0' + file_hash(address).encode())
+    return h.hexdigest()
+
+def load_state(address):
+    try:
+        with open(address) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get('version') == VERSION else {}
+
+def save_state(address, state):
+    temporary = address + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    os.replace(temporary, address)  # an interrupted run does not leave a damaged state
+
+def is_fresh(stage, key, state):
+    # True if the stage ran with the same fingerprint and its output files were not changed since
+    entry = state.get('stages', {}).get(stage.name)
+    if entry is None or entry['fingerprint'] != key:
+        return False
+    return all(os.path.exists(address) and file_hash(address) == value
+               for address, value in entry['outputs'].items())
+
+def run_job(stages, state_address, workers=None, force=False, dry_run=False, report=print):
+    # Runs the stale stages; independent stages run in parallel (workers - number of processes, None - number of
+    # CPUs, 1 - no pool). force - all stages are stale; dry_run - the stale stages are only reported.
+    # report - function called with a line of text for every stage
+    # Returns the dict {stage name: fresh, done, failed, skipped or stale (dry_run)}
+    state = load_state(state_address)
+    state.setdefault('stages', {})
+    state['version'] = VERSION
+    waiting = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [name for name in stage.deps if name not in waiting]
+        if missing:
+            raise ValueError('%s depends on the unknown stages %s' % (stage.name, ', '.join(missing)))
+    results = {}  # results of the fresh and done stages
+    status = {}
+    running = {}  # future -> (stage, fingerprint)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 and not dry_run else None
+
+    def finish(stage, key, outcome):
+        results[stage.name], elapsed = outcome
+        state['stages'][stage.name] = {'fingerprint': key, 'results': results[stage.name],
+                                       'outputs': output_hashes(stage.outputs), 'time': elapsed}
+        save_state(state_address, state)
+        status[stage.name] = 'done'
+        report('%-60s done in %.3f s' % (stage.name, elapsed))
+
+    def fail(stage, error):
+        # a failed stage is stale in the next run, whatever it ran before
+        if not dry_run:
+            state['stages'][stage.name] = {'fingerprint': None, 'error': '%s: %s' % (type(error).__name__, error)}
+            save_state(state_address, state)
+        status[stage.name] = 'failed'
+        report('%-60s failed: %s' % (stage.name, error))
+
+    try:
+        while waiting or running:
+            progress = True
+            while progress:  # the fresh stages make their dependents ready at once
+                progress = False
+                for stage in list(waiting.values()):
+                    blocked = [name for name in stage.deps if status.get(name) in ('failed', 'skipped', 'stale')]
+                    if blocked:
+                        del waiting[stage.name]
+                        status[stage.name] = 'stale' if status[blocked[0]] == 'stale' else 'skipped'
+                        report('%-60s %s (after %s)' % (stage.name, status[stage.name], blocked[0]))
+                        progress = True
+                        continue
+                    if any(name not in results for name in stage.deps):
+                        continue
+                    del waiting[stage.name]
+                    progress = True
+                    try:
+                        key = fingerprint(stage, results)
+                    except Exception as error:
+                        fail(stage, error)
+                        continue
+                    if not force and is_fresh(stage, key, state):
+                        results[stage.name] = state['stages'][stage.name]['results']
+                        status[stage.name] = 'fresh'
+                        report('%-60s fresh' % stage.name)
+                    elif dry_run:
+                        status[stage.name] = 'stale'
+                        report('%-60s stale' % stage.name)
+                    elif pool is None:
+                        try:
+                            finish(stage, key, execute(stage.function, results, stage.kwargs))
+                        except Exception as error:  # any error of one stage must not stop the other stages
+                            fail(stage, error)
+                    else:
+                        upstream = {name: results[name] for name in stage.deps}
+                        running[pool.submit(execute, stage.function, upstream, stage.kwargs)] = (stage, key)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, key = running.pop(future)
+                try:
+                    finish(stage, key, future.result())
+                except Exception as error:  # also a worker process that died (BrokenProcessPool)
+                    fail(stage, error)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs the stale stages of the calibration jobs of a job file.')
+    parser.add_argument('job', help='JSON job file (see the header of jobs.py)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of CPUs)')
+    parser.add_argument('--state', default=None, help='state file (default: <job>.state.json)')
+    parser.add_argument('--force', action='store_true', help='run all stages')
+    parser.add_argument('--dry-run', action='store_true', help='only report the stale stages')
+    args = parser.parse_args(argv)
+    try:
+        stages = read_job(args.job)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    state = args.state or os.path.splitext(args.job)[0] + '.state.json'
+    status = run_job(stages, state, args.workers, args.force, args.dry_run)
+    counts = {}
+    for value in status.values():
+        counts[value] = counts.get(value, 0) + 1
+    print(', '.join('%d %s' % (count, value) for value, count in sorted(counts.items())))
+    return 1 if counts.get('failed') or counts.get('skipped') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
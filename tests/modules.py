@@ -0,0 +1,11 @@
+#
+# Imports of the modules of the three algorithms and of the pipeline for the tests (see algorithms.py)
+#
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from algorithms import ROOT, PROBE, DELAY, IMPEDANCE, load_modules
+
+PIPELINE = os.path.join(ROOT, 'pipeline')
@@ -0,0 +1,32 @@
+#
+# Synthetic measurement files of one or two probes and of a device under test measured through them
+#
+
+import os
+import numpy as np
+
+def probe_terms(Stimulus, delay):
+    # S11, S21 and S22 of a probe with the delay time (s) along it (as in benchmarks/benchmark.py)
+    x = 0.05 * np.exp(-1j * np.pi * Stimulus * 0.1 * delay)
+    y = 0.03 * np.exp(-1j * np.pi * Stimulus * 0.05 * delay)
+    S21 = 0.9 * np.exp(-2j * np.pi * Stimulus * delay)
+    return x, S21, y
+
+def write_file(address, Stimulus, S):
+    np.savetxt(address, np.column_stack((Stimulus, S.real, S.imag)), delimiter=',')
+
+def write_sweeps(folder, N, probes=1, fstart=1.0e8, fstop=1.0e10, delay=500.0e-12):
+    # Writes MS11S/O/L.CSV (and MS22S/O/L.CSV) of the probes and MS11.CSV (and MS21, MS12, MS22.CSV) of a device
+    # under test into folder; returns the frequency points
+    Stimulus = np.linspace(fstart, fstop, N)
+    for n in range(1, probes + 1):
+        x, S21, y = probe_terms(Stimulus, delay * (1.0 + 0.2 * n))
+        for t, A in zip('SOL', (-1.0, 1.0, 0.0)):
+            write_file(os.path.join(folder, 'MS%d%d%s.CSV' % (n, n, t)), Stimulus, x + S21 * S21 * A / (1.0 - y * A))
+    line = np.exp(-2j * np.pi * Stimulus * 100.0e-12)
+    write_file(os.path.join(folder, 'MS11.CSV'), Stimulus, 0.2 * line + 0.05)
+    if probes == 2:
+        write_file(os.path.join(folder, 'MS21.CSV'), Stimulus, 0.7 * line)
+        write_file(os.path.join(folder, 'MS12.CSV'), Stimulus, 0.7 * line)
+        write_file(os.path.join(folder, 'MS22.CSV'), Stimulus, 0.1 * line - 0.02)
+    return Stimulus
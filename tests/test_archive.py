@@ -0,0 +1,63 @@
+#
+# Result archive: write and lazy read of columns across the chunk boundaries
+#
+
+import numpy as np
+import pytest
+from modules import PROBE, load_modules
+
+def table(N):
+    Freq = np.linspace(1.0e6, 2.0e10, N)
+    rng = np.random.default_rng(0)
+    return np.column_stack((Freq, rng.normal(size=N), rng.normal(size=N)))
+
+def test_column_across_chunks(tmp_path):
+    Archive, = load_modules(PROBE, ['Archive'])
+    N = 2 * Archive.CHUNK + 1000
+    data = table(N)
+    address = str(tmp_path / 'results.npz')
+    with Archive.ArchiveWriter(address) as writer:
+        writer.add_table('ZA_from_S21A', data, ['Stimulus', 'Re', 'Im'])
+        writer.meta['run']['dt'] = 1.0e-9
+    with Archive.Archive(address) as archive:
+        assert archive.tables == ['ZA_from_S21A'] and archive.run == {'dt': 1.0e-9}
+        info = archive.info('ZA_from_S21A')
+        assert info['rows'] == N and [chunk[:2] for chunk in info['chunks']] == \
+            [[0, Archive.CHUNK], [Archive.CHUNK, 2 * Archive.CHUNK], [2 * Archive.CHUNK, N]]
+        assert np.array_equal(archive.column('ZA_from_S21A', 'Re'), data[:, 1])
+        assert np.array_equal(archive.table('ZA_from_S21A'), data)
+        # a range around the first chunk boundary reads only the first two chunks
+        first, last = Archive.CHUNK - 10, Archive.CHUNK + 10
+        fstart, fstop = data[first, 0], data[last, 0]
+        assert archive.selected_chunks(info, fstart, fstop) == [0, 1]
+        members = []
+        read = archive.read
+        archive.read = lambda member: members.append(member) or read(member)
+        assert np.array_equal(archive.column('ZA_from_S21A', 'Im', fstart, fstop), data[first:last + 1, 2])
+        assert sorted(members) == ['ZA_from_S21A/Im/0.npy', 'ZA_from_S21A/Im/1.npy',
+                                   'ZA_from_S21A/Stimulus/0.npy', 'ZA_from_S21A/Stimulus/1.npy']
+        # a range on the last point only
+        assert np.array_equal(archive.column('ZA_from_S21A', 'Re', data[-1, 0]), data[-1:, 1])
+        with pytest.raises(ValueError, match='no column'):
+            archive.column('ZA_from_S21A', 'Abs')
+        with pytest.raises(ValueError, match='no table'):
+            archive.column('S21A', 'Re')
+    # also a valid .npz file
+    with np.load(address) as npz:
+        assert np.array_equal(npz['ZA_from_S21A/Re/2'], data[2 * Archive.CHUNK:, 1])
+
+def test_unsorted_table_and_export(tmp_path):
+    Archive, = load_modules(PROBE, ['Archive'])
+    data = table(1000)[::-1]
+    address = str(tmp_path / 'results.npz')
+    with Archive.ArchiveWriter(address, chunk=300) as writer:
+        writer.add_table('S21A', data, ['Stimulus', 'Re', 'Im'], fmt='%.18e', filename='S21A.CSV', delimiter=';')
+        with pytest.raises(ValueError, match='already has'):
+            writer.add_table('S21A', data, ['Stimulus', 'Re', 'Im'])
+    with Archive.Archive(address) as archive:
+        fstart, fstop = data[600, 0], data[400, 0]
+        assert archive.selected_chunks(archive.info('S21A'), fstart, fstop) == [0, 1, 2, 3]
+        assert np.array_equal(archive.table('S21A', fstart, fstop), data[400:601])
+        [exported] = archive.export(str(tmp_path))
+    assert exported.endswith('S21A.CSV')
+    assert np.array_equal(np.loadtxt(exported, delimiter=';'), data)
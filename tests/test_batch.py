@@ -0,0 +1,46 @@
+#
+# Batch deembedding: the probe models of the caller are not changed and mismatched sweeps are rejected
+#
+
+import os
+import numpy as np
+from modules import PROBE, load_modules
+from synthetic import write_sweeps, write_file
+
+def test_serial_batch_keeps_the_probes_writeable(tmp_path):
+    Batch, Calibration = load_modules(PROBE, ['Batch', 'Calibration'])
+    write_sweeps(str(tmp_path), 500, probes=2)
+    config = Calibration.DeembeddingConfig(str(tmp_path), 2, VNA=1)
+    probes = Calibration.run_deembedding(config).probes
+    # the frequency points loaded from the cache of parsed files (Cache.py, if enabled) are read-only from the start
+    flags = lambda: [value.flags.writeable for probe in probes for value in vars(probe).values()
+                     if isinstance(value, np.ndarray)]
+    before = flags()
+    results = Batch.deembed_batch(probes, [str(tmp_path)], workers=1)
+    assert results == [(str(tmp_path), 500, None)]
+    assert flags() == before and any(before)
+
+def test_mismatched_dut_file_is_rejected(tmp_path):
+    Batch, Calibration = load_modules(PROBE, ['Batch', 'Calibration'])
+    Stimulus = write_sweeps(str(tmp_path), 500, probes=2)
+    config = Calibration.DeembeddingConfig(str(tmp_path), 2, VNA=1)
+    probes = Calibration.run_deembedding(config).probes
+    write_file(os.path.join(str(tmp_path), 'MS12.CSV'), Stimulus * 1.01, np.ones(500, dtype=complex))
+    [(_, points, error)] = Batch.deembed_batch(probes, [str(tmp_path)], workers=1)
+    assert points == 0 and 'MS12.CSV' in error
+    assert not os.path.exists(os.path.join(str(tmp_path), 'S21A.CSV'))
+
+def test_lowercase_dut_files(tmp_path):
+    # the bundled measurements are named MS11.csv...: the folders are found and read whatever the case of the names
+    Batch, Calibration = load_modules(PROBE, ['Batch', 'Calibration'])
+    write_sweeps(str(tmp_path), 500, probes=2)
+    probes = Calibration.run_deembedding(Calibration.DeembeddingConfig(str(tmp_path), 2, VNA=1)).probes
+    for name in ('dut1', 'dut2', 'other'):
+        os.makedirs(str(tmp_path / name))
+        if name != 'other':
+            write_sweeps(str(tmp_path / name), 500, probes=2)
+    for name in ('MS11', 'MS21', 'MS12', 'MS22'):
+        os.rename(str(tmp_path / 'dut2' / (name + '.CSV')), str(tmp_path / 'dut2' / (name + '.csv')))
+    folders = Batch.dut_folders(str(tmp_path))
+    assert folders == [str(tmp_path / 'dut1'), str(tmp_path / 'dut2')]
+    assert [error for _, _, error in Batch.deembed_batch(probes, folders, workers=1)] == [None, None]
@@ -0,0 +1,74 @@
+#
+# Cache of parsed files: hits and misses, invalidation by the file content, eviction and the disabled cache
+#
+
+import os
+import numpy as np
+import pytest
+from modules import PROBE, load_modules
+
+def load_cache(monkeypatch, tmp_path, enabled='1'):
+    monkeypatch.setenv('PROBE_CACHE_DIR', str(tmp_path / 'cache'))
+    if enabled is None:
+        monkeypatch.delenv('PROBE_CACHE', raising=False)
+    else:
+        monkeypatch.setenv('PROBE_CACHE', enabled)
+    Cache, = load_modules(PROBE, ['Cache'])
+    return Cache
+
+def counting_parser(address, calls):
+    def parse():
+        calls.append(address)
+        return (np.loadtxt(address, delimiter=','),)
+    return parse
+
+def test_hit_and_miss(monkeypatch, tmp_path):
+    Cache = load_cache(monkeypatch, tmp_path)
+    address = str(tmp_path / 'MS11.CSV')
+    np.savetxt(address, np.arange(12.0).reshape(4, 3), delimiter=',')
+    calls = []
+    first, = Cache.cached(address, ('txt', ','), counting_parser(address, calls))
+    second, = Cache.cached(address, ('txt', ','), counting_parser(address, calls))
+    assert len(calls) == 1
+    assert np.array_equal(first, second) and not second.flags.writeable
+    # other parsing parameters are another entry
+    Cache.cached(address, ('txt', ';'), counting_parser(address, calls))
+    assert len(calls) == 2
+
+def test_content_change_invalidates(monkeypatch, tmp_path):
+    Cache = load_cache(monkeypatch, tmp_path)
+    address = str(tmp_path / 'MS11.CSV')
+    np.savetxt(address, np.zeros((4, 3)), delimiter=',')
+    calls = []
+    Cache.cached(address, ('txt', ','), counting_parser(address, calls))
+    np.savetxt(address, np.ones((4, 3)), delimiter=',')
+    values, = Cache.cached(address, ('txt', ','), counting_parser(address, calls))
+    assert len(calls) == 2 and np.all(values == 1.0)
+
+def test_eviction_by_size_limit(monkeypatch, tmp_path):
+    Cache = load_cache(monkeypatch, tmp_path)
+    array = np.zeros(1000)  # 8 kB per entry
+    keys = [Cache.array_key(np.array([i])) for i in range(4)]
+    for i, key in enumerate(keys):
+        Cache.cached_key(key, lambda: (array,))
+        for name in os.listdir(Cache.cache_dir):
+            if name.startswith(key):
+                os.utime(os.path.join(Cache.cache_dir, name), (1.0e9 + i, 1.0e9 + i))  # key i used at time i
+    Cache.evict(2.5 * array.nbytes)
+    assert [Cache.entry_names(key) is not None for key in keys] == [False, False, True, True]
+    Cache.clear()
+    assert os.listdir(Cache.cache_dir) == []
+
+@pytest.mark.parametrize('enabled', [None, '0'])
+def test_disabled(monkeypatch, tmp_path, enabled):
+    # off by default: nothing is written and the file is parsed every time
+    Cache = load_cache(monkeypatch, tmp_path, enabled)
+    assert not Cache.enabled
+    address = str(tmp_path / 'MS11.CSV')
+    np.savetxt(address, np.zeros((4, 3)), delimiter=',')
+    calls = []
+    for _ in range(2):
+        values, = Cache.cached(address, ('txt', ','), counting_parser(address, calls))
+        assert values.flags.writeable
+    assert len(calls) == 2
+    assert not os.path.exists(Cache.cache_dir)
@@ -0,0 +1,17 @@
+#
+# Checks of the command-line arguments of Probe deembedding/cli.py
+#
+
+import os
+import pytest
+from modules import PROBE, load_modules
+
+def test_watch_output_must_differ_from_watch(tmp_path):
+    cli, = load_modules(PROBE, ['cli'])
+    incoming = str(tmp_path / 'incoming')
+    os.makedirs(incoming)
+    with pytest.raises(SystemExit):
+        cli.parse_args(['--folder', str(tmp_path), '--watch', incoming, '--watch-output',
+                        os.path.join(incoming, os.pardir, 'incoming')])
+    args = cli.parse_args(['--folder', str(tmp_path), '--watch', incoming, '--watch-output', str(tmp_path / 'out')])
+    assert args.watch_output == str(tmp_path / 'out')
@@ -0,0 +1,36 @@
+#
+# Delay scan of the impedance dispersion: recovery of a known delay time and the chunked scan
+#
+
+import numpy as np
+import pytest
+from modules import IMPEDANCE, load_modules
+
+DELAY = 73.3e-12  # s, between the points of the coarse grid
+
+def measured(parameter, N=801):
+    # S11 or S21 of a sample with a frequency-independent impedance behind a line of the delay time DELAY
+    Freq = np.linspace(1.0e8, 2.0e10, N)
+    S = (0.3 + 0.1j if parameter == 11 else 0.8 - 0.05j) * np.exp(-2j * np.pi * Freq * DELAY)
+    return Freq, S
+
+@pytest.mark.parametrize('parameter', [11, 21])
+@pytest.mark.parametrize('criterion', ['flat_imag', 'flat_phase'])
+def test_optimize_recovers_the_delay(parameter, criterion):
+    DelayScan, = load_modules(IMPEDANCE, ['DelayScan'])
+    Freq, S = measured(parameter)
+    delay, cost = DelayScan.optimize_delay(Freq, S, np.linspace(0.0, 200.0e-12, 201), parameter, criterion)
+    assert delay == pytest.approx(DELAY, abs=1.0e-16)
+    assert cost < 1.0e-6
+
+def test_chunked_scan():
+    DelayScan, = load_modules(IMPEDANCE, ['DelayScan'])
+    Freq, S = measured(21)
+    delays = np.linspace(0.0, 200.0e-12, 41)
+    SS, Z = DelayScan.scan(Freq, S, delays, 21)
+    assert SS.shape == Z.shape == (41, len(Freq))
+    costs = DelayScan.delay_costs(Freq, S, delays, 21)
+    assert np.allclose(DelayScan.delay_costs(Freq, S, delays, 21, chunk=7), costs, rtol=1.0e-12, atol=0.0)
+    assert int(np.argmin(costs)) == int(np.argmin(np.abs(delays - DELAY)))
+    with pytest.raises(ValueError, match='Unknown criterion'):
+        DelayScan.delay_costs(Freq, S, delays, 21, 'smallest')
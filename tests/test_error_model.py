@@ -0,0 +1,38 @@
+#
+# 3-term SOL error model: the vectorized solution against np.linalg.solve of every frequency point
+#
+
+import numpy as np
+from modules import PROBE, load_modules
+
+def test_three_term_error_matches_solve():
+    ErrorModel, = load_modules(PROBE, ['ErrorModel'])
+    rng = np.random.default_rng(1)
+    N = 200
+    x = 0.1 * (rng.normal(size=N) + 1j * rng.normal(size=N))
+    y = 0.1 * (rng.normal(size=N) + 1j * rng.normal(size=N))
+    S21 = 0.9 * np.exp(-1j * rng.uniform(-np.pi, np.pi, N))
+    z = S21 * S21 - x * y
+    standards = [-1.0 + 0.05j * rng.normal(size=N), 1.0 - 0.05j * rng.normal(size=N), 0.02 * rng.normal(size=N)]
+    measured = [x + S21 * S21 * A / (1.0 - y * A) for A in standards]
+    xs, ys, zs = ErrorModel.three_term_error(*standards, *measured)
+    # x + A AM y + A z = AM for A = AS, AO, AL at every frequency point
+    for n in range(N):
+        matrix = np.array([[1.0, A[n] * AM[n], A[n]] for A, AM in zip(standards, measured)])
+        expected = np.linalg.solve(matrix, [AM[n] for AM in measured])
+        assert np.allclose([xs[n], ys[n], zs[n]], expected, rtol=1.0e-10, atol=1.0e-13)
+    assert np.allclose(xs, x, atol=1.0e-12) and np.allclose(ys, y, atol=1.0e-12) and np.allclose(zs, z, atol=1.0e-12)
+
+def test_three_term_error_ideal_standards():
+    # scalar ideal standards broadcast over the sweep, and the 1-port correction recovers the device
+    ErrorModel, = load_modules(PROBE, ['ErrorModel'])
+    rng = np.random.default_rng(2)
+    N = 50
+    x, y = [0.1 * (rng.normal(size=N) + 1j * rng.normal(size=N)) for _ in range(2)]
+    z = 0.81 - x * y
+    measured = [x + A * (z + x * y) / (1.0 - y * A) for A in (-1.0, 1.0, 0.0)]
+    xs, ys, zs = ErrorModel.three_term_error(-1.0, 1.0, 0.0, *measured)
+    assert np.allclose(xs, x) and np.allclose(ys, y) and np.allclose(zs, z)
+    S11A = 0.3 * np.exp(1j * rng.uniform(-np.pi, np.pi, N))
+    MS11 = x + S11A * (z + x * y) / (1.0 - y * S11A)
+    assert np.allclose(ErrorModel.correct_1port(MS11, xs, ys, zs), S11A, rtol=1.0e-12)
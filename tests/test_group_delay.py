@@ -0,0 +1,37 @@
+#
+# Window slopes and residuals of GroupDelay.py against np.polyfit on narrow windows of a 1M-point sweep
+#
+
+import numpy as np
+from modules import DELAY, load_modules
+
+N = 1000000
+
+def sweep():
+    # Delay of 1 ns with a ripple and 1e-3 rad of phase noise from 0.1 to 20 GHz
+    rng = np.random.default_rng(0)
+    Stimulus = np.linspace(1.0e8, 2.0e10, N)
+    phase = -2.0 * np.pi * Stimulus * 1.0e-9 + 3.0 * np.sin(Stimulus / 1.0e9) + rng.normal(0.0, 1.0e-3, N)
+    return Stimulus, phase, rng
+
+def test_group_delay_narrow_windows():
+    GroupDelay, = load_modules(DELAY, ['GroupDelay'])
+    Stimulus, phase, rng = sweep()
+    step = Stimulus[1] - Stimulus[0]
+    for points in (3, 5, 11, 101):
+        delay = GroupDelay.group_delay(Stimulus, phase, (points - 1 + 0.5) * step)
+        # random points, the edges of the sweep and the boundaries of the blocks of the sums
+        centers = np.concatenate([rng.integers(0, N, 100), [0, 1, N - 2, N - 1, 999, 1000, 1001, 1002]])
+        for center in centers:
+            window = slice(max(0, center - points // 2), center + points // 2 + 1)
+            expected = -np.polyfit(Stimulus[window] - Stimulus[center], phase[window], 1)[0] / (2.0 * np.pi)
+            assert abs(delay[center] - expected) <= 1.0e-6 * abs(expected)
+
+def test_window_sse_narrow_windows():
+    GroupDelay, = load_modules(DELAY, ['GroupDelay'])
+    Stimulus, phase, _ = sweep()
+    sums, _ = GroupDelay.prefix_sums(Stimulus, phase)
+    for start, stop in ((10, 15), (995, 1010), (500000, 500101), (3000, 400000)):
+        u = Stimulus[start:stop] - Stimulus[start]
+        residuals = phase[start:stop] - np.polyval(np.polyfit(u, phase[start:stop], 1), u)
+        assert np.isclose(GroupDelay.window_sse(sums, start, stop), np.sum(residuals ** 2), rtol=1.0e-6)
@@ -0,0 +1,66 @@
+#
+# Incremental job runner: failed stages, the state saved after every stage and the propagation of the stale stages
+#
+
+import os
+import json
+import numpy as np
+from modules import PIPELINE, load_modules
+from synthetic import write_sweeps, write_file
+
+def test_failed_stage_does_not_stop_the_job(tmp_path):
+    jobs, = load_modules(PIPELINE, ['jobs'])
+    jobs.broken_stage = lambda results: 1 / 0
+    jobs.empty_stage = lambda results: {}
+    stages = [jobs.Stage('a', 'broken_stage', {}, [], []),
+              jobs.Stage('b', 'empty_stage', {}, [], [], ['a']),
+              jobs.Stage('c', 'empty_stage', {}, [], [])]
+    address = str(tmp_path / 'job.state.json')
+    status = jobs.run_job(stages, address, workers=1, report=lambda line: None)
+    assert status == {'a': 'failed', 'b': 'skipped', 'c': 'done'}
+    with open(address) as file:
+        state = json.load(file)['stages']
+    assert state['a'] == {'fingerprint': None, 'error': 'ZeroDivisionError: division by zero'}
+    assert 'b' not in state and state['c']['results'] == {}
+    # the failed stage runs again, the done stage is fresh
+    jobs.broken_stage = lambda results: {'fixed': True}
+    status = jobs.run_job(stages, address, workers=1, report=lambda line: None)
+    assert status == {'a': 'done', 'b': 'done', 'c': 'fresh'}
+
+def fixture_job(tmp_path, delay):
+    # Job of a fixture (pcb) with two probes and one device under test (pcb/dut1) of the synthetic data
+    os.makedirs(str(tmp_path / 'pcb' / 'dut1'))
+    write_sweeps(str(tmp_path / 'pcb'), 200, probes=2)
+    write_sweeps(str(tmp_path / 'pcb' / 'dut1'), 200, probes=2)
+    job = tmp_path / 'job.json'
+    fixture = {'folder': 'pcb', 'probes': 2, 'phase_factor': [2, 2], 'duts': ['pcb/dut1']}
+    if delay is not None:
+        fixture['delay'] = delay
+    job.write_text(json.dumps({'fixtures': [fixture]}))
+    return str(job)
+
+def test_no_delay_stages_by_default(tmp_path):
+    jobs, = load_modules(PIPELINE, ['jobs'])
+    names = [stage.name for stage in jobs.read_job(fixture_job(tmp_path, None))]
+    assert names == ['pcb/probe_1', 'pcb/probe_2', 'pcb/dut1/deembed']
+
+def test_fresh_and_stale_stages(tmp_path):
+    jobs, = load_modules(PIPELINE, ['jobs'])
+    job = fixture_job(tmp_path, {'phase_factor': 2})
+    stages = jobs.read_job(job)
+    state = str(tmp_path / 'job.state.json')
+    run = lambda **kwargs: jobs.run_job(stages, state, workers=1, report=lambda line: None, **kwargs)
+    probes = ['pcb/probe_1', 'pcb/probe_2']
+    downstream = ['pcb/dut1/deembed', 'pcb/dut1/delay', 'pcb/dut1/impedance']
+    assert run() == dict.fromkeys(probes + downstream, 'done')
+    assert set(run().values()) == {'fresh'}
+    # a new modification time alone changes nothing
+    address = tmp_path / 'pcb' / 'dut1' / 'MS21.CSV'
+    os.utime(str(address), (1.0e9, 1.0e9))
+    assert set(run(dry_run=True).values()) == {'fresh'}
+    # a content change makes the device under test and the stages after it stale, not the probes
+    data = np.loadtxt(str(address), delimiter=',')
+    write_file(str(address), data[:, 0], 0.9 * (data[:, 1] + 1j * data[:, 2]))
+    status = run(dry_run=True)
+    assert status == dict(dict.fromkeys(probes, 'fresh'), **dict.fromkeys(downstream, 'stale'))
+    assert run() == dict(dict.fromkeys(probes, 'fresh'), **dict.fromkeys(downstream, 'done'))
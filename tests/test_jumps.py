@@ -0,0 +1,48 @@
+#
+# Phase jump detection of both copies of Jumps.py on synthetic wrapped ramps
+#
+
+import numpy as np
+import pytest
+from modules import PROBE, DELAY, load_modules
+
+def loop_jumps(angle):
+    # The jump "stop points" found point by point (the definition of Jumps.py)
+    return [i for i in range(1, len(angle) - 1)
+            if angle[i - 1] * angle[i] < 0 and abs(angle[i + 1]) <= abs(angle[i])]
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+@pytest.mark.parametrize('phase_factor', [1, 2])
+def test_find_jumps_on_ramp(folder, phase_factor):
+    Jumps, = load_modules(folder, ['Jumps'])
+    f = np.linspace(1.0e8, 1.0e10, 3001)
+    phase = 0.3 - 2.0 * np.pi * f * 400.0e-12
+    angle = np.angle(np.exp(1j * phase)) if phase_factor == 2 else np.arctan(np.tan(phase))
+    right_jump, jumpnum, found_factor = Jumps.find_jumps(angle)
+    # one jump per odd multiple of phase_factor * pi / 2 passed by the ramp
+    expected = len(np.unique(np.floor((phase + phase_factor * np.pi / 2) / (phase_factor * np.pi)))) - 1
+    assert jumpnum == expected >= 4 and found_factor == phase_factor
+    assert right_jump.tolist() == loop_jumps(angle)
+    assert np.all(np.abs(angle[right_jump] - angle[right_jump - 1]) > 0.9 * phase_factor * np.pi)
+    if phase_factor == 2:
+        assert Jumps.jumps(np.cos(phase), np.sin(phase)) == jumpnum
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+def test_jump_mask_rows(folder):
+    Jumps, = load_modules(folder, ['Jumps'])
+    f = np.linspace(1.0e8, 5.0e9, 400)
+    angle = np.array([np.angle(np.exp(-2j * np.pi * f * delay)) for delay in (100.0e-12, 300.0e-12)])
+    mask = Jumps.jump_mask(angle)
+    for row in range(2):
+        assert np.array_equal(mask[row], Jumps.jump_mask(angle[row]))
+        assert np.flatnonzero(mask[row]).tolist() == loop_jumps(angle[row])
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+@pytest.mark.parametrize('points', [0, 1, 2])
+def test_too_few_points(folder, points):
+    Jumps, = load_modules(folder, ['Jumps'])
+    angle = np.array([3.0, -3.0][:points])
+    assert Jumps.jump_mask(angle).shape == (points,) and not Jumps.jump_mask(angle).any()
+    assert Jumps.jump_mask(np.zeros((3, points))).shape == (3, points)
+    right_jump, jumpnum, phase_factor = Jumps.find_jumps(angle)
+    assert len(right_jump) == 0 and jumpnum == 0 and phase_factor is None
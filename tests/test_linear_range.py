@@ -0,0 +1,50 @@
+#
+# Automatic selection of the linear phase range on a piecewise-linear phase
+#
+
+import numpy as np
+import pytest
+from modules import DELAY, load_modules
+
+N = 2000
+BREAKS = (600, 1600)  # boundaries of the three straight segments
+DELAYS = (1.0e-9, 1.5e-9, 0.7e-9)  # s, delay time of each segment
+NOISE = (1.0e-3, 1.0e-3, 1.0e-5)  # rad, phase noise of each segment
+
+def piecewise_phase():
+    # Continuous phase made of three straight segments with different slopes and noise levels
+    rng = np.random.default_rng(0)
+    Stimulus = np.linspace(1.0e8, 2.0e10, N)
+    slope = np.repeat(-2.0 * np.pi * np.array(DELAYS), np.diff((0,) + BREAKS + (N,)))
+    step = Stimulus[1] - Stimulus[0]
+    phase = np.concatenate([[0.0], np.cumsum(slope[1:] * step)])
+    phase += np.repeat(NOISE, np.diff((0,) + BREAKS + (N,))) * rng.normal(size=N)
+    return Stimulus, phase
+
+@pytest.mark.parametrize('criterion, index', [('longest', 1), ('best', 2)])
+def test_selects_the_segment(criterion, index):
+    LinearRange, = load_modules(DELAY, ['LinearRange'])
+    Stimulus, phase = piecewise_phase()
+    selected = LinearRange.linear_range(Stimulus, phase, criterion)
+    bounds = (0,) + BREAKS + (N,)
+    assert abs(selected.start - bounds[index]) <= 2 and abs(selected.stop - bounds[index + 1]) <= 2
+    assert selected.fstart == Stimulus[selected.start] and selected.fstop == Stimulus[selected.stop - 1]
+    assert selected.dt == pytest.approx(DELAYS[index], rel=1.0e-3)
+    # a boundary point of the noisier neighbour may be included
+    assert 0.5 * NOISE[index] < selected.rms < 3.0 * NOISE[index] and selected.r2 > 0.999
+    assert len(selected.breakpoints) == 4 and np.all(np.abs(selected.breakpoints[1:3] - BREAKS) <= 2)
+
+def test_straight_phase_is_one_segment():
+    LinearRange, = load_modules(DELAY, ['LinearRange'])
+    Stimulus = np.linspace(1.0e8, 2.0e10, 500)
+    phase = -2.0 * np.pi * Stimulus * 2.0e-9 + np.random.default_rng(1).normal(0.0, 1.0e-3, 500)
+    selected = LinearRange.linear_range(Stimulus, phase)
+    assert (selected.start, selected.stop) == (0, 500) and list(selected.breakpoints) == [0, 500]
+    assert selected.dt == pytest.approx(2.0e-9, rel=1.0e-5)
+
+def test_invalid_arguments():
+    LinearRange, = load_modules(DELAY, ['LinearRange'])
+    with pytest.raises(ValueError, match='Unknown criterion'):
+        LinearRange.linear_range(np.arange(10.0), np.zeros(10), 'shortest')
+    with pytest.raises(ValueError, match='At least 3'):
+        LinearRange.linear_range(np.arange(2.0), np.zeros(2))
@@ -0,0 +1,139 @@
+#
+# N-port deembedding engine: comparison with a per-frequency loop, the inverse fast paths and the 2-port formulas
+# (ErrorModel.correct_2port, RealTime.HotProbes) that delegate to it
+#
+
+import types
+import numpy as np
+import pytest
+from modules import PROBE, load_modules
+
+def random_complex(rng, shape, scale=1.0):
+    return scale * (rng.normal(size=shape) + 1j * rng.normal(size=shape))
+
+def random_probes(rng, N, P):
+    # (N, 2, 2) S-matrices of P reciprocal probes with a transmission close to 1
+    probes = []
+    for _ in range(P):
+        S = random_complex(rng, (N, 2, 2), 0.2)
+        S[:, 1, 0] += 1.0
+        S[:, 0, 1] = S[:, 1, 0]
+        probes.append(S)
+    return probes
+
+def loop_deembed(M, F):
+    # The formula of NPort.py evaluated with np.linalg for one frequency point after another
+    P = M.shape[1]
+    G = np.empty_like(M)
+    for n in range(len(M)):
+        F11, F12, F21, F22 = F[n, :P, :P], F[n, :P, P:], F[n, P:, :P], F[n, P:, P:]
+        X = np.linalg.inv(F12) @ (M[n] - F11) @ np.linalg.inv(F21)
+        G[n] = np.linalg.solve(np.eye(P) + X @ F22, X)
+    return G
+
+@pytest.mark.parametrize('P', [1, 2, 3, 4])
+def test_deembed_matches_loop(P):
+    NPort, = load_modules(PROBE, ['NPort'])
+    rng = np.random.default_rng(P)
+    F = NPort.fixture_from_probes(random_probes(rng, 50, P))
+    G = random_complex(rng, (50, P, P), 0.3)
+    M = NPort.embed(G, F)
+    reference = loop_deembed(M, F)
+    assert np.allclose(reference, G, rtol=1.0e-10, atol=1.0e-12)
+    assert np.max(np.abs(NPort.deembed(M, F) - reference)) < 1.0e-11 * np.max(np.abs(reference))
+
+def test_deembed_full_fixture():
+    # crosstalk between the wires: the transmission blocks are not diagonal
+    NPort, = load_modules(PROBE, ['NPort'])
+    rng = np.random.default_rng(7)
+    F = random_complex(rng, (20, 6, 6), 0.1)
+    F[:, :3, 3:] += np.eye(3)
+    F[:, 3:, :3] += np.eye(3)
+    M = random_complex(rng, (20, 3, 3), 0.3)
+    reference = loop_deembed(M, F)
+    assert np.allclose(NPort.deembed(M, F), reference, rtol=1.0e-12, atol=1.0e-14)
+
+@pytest.mark.parametrize('P, diagonal', [(1, False), (2, False), (3, True), (3, False), (5, True)])
+def test_inverse(P, diagonal):
+    NPort, = load_modules(PROBE, ['NPort'])
+    rng = np.random.default_rng(P)
+    A = random_complex(rng, (P, P, 4, 30)) + 3.0 * np.eye(P)[:, :, None, None]
+    if diagonal:
+        A *= np.eye(P)[:, :, None, None]
+    expected = np.moveaxis(np.linalg.inv(np.moveaxis(A, (0, 1), (-2, -1))), (-2, -1), (0, 1))
+    assert np.allclose(NPort.inverse(A), expected, rtol=1.0e-13, atol=1.0e-15)
+    if diagonal:
+        assert not (NPort.inverse(A) * (1.0 - np.eye(P))[:, :, None, None]).any()
+
+def test_correct_2port():
+    NPort, ErrorModel = load_modules(PROBE, ['NPort', 'ErrorModel'])
+    rng = np.random.default_rng(2)
+    probes = random_probes(rng, 40, 2)
+    M = random_complex(rng, (40, 2, 2), 0.3)
+    expected = NPort.deembed(M, NPort.fixture_from_probes(probes))[:, 1, 0]
+    (x1, _, S21_1, y1), (x2, _, S21_2, y2) = [(S[:, 0, 0], S[:, 0, 1], S[:, 1, 0], S[:, 1, 1]) for S in probes]
+    # extra leading axis of samples, the probes broadcast over it
+    MS = [np.stack([M[:, i, j]] * 3) for i, j in ((0, 0), (1, 0), (0, 1), (1, 1))]
+    SA = ErrorModel.correct_2port(*MS, x1, y1, S21_1, x2, y2, S21_2)
+    assert SA.shape == (3, 40)
+    assert np.allclose(SA, expected, rtol=1.0e-13, atol=1.0e-15)
+
+@pytest.mark.parametrize('ports', [1, 2])
+def test_hot_probes(ports):
+    NPort, ErrorModel, RealTime = load_modules(PROBE, ['NPort', 'ErrorModel', 'RealTime'])
+    rng = np.random.default_rng(ports)
+    N = 40
+    probes = [types.SimpleNamespace(Stimulus=np.arange(N), x=random_complex(rng, N, 0.1),
+                                    y=random_complex(rng, N, 0.1), S21=1.0 + random_complex(rng, N, 0.1))
+              for _ in range(ports)]
+    for p in probes:
+        p.z = p.S21 * p.S21 - p.x * p.y
+    hot = RealTime.HotProbes(probes)
+    SA, ZA = np.empty(N, dtype=complex), np.empty(N, dtype=complex)
+    if ports == 1:
+        MS11 = random_complex(rng, N, 0.3)
+        hot.correct(MS11, SA, ZA)
+        expected = ErrorModel.correct_1port(MS11, probes[0].x, probes[0].y, probes[0].z)
+        assert np.allclose(ZA, 50.0 * (1.0 + expected) / (1.0 - expected), rtol=1.0e-12)
+    else:
+        S = tuple(random_complex(rng, N, 0.3) for _ in range(4))
+        hot.correct(S, SA, ZA)
+        p1, p2 = probes
+        expected = ErrorModel.correct_2port(*S, p1.x, p1.y, p1.S21, p2.x, p2.y, p2.S21)
+        assert np.allclose(ZA, 100.0 * (1.0 - expected) / expected, rtol=1.0e-12)
+    assert np.allclose(SA, expected, rtol=1.0e-12, atol=1.0e-15)
+
+@pytest.mark.parametrize('dtype', [np.complex64, np.complex128])
+def test_cascade_deembed_2port(dtype):
+    ErrorModel, Cascade = load_modules(PROBE, ['ErrorModel', 'Cascade'])
+    rng = np.random.default_rng(3)
+    N = 30
+    models = []
+    for S in random_probes(rng, N, 2):
+        columns = [np.linspace(1.0e9, 2.0e9, N)]
+        for i, j in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            columns += [S[:, i, j].real, S[:, i, j].imag]
+        models.append(np.column_stack(columns))
+    MS = [random_complex(rng, N, 0.3).astype(dtype) for _ in range(4)]
+    S21A, ZA = Cascade.deembed_2port(*MS, *models)
+    assert S21A.shape == (N,) and S21A.dtype == dtype
+    (x1, S21_1, _, y1), (x2, S21_2, _, y2) = [Cascade.s2p_columns(model) for model in models]
+    expected = ErrorModel.correct_2port(*[S.astype(complex) for S in MS], x1, y1, S21_1, x2, y2, S21_2)
+    assert np.allclose(S21A, expected, rtol=1.0e-5 if dtype == np.complex64 else 1.0e-13)
+
+def test_real_time_precision():
+    RealTime, Precision = load_modules(PROBE, ['RealTime', 'Precision'])
+    rng = np.random.default_rng(5)
+    N = 40
+    probes = [types.SimpleNamespace(Stimulus=np.linspace(1.0e9, 2.0e9, N), x=random_complex(rng, N, 0.1),
+                                    y=random_complex(rng, N, 0.1), S21=1.0 + random_complex(rng, N, 0.1))
+              for _ in range(2)]
+    S = tuple(random_complex(rng, N, 0.3) for _ in range(4))
+    results = {}
+    for name in ('double', 'single'):
+        with Precision.precision(name):
+            deembedder = RealTime.RealTimeDeembedder(probes)
+        assert deembedder.ring.SA.dtype == deembedder.ring.ZA.dtype == Precision.PRECISIONS[name][0]
+        deembedder.process('sweep', probes[0].Stimulus, S)
+        results[name] = deembedder.ring.SA[0]
+    assert np.allclose(results['single'], results['double'], rtol=1.0e-5)
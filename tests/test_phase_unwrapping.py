@@ -0,0 +1,48 @@
+#
+# Phase unwrapping of both copies of PhaseUnwrapping.py on synthetic wrapped ramps
+#
+
+import numpy as np
+import pytest
+from modules import PROBE, DELAY, load_modules
+
+def wrapped_ramp(f, delay, phase_factor, start=0.3):
+    # Linear phase of the delay time (s) wrapped at pi (phase_factor 2, np.angle) or at pi/2 (phase_factor 1)
+    phase = start - 2.0 * np.pi * f * delay
+    if phase_factor == 2:
+        return phase, np.angle(np.exp(1j * phase))
+    return phase, np.arctan(np.tan(phase))
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+@pytest.mark.parametrize('phase_factor', [1, 2])
+def test_unwrap_ramp(folder, phase_factor):
+    PhaseUnwrapping, = load_modules(folder, ['PhaseUnwrapping'])
+    f = np.linspace(1.0e8, 1.0e10, 2001)
+    phase, angle = wrapped_ramp(f, 400.0e-12, phase_factor)
+    slopesign, dt, unwangle, initial = PhaseUnwrapping.unwrap_angle(f, angle, phase_factor, verbose=False)
+    assert slopesign == -1.0 and dt == pytest.approx(400.0e-12, rel=1.0e-12)
+    assert np.array_equal(initial, angle)
+    offset = unwangle - phase  # a constant multiple of phase_factor * pi
+    assert np.allclose(offset, offset[0], atol=1.0e-9)
+    assert offset[0] / (phase_factor * np.pi) == pytest.approx(round(offset[0] / (phase_factor * np.pi)), abs=1.0e-9)
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+def test_unwrap_rows(folder):
+    # a 2D array unwraps every sweep as the 1D call does
+    PhaseUnwrapping, = load_modules(folder, ['PhaseUnwrapping'])
+    f = np.linspace(1.0e8, 5.0e9, 500)
+    delays = [100.0e-12, 250.0e-12, 600.0e-12]
+    S = np.array([0.8 * np.exp(1j * wrapped_ramp(f, delay, 2)[0]) for delay in delays])
+    slopesign, dt, unwangle, _ = PhaseUnwrapping.unwrap(f, S.real, S.imag, 2)
+    assert np.allclose(dt, delays, rtol=1.0e-12) and np.all(slopesign == -1.0)
+    for row, delay in enumerate(delays):
+        expected = PhaseUnwrapping.unwrap(f, S[row].real, S[row].imag, 2)
+        assert expected[1] == pytest.approx(dt[row], rel=1.0e-14)
+        assert np.allclose(expected[2], unwangle[row], rtol=0.0, atol=1.0e-12)
+
+@pytest.mark.parametrize('folder', [PROBE, DELAY])
+@pytest.mark.parametrize('points', [0, 1])
+def test_unwrap_needs_two_points(folder, points):
+    PhaseUnwrapping, = load_modules(folder, ['PhaseUnwrapping'])
+    with pytest.raises(ValueError, match='at least 2 frequency points'):
+        PhaseUnwrapping.unwrap_angle(np.arange(points, dtype=float), np.zeros(points), 2, verbose=False)
@@ -0,0 +1,42 @@
+#
+# Single precision (complex64) against double precision: the bound reported by benchmarks/accuracy.py and README.md
+#
+
+import os
+import numpy as np
+import pytest
+from modules import ROOT, PROBE, load_modules
+from synthetic import write_sweeps
+
+BOUND = 5.0e-5  # relative error of the deembedded impedance (about 1e-5 on the bundled datasets)
+
+@pytest.mark.parametrize('dataset', ['DogBonePCB_10.03.2022', 'StraightPCB_10.03.2022'])
+def test_bundled_accuracy(dataset):
+    accuracy, = load_modules(os.path.join(ROOT, 'benchmarks'), ['accuracy'])
+    report = accuracy.dataset_accuracy(dataset)
+    for n in (1, 2):
+        probe = report['probe_%d' % n]
+        assert probe['number_jumps'][0] == probe['number_jumps'][1]
+        assert probe['phase_factor'][0] == probe['phase_factor'][1]
+        assert probe['dt_relative_error'] < 1.0e-8
+        assert probe['S21']['max'] < 1.0e-5
+    for name in ('S11A', 'ZA_1port', 'S21A', 'ZA_2port'):
+        assert report[name]['max'] < BOUND, name
+
+@pytest.mark.parametrize('probes', [1, 2])
+def test_single_precision_run(tmp_path, probes):
+    Calibration, = load_modules(PROBE, ['Calibration'])
+    results = {}
+    for name in ('double', 'single'):
+        folder = tmp_path / name
+        folder.mkdir()
+        write_sweeps(str(folder), 1000, probes=probes)
+        results[name] = Calibration.run_deembedding(Calibration.DeembeddingConfig(str(folder), probes,
+                                                                                  precision=name))
+    single, double = results['single'], results['double']
+    assert single.SA.dtype == np.complex64 and double.SA.dtype == np.complex128
+    assert np.max(np.abs(single.ZA - double.ZA) / np.abs(double.ZA)) < BOUND
+    # the text outputs hold the digits of the precision
+    name = 'ZA_from_S%dA.CSV' % (11 if probes == 1 else 21)
+    single_text = np.loadtxt(str(tmp_path / 'single' / name), delimiter=',')
+    assert np.allclose(single_text[:, 1], single.ZA.real, rtol=1.0e-7, atol=0.0)
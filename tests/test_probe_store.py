@@ -0,0 +1,48 @@
+#
+# Probe store: round trip of a calibrated probe model and the checks of the hashes of its inputs
+#
+
+import os
+import numpy as np
+from modules import PROBE, load_modules
+from synthetic import write_sweeps, write_file
+
+def test_round_trip(tmp_path):
+    Calibration, ProbeStore = load_modules(PROBE, ['Calibration', 'ProbeStore'])
+    write_sweeps(str(tmp_path), 300)
+    config = Calibration.DeembeddingConfig(str(tmp_path), 1, VNA=1)
+    probe = Calibration.calibrate_from_files(config, 1)
+    address = str(tmp_path / 'Probe_1_model.npz')
+    inputs = ProbeStore.input_hashes([str(tmp_path / 'MS11S.CSV')], {'ideal': 1, 'phase_factor': None})
+    ProbeStore.save_probe(address, probe, inputs)
+    loaded = Calibration.ProbeModel(**ProbeStore.load_probe(address, inputs))
+    for name, value in vars(probe).items():
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(getattr(loaded, name), value) and getattr(loaded, name).dtype == value.dtype
+        else:
+            assert getattr(loaded, name) == value
+    assert probe.number_jumps > 0 and loaded.phase_factor == probe.phase_factor
+    # a changed input file or parameter
+    other = ProbeStore.input_hashes([str(tmp_path / 'MS11S.CSV')], {'ideal': 1, 'phase_factor': 2})
+    assert ProbeStore.load_probe(address, other) is None
+    assert ProbeStore.load_probe(address) is not None  # loaded without checking
+    assert ProbeStore.load_probe(str(tmp_path / 'missing.npz'), inputs) is None
+    (tmp_path / 'damaged.npz').write_bytes(b'not a model')
+    assert ProbeStore.load_probe(str(tmp_path / 'damaged.npz'), inputs) is None
+
+def test_store_is_used_until_the_sol_files_change(tmp_path):
+    Calibration, = load_modules(PROBE, ['Calibration'])
+    Stimulus = write_sweeps(str(tmp_path), 300)
+    config = Calibration.DeembeddingConfig(str(tmp_path), 1, VNA=1, probe_store=str(tmp_path / 'store'))
+    probe, loaded = Calibration.probe_from_store(config, 1)
+    assert not loaded and os.path.exists(str(tmp_path / 'store' / 'Probe_1_model.npz'))
+    again, loaded = Calibration.probe_from_store(config, 1)
+    assert loaded and np.array_equal(again.S21, probe.S21)
+    # a touch alone keeps the model; new content recalibrates the probe
+    os.utime(str(tmp_path / 'MS11L.CSV'), (1.0e9, 1.0e9))
+    assert Calibration.probe_from_store(config, 1)[1]
+    load = np.loadtxt(str(tmp_path / 'MS11L.CSV'), delimiter=',')
+    write_file(str(tmp_path / 'MS11L.CSV'), Stimulus, load[:, 1] + 1j * load[:, 2] + 0.01)
+    recalibrated, loaded = Calibration.probe_from_store(config, 1)
+    assert not loaded and not np.allclose(recalibrated.x, probe.x)
+    assert Calibration.probe_from_store(config, 1)[1]
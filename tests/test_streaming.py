@@ -0,0 +1,57 @@
+#
+# Streaming mode: the same output files as run_deembedding, and sweeps of different lengths are rejected
+#
+
+import os
+import shutil
+import pytest
+from modules import PROBE, load_modules
+from synthetic import write_sweeps
+
+OUTPUTS = ('Probe_1_phase_initial.CSV', 'Probe_1_phase_unwrapped.CSV', 'Probe_1.S2P', 'Probe_2_phase_initial.CSV',
+           'Probe_2_phase_unwrapped.CSV', 'Probe_2.S2P', 'S11A.CSV', 'ZA_from_S11A.CSV', 'S21A.CSV', 'ZA_from_S21A.CSV')
+
+@pytest.mark.parametrize('probes', [1, 2])
+def test_streaming_matches_run_deembedding(tmp_path, probes):
+    Calibration, Streaming = load_modules(PROBE, ['Calibration', 'Streaming'])
+    whole, streamed = str(tmp_path / 'whole'), str(tmp_path / 'streamed')
+    os.makedirs(whole)
+    write_sweeps(whole, 1000, probes)
+    shutil.copytree(whole, streamed)
+    Calibration.run_deembedding(Calibration.DeembeddingConfig(whole, probes))
+    Streaming.run_streaming(Calibration.DeembeddingConfig(streamed, probes), block=300)
+    written = [name for name in OUTPUTS if os.path.exists(os.path.join(whole, name))]
+    assert len(written) == 3 * probes + 2
+    for name in written:
+        with open(os.path.join(whole, name)) as a, open(os.path.join(streamed, name)) as b:
+            assert a.read() == b.read(), name
+
+def edit_rows(address, edit):
+    with open(address) as file:
+        lines = edit(file.readlines())
+    with open(address, 'w') as file:
+        file.writelines(lines)
+
+def test_streaming_rejects_shorter_sol_files(tmp_path):
+    # MS11S.CSV has a whole block more than MS11O.CSV and MS11L.CSV
+    Calibration, Streaming = load_modules(PROBE, ['Calibration', 'Streaming'])
+    write_sweeps(str(tmp_path), 300)
+    for name in ('MS11O.CSV', 'MS11L.CSV'):
+        edit_rows(str(tmp_path / name), lambda lines: lines[:200])
+    with pytest.raises(ValueError, match='different numbers of points'):
+        Streaming.run_streaming(Calibration.DeembeddingConfig(str(tmp_path), 1, VNA=1), block=100)
+
+def test_streaming_rejects_longer_dut_file(tmp_path):
+    Calibration, Streaming = load_modules(PROBE, ['Calibration', 'Streaming'])
+    write_sweeps(str(tmp_path), 300, probes=2)
+    edit_rows(str(tmp_path / 'MS21.CSV'), lambda lines: lines + lines[-100:])
+    with pytest.raises(ValueError, match='different numbers of points'):
+        Streaming.run_streaming(Calibration.DeembeddingConfig(str(tmp_path), 2), block=100)
+
+def test_streaming_rejects_other_frequency_points(tmp_path):
+    Calibration, Streaming = load_modules(PROBE, ['Calibration', 'Streaming'])
+    write_sweeps(str(tmp_path), 300)
+    shift = lambda lines: ['%.18e%s' % (float(line.split(',')[0]) * 1.01, line[line.index(','):]) for line in lines]
+    edit_rows(str(tmp_path / 'MS11L.CSV'), shift)
+    with pytest.raises(ValueError, match='different frequency points'):
+        Streaming.run_streaming(Calibration.DeembeddingConfig(str(tmp_path), 1), block=100)
@@ -0,0 +1,44 @@
+#
+# Time-domain delay estimator: recovery of synthetic delays with the FFT and the chirp-z zoom
+#
+
+import numpy as np
+import pytest
+from modules import DELAY, load_modules
+
+def line(Stimulus, dt, amplitude=0.7):
+    return amplitude * np.exp(-2j * np.pi * Stimulus * dt)
+
+@pytest.mark.parametrize('dt', [0.377e-9, 1.2345e-9, 7.1e-9])
+def test_recovers_the_delay(dt):
+    TimeDomain, = load_modules(DELAY, ['TimeDomain'])
+    Stimulus = np.linspace(1.0e8, 2.0e10, 1001)
+    estimate = TimeDomain.time_domain_delay(Stimulus, line(Stimulus, dt))
+    # far below the resolution 1 / bandwidth (50 ps): a single tone is located exactly by the zoom
+    assert estimate.resolution == pytest.approx(1.0 / 1.99e10)
+    assert abs(estimate.dt - dt) < 1.0e-6 * estimate.resolution
+    assert estimate.confidence > 0.95
+
+def test_rows_noise_and_range():
+    TimeDomain, = load_modules(DELAY, ['TimeDomain'])
+    rng = np.random.default_rng(0)
+    Stimulus = np.linspace(1.0e8, 2.0e10, 2001)
+    delays = np.array([0.5e-9, 2.0e-9, 3.3e-9])
+    S = np.array([line(Stimulus, dt) for dt in delays])
+    S += 0.01 * (rng.normal(size=S.shape) + 1j * rng.normal(size=S.shape))
+    estimate = TimeDomain.time_domain_delay(Stimulus, S, fstart=2.0e9, fstop=1.5e10)
+    assert estimate.dt.shape == (3,) and estimate.response.shape[0] == 3
+    assert np.all(np.abs(estimate.dt - delays) < 0.01 * estimate.resolution)
+    assert estimate.resolution == pytest.approx(1.0 / 1.3e10, rel=1.0e-3)
+
+def test_non_uniform_sweep():
+    TimeDomain, = load_modules(DELAY, ['TimeDomain'])
+    Stimulus = np.geomspace(1.0e8, 2.0e10, 1001)
+    estimate = TimeDomain.time_domain_delay(Stimulus, line(Stimulus, 1.2345e-9))
+    assert abs(estimate.dt - 1.2345e-9) < 1.0e-3 * estimate.resolution
+
+def test_too_few_points():
+    TimeDomain, = load_modules(DELAY, ['TimeDomain'])
+    Stimulus = np.linspace(1.0e9, 2.0e9, 3)
+    with pytest.raises(ValueError, match='At least 4'):
+        TimeDomain.time_domain_delay(Stimulus, line(Stimulus, 1.0e-9))
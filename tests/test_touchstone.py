@@ -0,0 +1,69 @@
+#
+# Touchstone reader and writer: round trips, 2-port data order, noise parameters and reference impedances
+#
+
+import numpy as np
+import pytest
+from modules import PROBE, load_modules
+
+def random_network(N, P, seed=0):
+    rng = np.random.default_rng(seed)
+    Freq = np.linspace(1.0e8, 1.0e10, N)
+    S = 0.9 * (rng.uniform(0.1, 1.0, (N, P, P)) * np.exp(1j * rng.uniform(-np.pi, np.pi, (N, P, P))))
+    return Freq, S
+
+@pytest.mark.parametrize('P', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('fmt', ['RI', 'MA', 'DB'])
+def test_round_trip(tmp_path, P, fmt):
+    Touchstone, = load_modules(PROBE, ['Touchstone'])
+    Freq, S = random_network(7, P)
+    address = str(tmp_path / ('device.s%dp' % P))
+    Touchstone.write_touchstone(address, Freq, S, z0=75.0, fmt=fmt, unit='GHz', comments=['round trip'])
+    Freq2, S2, z0 = Touchstone.read_touchstone(address)
+    assert z0 == 75.0
+    assert np.allclose(Freq2, Freq, rtol=1.0e-15)
+    assert np.allclose(S2, S, rtol=1.0e-12, atol=0.0)
+
+def test_two_port_data_order(tmp_path):
+    Touchstone, = load_modules(PROBE, ['Touchstone'])
+    rows = '1 0.1 0 0.2 0 0.3 0 0.4 0\n2 0.5 0 0.6 0 0.7 0 0.8 0\n'
+    for order, S12 in (('21_12', 0.3), ('12_21', 0.2)):
+        address = tmp_path / ('order_%s.s2p' % order)
+        address.write_text('[Version] 2.0\n# GHz S RI R 50\n[Number of Ports] 2\n[Two-Port Data Order] %s\n'
+                           '[Number of Frequencies] 2\n[Network Data]\n%s[End]\n' % (order, rows))
+        Freq, S, _ = Touchstone.read_touchstone(str(address))
+        assert np.allclose(Freq, [1.0e9, 2.0e9])
+        assert S[0, 0, 1] == S12 and S[0, 1, 0] == 0.5 - S12
+    # version 1.0 files are always in the order S11 S21 S12 S22
+    address = tmp_path / 'plain.s2p'
+    address.write_text('# GHz S RI R 50\n' + rows)
+    _, S, _ = Touchstone.read_touchstone(str(address))
+    assert S[0, 1, 0] == 0.2 and S[0, 0, 1] == 0.3
+
+@pytest.mark.parametrize('comment', ['', '! noise parameters\n'])
+def test_noise_parameters_are_skipped(tmp_path, comment):
+    Touchstone, = load_modules(PROBE, ['Touchstone'])
+    address = tmp_path / 'amplifier.s2p'
+    address.write_text('# GHZ S RI R 50\n1 0.1 0 0.2 0 0.3 0 0.4 0\n2 0.5 0 0.6 0 0.7 0 0.8 0\n' + comment
+                       + '1 1.5 .5 10 .2\n')
+    Freq, S, _ = Touchstone.read_touchstone(str(address))
+    assert np.allclose(Freq, [1.0e9, 2.0e9]) and S.shape == (2, 2, 2)
+
+def test_noise_data_keyword(tmp_path):
+    Touchstone, = load_modules(PROBE, ['Touchstone'])
+    address = tmp_path / 'amplifier.s2p'
+    address.write_text('[Version] 2.0\n# GHz S RI R 50\n[Number of Ports] 2\n[Number of Frequencies] 1\n'
+                       '[Number of Noise Frequencies] 1\n[Network Data]\n1 0.1 0 0.2 0 0.3 0 0.4 0\n'
+                       '[Noise Data]\n4 1.5 .5 10 .2\n[End]\n')
+    Freq, S, _ = Touchstone.read_touchstone(str(address))
+    assert np.allclose(Freq, [1.0e9]) and S.shape == (1, 2, 2)
+
+def test_reference_impedances(tmp_path):
+    Touchstone, = load_modules(PROBE, ['Touchstone'])
+    header = '[Version] 2.0\n# GHz S RI R 50\n[Number of Ports] 2\n[Reference] %s\n[Network Data]\n'
+    address = tmp_path / 'line.s2p'
+    address.write_text(header % '75\n75' + '1 0.1 0 0.2 0 0.3 0 0.4 0\n[End]\n')
+    assert Touchstone.read_touchstone(str(address))[2] == 75.0
+    address.write_text(header % '50 75' + '1 0.1 0 0.2 0 0.3 0 0.4 0\n[End]\n')
+    with pytest.raises(ValueError, match='reference impedances'):
+        Touchstone.read_touchstone(str(address))
@@ -0,0 +1,37 @@
+#
+# Monte Carlo uncertainty: no spread without perturbations, a spread proportional to the perturbations
+#
+
+import numpy as np
+import pytest
+from modules import PROBE, load_modules
+from synthetic import write_sweeps
+
+def run(tmp_path, probes, **kwargs):
+    Calibration, Uncertainty = load_modules(PROBE, ['Calibration', 'Uncertainty'])
+    folder = tmp_path / ('%s_%s' % (probes, '_'.join('%s%s' % item for item in sorted(kwargs.items()))))
+    folder.mkdir()
+    write_sweeps(str(folder), 300, probes=probes)
+    config = Calibration.DeembeddingConfig(str(folder), probes)
+    uconfig = Uncertainty.UncertaintyConfig(samples=200, seed=1, **kwargs)
+    return Uncertainty.run_uncertainty(config, uconfig)
+
+@pytest.mark.parametrize('probes', [1, 2])
+def test_zero_perturbation(tmp_path, probes):
+    result = run(tmp_path, probes, standards=0.0, measurement=0.0, precision='double', memory=1.0e6)
+    for name, value in result.bands.items():
+        assert np.all(value[:, 1] == 0.0), name  # standard deviation
+        nominal = getattr(np, name.split('_')[1])(getattr(result, name.split('_')[0]))
+        # the samples are kept as float32
+        assert np.allclose(value[:, 0], nominal, rtol=1.0e-6, atol=1.0e-6 * np.abs(nominal).max())
+        assert np.array_equal(value[:, 2], value[:, 3])
+
+@pytest.mark.parametrize('probes', [1, 2])
+def test_spread_scales_with_the_perturbation(tmp_path, probes):
+    small = run(tmp_path, probes, measurement=1.0e-4, standards=0.0)
+    large = run(tmp_path, probes, measurement=4.0e-4, standards=0.0)
+    ratio = large.bands['ZA_real'][:, 1] / small.bands['ZA_real'][:, 1]
+    assert np.median(ratio) == pytest.approx(4.0, rel=0.1)
+    lower, upper = small.bands['ZA_real'][:, 2], small.bands['ZA_real'][:, 3]
+    inside = (lower <= small.ZA.real) & (small.ZA.real <= upper)
+    assert np.mean(inside) > 0.99
@@ -0,0 +1,33 @@
+#
+# SCPI client against the simulated VNA: a rejected query fails at once and the connection stays usable
+#
+
+import os
+import time
+import asyncio
+import pytest
+from modules import PROBE, load_modules
+
+def test_rejected_queries_fail_without_timeout():
+    VNAClient, VNASimulator = load_modules(PROBE, ['VNAClient', 'VNASimulator'])
+
+    async def session():
+        server = await VNASimulator.serve(os.path.join(PROBE, 'DogBonePCB_10.03.2022'), '127.0.0.1', 0)
+        client = await VNAClient.VNAClient.connect('127.0.0.1', server.sockets[0].getsockname()[1], timeout=10.0)
+        try:
+            start = time.perf_counter()
+            with pytest.raises(ValueError, match='No sweep'):
+                await client.query_values('SENS:FREQ:DATA?')  # no sweep yet: the simulator sends no block
+            with pytest.raises(ValueError, match='Undefined header'):
+                await client.query('SENS:BOGUS?')
+            with pytest.raises(ValueError, match='No device'):
+                await client.sweep('S11')  # INIT:IMM without a connected device
+            assert time.perf_counter() - start < 1.0
+            probe = await VNAClient.calibrate_from_vna(client, 1)
+            assert len(probe.Stimulus) > 0
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(session())